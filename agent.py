@@ -2,13 +2,12 @@
 
 This module creates a deep research agent with custom tools and prompts
 for conducting web research with strategic thinking and context management.
-"""
 
-from datetime import datetime
+Importing it is cheap: deepagents and the model clients are only loaded when
+the agent is built, on the first `get_agent()` call (or access to `agent`).
+"""
 
-from langchain.chat_models import init_chat_model
-from langchain_google_genai import ChatGoogleGenerativeAI
-from deepagents import create_deep_agent
+import threading
 
 from prompts.prompt import (
     SALES_AGENT_INSTRUCTIONS,
@@ -16,15 +15,12 @@ from prompts.prompt import (
     PRICING_AGENT_INSTRUCTIONS,
     TECHNICAL_AGENT_INSTRUCTIONS
 )
-from tools.tool import get_all_products, tavily_search, think_tool, get_pending_rfps, get_price, docling_convert
+from tools.tool import get_all_products, think_tool, get_pending_rfps, get_price, docling_convert, ingest_rfp_bundle, list_pending_rfps
 
 # Limits
 max_concurrent_research_units = 3
 max_researcher_iterations = 3
 
-# Get current date
-current_date = datetime.now().strftime("%Y-%m-%d")
-
 # Combine orchestrator instructions (RESEARCHER_INSTRUCTIONS only for sub-agents)
 # INSTRUCTIONS = (
 #     RESEARCH_WORKFLOW_INSTRUCTIONS
@@ -37,70 +33,171 @@ current_date = datetime.now().strftime("%Y-%m-%d")
 #     )
 # )
 
-# Create research sub-agent
-sales_subagent = {
-    "name": "sales-agent",
-    "description": "Delegate research to the sub-agent researcher. Only give this researcher one topic at a time.",
-    "system_prompt": SALES_AGENT_INSTRUCTIONS.format(date=current_date),
-    "tools": [get_pending_rfps, docling_convert],
-}
-technical_subagent = {
-    "name": "technical-agent",
-    "description": "Handles technical analysis of RFPs",
-    "system_prompt":TECHNICAL_AGENT_INSTRUCTIONS,
-    "tools": [get_all_products]
-}
-pricing_subagent = {
-    "name": "pricing-agent",
-    "description": "This is the pricing agent",
-    "system_prompt": PRICING_AGENT_INSTRUCTIONS,
-    "tools": [get_price, get_all_products]
-}
 # Model Gemini 3
+# from langchain_google_genai import ChatGoogleGenerativeAI
 # model = ChatGoogleGenerativeAI(model="gemini-3-pro-preview", temperature=0.0)
 
 # Model Claude 4.5
-from deepagents.backends import CompositeBackend, StateBackend, FilesystemBackend
 import os
 
 # Define the backend factory
 def backend_factory(rt):
+    from deepagents.backends import CompositeBackend
+    from storage.memories import ArtifactBackend
+    from storage.state import BlobReadOnlyBackend, BlobStateBackend
+
     # Ensure local directory exists
     os.makedirs("./agent_memories", exist_ok=True)
     
     return CompositeBackend(
-        default=StateBackend(rt),
+        # Large state files are kept in the blob store, only references in state
+        default=BlobStateBackend(rt),
         routes={
-            # Persist /memories/ to local disk
-            "/memories/": FilesystemBackend(root_dir=os.path.abspath("./agent_memories"), virtual_mode=True),
+            # Persist /memories/ to local disk, compressed and deduplicated
+            "/memories/": ArtifactBackend(os.path.abspath("./agent_memories")),
+            # Offloaded tool outputs and files, readable by reference
+            "/blobs/": BlobReadOnlyBackend(),
         }
     )
 
-from langchain_openai import ChatOpenAI
-from os import getenv
-from dotenv import load_dotenv
-
-load_dotenv()
-
-model = ChatOpenAI(
-    api_key=getenv("OPENAI_API_KEY"),
-    # base_url="https://openrouter.ai/api/v1",
-    model="gpt-4o-mini"
-)
+# Orchestrator model (OpenAI, configured in llm/config.py)
 # from langchain_groq import ChatGroq
 # model = ChatGroq(
 #     model="openai/gpt-oss-120b",
 #     api_key=getenv("GROQ_API_KEY")
 # )
+# from langchain.chat_models import init_chat_model
 # model = init_chat_model(model="anthropic:claude-sonnet-4-5-20250929", temperature=0.0)
-import os
 # model = ChatGoogleGenerativeAI(model="models/gemini-2.5-flash", api_key=os.getenv("GEMINI_API_KEY"))
 
-# Create the agent
-agent = create_deep_agent(
-    model=model,
-    tools=[think_tool],
-    system_prompt=IINSTRUCTIONS,
-    subagents=[sales_subagent, technical_subagent, pricing_subagent],
-    backend=backend_factory, # Use the custom backend
-)
\ No newline at end of file
+
+def _agent_models(agent_name, models):
+    """Return (model, router middleware) for an agent.
+
+    Per-agent models: each agent defaults to its strong model and a router sends
+    mechanical tool-orchestration turns to its fast model (see llm/config.py for
+    the RFP_*_MODEL environment overrides). An explicit override in `models`
+    replaces both and disables routing.
+    """
+    from llm.router import routed_agent_spec
+
+    if agent_name in models:
+        return models[agent_name], []
+    return routed_agent_spec(agent_name)
+
+
+def create_rfp_agent(models=None, tools=None):
+    """Build the RFP orchestrator deep agent with its three sub-agents.
+
+    Args:
+        models: Optional mapping of agent name ("orchestrator", "sales-agent",
+            "technical-agent", "pricing-agent") to a chat model, e.g. scripted
+            fakes for offline benchmarks
+        tools: Optional mapping of tool name to a replacement tool, e.g. the
+            offline stand-ins in tools/offline.py
+
+    Returns:
+        The compiled deep agent
+    """
+    from deepagents import create_deep_agent
+
+    # The middleware pulls in langchain.agents, so it is only loaded here
+    from agent_middleware.history import HistoryCompactionMiddleware
+    from agent_middleware.llm_scheduler import LLMSchedulerMiddleware
+    from agent_middleware.offload import OffloadMiddleware
+    from agent_middleware.run_context import RunContextMiddleware
+    from agent_middleware.stages import StageCheckpointMiddleware
+    from agent_middleware.tool_errors import ToolErrorMiddleware
+    from pipeline.stages import PipelineStages, rfp_stages
+
+    # Volatile per-run data (today's date) is appended after the static prompt,
+    # tool and sub-agent sections so the prompt prefix stays cacheable.
+    run_context = RunContextMiddleware()
+
+    # All agents' model calls share one RPM/TPM-budgeted scheduler per model
+    llm_scheduler = LLMSchedulerMiddleware()
+
+    # Large tool outputs move to the blob store once the model has seen them
+    offload = OffloadMiddleware()
+
+    # Superseded tool outputs are stubbed and old turns summarised, so long
+    # threads keep a constant prompt size
+    history = HistoryCompactionMiddleware()
+
+    # Tool exceptions become structured error results instead of aborting the run
+    tool_errors = ToolErrorMiddleware()
+
+    models = models or {}
+    tools = tools or {}
+
+    def _tools(*defaults):
+        return [tools.get(t.name, t) for t in defaults]
+
+    sales_model, sales_router = _agent_models("sales-agent", models)
+    technical_model, technical_router = _agent_models("technical-agent", models)
+    pricing_model, pricing_router = _agent_models("pricing-agent", models)
+    model, orchestrator_router = _agent_models("orchestrator", models)
+
+    # Create research sub-agent
+    sales_subagent = {
+        "name": "sales-agent",
+        "description": "Delegate research to the sub-agent researcher. Only give this researcher one topic at a time.",
+        "system_prompt": SALES_AGENT_INSTRUCTIONS,
+        "tools": _tools(get_pending_rfps, docling_convert, ingest_rfp_bundle),
+        "model": sales_model,
+        "middleware": [*sales_router, run_context, llm_scheduler, offload, history, tool_errors],
+    }
+    technical_subagent = {
+        "name": "technical-agent",
+        "description": "Handles technical analysis of RFPs",
+        "system_prompt":TECHNICAL_AGENT_INSTRUCTIONS,
+        "tools": _tools(get_all_products),
+        "model": technical_model,
+        "middleware": [*technical_router, run_context, llm_scheduler, offload, history, tool_errors],
+    }
+    pricing_subagent = {
+        "name": "pricing-agent",
+        "description": "This is the pricing agent",
+        "system_prompt": PRICING_AGENT_INSTRUCTIONS,
+        "tools": _tools(get_price, get_all_products),
+        "model": pricing_model,
+        "middleware": [*pricing_router, run_context, llm_scheduler, offload, history, tool_errors],
+    }
+
+    # Sales, technical and pricing runs are recorded with their input
+    # fingerprints; fresh stages are skipped when a run is retried
+    stages = PipelineStages(rfp_stages(
+        [sales_subagent, technical_subagent, pricing_subagent],
+        list_pending_rfps,
+    ))
+
+    return create_deep_agent(
+        model=model,
+        tools=_tools(think_tool),
+        system_prompt=IINSTRUCTIONS,
+        subagents=[sales_subagent, technical_subagent, pricing_subagent],
+        backend=backend_factory, # Use the custom backend
+        middleware=[*orchestrator_router, run_context, llm_scheduler, offload, history, tool_errors, StageCheckpointMiddleware(stages)],
+    )
+
+
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_agent():
+    """The default RFP agent, built on first use and shared afterwards."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = create_rfp_agent()
+    return _agent
+
+
+def __getattr__(name):
+    # `from agent import agent` (and LangGraph's `agent.py:agent`) still work,
+    # building the agent on first access instead of at import
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
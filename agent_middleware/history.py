@@ -0,0 +1,317 @@
+"""History Compaction Middleware.
+
+Keeps the prompt of long threads at a roughly constant size. Clients resend
+the whole conversation with every follow-up, and a run accumulates every
+tool exchange, so without compaction each turn costs more than the last.
+
+Before every model call:
+
+- superseded tool outputs are replaced by a one-line stub: an earlier
+  `read_file` of a file that was read again or rewritten later, earlier
+  `ls` / `glob` / `grep` results for the same query, and old todo lists
+- if the history before the latest tool results is still above
+  `RFP_HISTORY_MAX_TOKENS`, everything before the last `RFP_HISTORY_WINDOW`
+  messages is folded into one summary message, which also lists the pinned
+  artifacts (the /memories/ files the thread has read or written) so they
+  stay reachable after their messages are gone
+
+Summaries are cached by the content of the summarised prefix and extended
+incrementally: a follow-up that resends the same history only summarises
+the messages added since the last summary.
+"""
+
+import hashlib
+import re
+import uuid
+from collections import OrderedDict
+from os import getenv
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage, get_buffer_string
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from llm.tokens import estimate_tokens, message_tokens
+from llm.scheduler import get_scheduler
+
+HISTORY_MAX_TOKENS = int(getenv("RFP_HISTORY_MAX_TOKENS", "24000"))
+HISTORY_WINDOW = int(getenv("RFP_HISTORY_WINDOW", "12"))
+# Summary model; defaults to the orchestrator's fast model
+HISTORY_SUMMARY_MODEL = getenv("RFP_HISTORY_SUMMARY_MODEL")
+
+SUMMARY_CACHE_SIZE = 256
+# Characters of each message shown to the summariser
+SUMMARY_MESSAGE_CHARS = 2000
+MAX_PINNED = 20
+# Shorter outputs are not worth replacing
+MIN_SUPERSEDED_CHARS = 200
+
+ARTIFACT_PATTERN = re.compile(r"/memories/[\w.\-/]+\w")
+
+SUMMARY_PROMPT = """Condense the conversation below into a brief summary that an RFP analysis assistant can continue from.
+Keep the user's requests and constraints, the RFPs selected (source, due date), decisions taken, matched product SKUs, prices and totals, and open questions. Leave out tool mechanics.
+
+Summary so far:
+{previous}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def _tool_call_args(messages) -> dict:
+    """Map tool_call_id to (tool name, args) for the AI messages' tool calls."""
+    calls = {}
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                calls[call["id"]] = (call["name"], call.get("args") or {})
+    return calls
+
+
+def _supersede_key(name: str, args: dict):
+    """Outputs with the same key replace each other; None if never superseded."""
+    if name == "read_file":
+        return ("file", args.get("file_path"))
+    if name in ("ls", "glob", "grep"):
+        return (name, tuple(sorted((k, str(v)) for k, v in args.items())))
+    if name in ("write_todos", "get_pending_rfps"):
+        return (name,)
+    return None
+
+
+def superseded_outputs(messages) -> set:
+    """Indexes of tool messages whose output a later tool call made stale."""
+    calls = _tool_call_args(messages)
+    latest = {}
+    stale = set()
+    for i, message in enumerate(messages):
+        if not isinstance(message, ToolMessage):
+            continue
+        name, args = calls.get(message.tool_call_id, (message.name, {}))
+        if name in ("write_file", "edit_file"):
+            # Earlier reads of a rewritten file show old content
+            previous = latest.pop(("file", args.get("file_path")), None)
+            if previous is not None:
+                stale.add(previous)
+            continue
+        key = _supersede_key(name, args)
+        if key is None:
+            continue
+        if key in latest:
+            stale.add(latest[key])
+        latest[key] = i
+    return {i for i in stale if isinstance(messages[i].content, str) and len(messages[i].content) >= MIN_SUPERSEDED_CHARS}
+
+
+def pinned_artifacts(messages) -> list:
+    """/memories/ paths read, written or announced in the conversation (latest last)."""
+    calls = _tool_call_args(messages)
+    paths = OrderedDict()
+    for message in messages:
+        found = []
+        if isinstance(message, ToolMessage):
+            _, args = calls.get(message.tool_call_id, (None, {}))
+            if str(args.get("file_path", "")).startswith("/memories/"):
+                found.append(args["file_path"])
+        if isinstance(message.content, str):
+            found += ARTIFACT_PATTERN.findall(message.content)
+        for path in found:
+            paths.pop(path, None)
+            paths[path] = True
+    return list(paths)[-MAX_PINNED:]
+
+
+def _prefix_hashes(messages) -> list:
+    """Rolling content hash of every prefix: hashes[i] identifies messages[:i]."""
+    hashes = [""]
+    for message in messages:
+        h = hashlib.sha256(hashes[-1].encode())
+        h.update(message.type.encode())
+        h.update(str(message.content).encode())
+        if isinstance(message, AIMessage):
+            h.update(str(message.tool_calls).encode())
+        hashes.append(h.hexdigest())
+    return hashes
+
+
+def _safe_cutoff(messages, cutoff: int) -> int:
+    """Move `cutoff` forward so the kept window does not start inside a tool batch."""
+    while cutoff < len(messages) and isinstance(messages[cutoff], ToolMessage):
+        cutoff += 1
+    return cutoff
+
+
+def _latest_turn_start(messages) -> int:
+    """Index of the AI message whose tool results end the history (or the last message)."""
+    i = len(messages) - 1
+    while i > 0 and isinstance(messages[i], ToolMessage):
+        i -= 1
+    return i
+
+
+def extractive_summary(previous: str, messages) -> str:
+    """Summary without a model: the earlier summary plus the start of each request and answer."""
+    lines = [previous] if previous else []
+    for message in messages:
+        if isinstance(message, (HumanMessage, AIMessage)) and isinstance(message.content, str) and message.content.strip():
+            role = "User" if isinstance(message, HumanMessage) else "Assistant"
+            lines.append(f"- {role}: {message.content.strip()[:300]}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """Drops superseded tool outputs and folds old turns into a cached summary.
+
+    Args:
+        summary_model: Chat model for summaries; None builds the default lazily
+        max_tokens: History size (estimated tokens) above which old turns are summarised
+        window: Number of most recent messages kept verbatim (fewer if they
+            alone exceed the budget)
+    """
+
+    def __init__(self, summary_model=None, max_tokens: int = HISTORY_MAX_TOKENS, window: int = HISTORY_WINDOW):
+        self._summary_model = summary_model
+        self.max_tokens = max_tokens
+        self.window = window
+        self._summaries = OrderedDict()
+        self.stats = {"compactions": 0, "summarised_messages": 0, "cache_hits": 0, "superseded": 0}
+
+    @property
+    def summary_model(self):
+        if self._summary_model is None:
+            from llm.config import build_chat_model, model_names
+
+            self._summary_model = build_chat_model(HISTORY_SUMMARY_MODEL or model_names("orchestrator")["fast"])
+        return self._summary_model
+
+    def _drop_superseded(self, messages):
+        """(messages with stale tool outputs stubbed, whether any were)."""
+        stale = superseded_outputs(messages[:_latest_turn_start(messages)])
+        self.stats["superseded"] += len(stale)
+        compacted = [
+            m.model_copy(update={
+                "content": f"[Superseded: a later {m.name or 'tool'} call replaced this output]",
+                "response_metadata": {**m.response_metadata, "superseded": True},
+            }) if i in stale else m
+            for i, m in enumerate(messages)
+        ]
+        return compacted, bool(stale)
+
+    def _cutoff(self, messages) -> int:
+        """Start of the verbatim window: the last `window` messages, fewer if they alone are too large."""
+        limit = _latest_turn_start(messages)
+        cutoff = _safe_cutoff(messages, max(len(messages) - self.window, 0))
+        while cutoff < limit and message_tokens(messages[cutoff:limit]) > self.max_tokens * 3 // 4:
+            cutoff = _safe_cutoff(messages, cutoff + 1)
+        return min(cutoff, limit)
+
+    def _plan(self, messages):
+        """(previous summary, messages to add to it, hash key) for folding messages[:cutoff]."""
+        cutoff = self._cutoff(messages)
+        hashes = _prefix_hashes(messages[:cutoff])
+        key = hashes[cutoff]
+        for start in range(cutoff, 0, -1):
+            if hashes[start] in self._summaries:
+                self._summaries.move_to_end(hashes[start])
+                self.stats["cache_hits"] += 1
+                return cutoff, self._summaries[hashes[start]], messages[start:cutoff], key
+        earlier = messages[0].additional_kwargs.get("history_summary") if messages else None
+        if earlier:
+            # Compacted before in this run: extend its summary
+            return cutoff, earlier, messages[1:cutoff], key
+        return cutoff, "", messages[:cutoff], key
+
+    def _prompt(self, previous, delta) -> str:
+        shown = [m.model_copy(update={"content": str(m.content)[:SUMMARY_MESSAGE_CHARS]}) for m in delta]
+        return SUMMARY_PROMPT.format(previous=previous or "(none)", messages=get_buffer_string(shown))
+
+    def _remember(self, key, summary):
+        self._summaries[key] = summary
+        while len(self._summaries) > SUMMARY_CACHE_SIZE:
+            self._summaries.popitem(last=False)
+
+    def _result(self, messages, cutoff, summary) -> list:
+        self.stats["compactions"] += 1
+        self.stats["summarised_messages"] += cutoff
+        pinned = pinned_artifacts(messages)
+        text = f"Summary of the conversation so far:\n\n{summary}"
+        if pinned:
+            text += "\n\nArtifacts (open with read_file):\n" + "\n".join(f"- {p}" for p in pinned)
+        print(f"DEBUG: History compacted: {cutoff} messages summarised, {len(messages) - cutoff} kept")
+        return [HumanMessage(content=text, id=str(uuid.uuid4()), additional_kwargs={"history_summary": summary}), *messages[cutoff:]]
+
+    def _needs_summary(self, messages) -> bool:
+        # The latest tool results have not been seen yet and are never folded,
+        # so only the history before them counts
+        settled = messages[:_latest_turn_start(messages)]
+        return message_tokens(settled) > self.max_tokens and self._cutoff(messages) > 0
+
+    def compact(self, messages):
+        """Compacted messages, or None if nothing changed."""
+        compacted, changed = self._drop_superseded(messages)
+        if not self._needs_summary(compacted):
+            return compacted if changed else None
+        cutoff, previous, delta, key = self._plan(compacted)
+        summary = previous
+        if delta:
+            try:
+                summary = self.summary_model.invoke(self._prompt(previous, delta)).text.strip()
+            except Exception as e:
+                print(f"DEBUG: History summary failed ({e}); using extractive summary")
+                summary = extractive_summary(previous, delta)
+        self._remember(key, summary)
+        return self._result(compacted, cutoff, summary)
+
+    async def acompact(self, messages):
+        """Async `compact`; the summary call goes through the model's LLM scheduler."""
+        compacted, changed = self._drop_superseded(messages)
+        if not self._needs_summary(compacted):
+            return compacted if changed else None
+        cutoff, previous, delta, key = self._plan(compacted)
+        summary = previous
+        if delta:
+            model = self.summary_model
+            prompt = self._prompt(previous, delta)
+            model_name = getattr(model, "model_name", None) or type(model).__name__
+            try:
+                response = await get_scheduler(model_name).call(lambda: model.ainvoke(prompt), estimate_tokens(prompt) + 500)
+                summary = response.text.strip()
+            except Exception as e:
+                print(f"DEBUG: History summary failed ({e}); using extractive summary")
+                summary = extractive_summary(previous, delta)
+        self._remember(key, summary)
+        return self._result(compacted, cutoff, summary)
+
+
+def _ensure_ids(messages):
+    for message in messages:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+
+
+def _update(messages, compacted):
+    if compacted is None:
+        return None
+    if compacted[0].id == messages[0].id:
+        # Only stubs: replace the changed messages in place (same ids)
+        return {"messages": [new for old, new in zip(messages, compacted) if new is not old]}
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
+
+
+class HistoryCompactionMiddleware(AgentMiddleware):
+    """Compact an agent's message history before each model call (see module docstring)."""
+
+    def __init__(self, compactor: HistoryCompactor = None):
+        super().__init__()
+        self.compactor = compactor or HistoryCompactor()
+
+    def before_model(self, state, runtime):
+        messages = state["messages"]
+        _ensure_ids(messages)
+        return _update(messages, self.compactor.compact(messages))
+
+    async def abefore_model(self, state, runtime):
+        messages = state["messages"]
+        _ensure_ids(messages)
+        return _update(messages, await self.compactor.acompact(messages))
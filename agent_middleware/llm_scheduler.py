@@ -0,0 +1,42 @@
+"""LLM Scheduler Middleware.
+
+Sends an agent's model calls through the shared per-model scheduler of
+`llm.scheduler`, with a token estimate for the call's budget. The model
+clients do not retry themselves (`max_retries=0`), so sync calls go through
+the scheduler's retrying `call_sync` as well.
+"""
+
+from langchain.agents.middleware import AgentMiddleware
+
+from llm.tokens import message_tokens
+from llm.scheduler import get_scheduler
+
+# Budgeted for a call's completion until the real usage is known
+EXPECTED_OUTPUT_TOKENS = 1000
+
+
+def _model_name(request) -> str:
+    return getattr(request.model, "model_name", None) or type(request.model).__name__
+
+
+class LLMSchedulerMiddleware(AgentMiddleware):
+    """Send an agent's model calls through the model's shared scheduler.
+
+    Async calls are budgeted and queued; sync calls are retried after rate
+    limits and transient errors, honouring the model's pause.
+    """
+
+    def __init__(self, scheduler_for=get_scheduler):
+        super().__init__()
+        self.scheduler_for = scheduler_for
+
+    def wrap_model_call(self, request, handler):
+        return self.scheduler_for(_model_name(request)).call_sync(lambda: handler(request))
+
+    async def awrap_model_call(self, request, handler):
+        model_name = _model_name(request)
+        messages = list(request.messages)
+        if request.system_message is not None:
+            messages.insert(0, request.system_message)
+        tokens = message_tokens(messages) + EXPECTED_OUTPUT_TOKENS
+        return await self.scheduler_for(model_name).call(lambda: handler(request), tokens)
@@ -0,0 +1,79 @@
+"""Tool Output Offload Middleware.
+
+Large tool outputs (converted documents, catalog dumps, sub-agent reports)
+would otherwise stay in the message history - and in every checkpoint of
+the thread - for the rest of the run. Once the model has seen such an output,
+this middleware moves it to the content-addressed blob store and leaves a
+short reference with a preview in its place. The model can re-open the full
+output with `read_file` on the `/blobs/...` path.
+"""
+
+import asyncio
+import os
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, ToolMessage
+
+from storage.blobs import OFFLOAD_THRESHOLD_CHARS, get_blob_store
+
+OFFLOAD_PREVIEW_CHARS = int(os.getenv("RFP_OFFLOAD_PREVIEW_CHARS", "500"))
+
+
+def offload_reference(store, digest: str, content: str, preview_chars: int = OFFLOAD_PREVIEW_CHARS) -> str:
+    """Text left in the history in place of an offloaded output."""
+    return (
+        f"[Output offloaded: {len(content):,} characters. "
+        f"Full text: read_file('{store.virtual_path(digest)}')]\n\n"
+        f"Preview:\n{content[:preview_chars]}"
+    )
+
+
+class OffloadMiddleware(AgentMiddleware):
+    """Replace tool outputs above a size threshold by blob references.
+
+    Only outputs the model has already been given are offloaded: the tool
+    results of the latest tool-calling turn are left in full for the next
+    model call.
+    """
+
+    def __init__(self, store=None, threshold: int = OFFLOAD_THRESHOLD_CHARS, preview_chars: int = OFFLOAD_PREVIEW_CHARS):
+        super().__init__()
+        self.store = store
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+
+    def _offloaded_messages(self, messages) -> list:
+        # Tool results after the last AI message have not been seen yet
+        last_ai = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=-1)
+        store = self.store or get_blob_store()
+        updates = []
+        for message in messages[:last_ai]:
+            if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+                continue
+            if len(message.content) <= self.threshold or "offloaded_blob" in message.response_metadata:
+                continue
+            digest = store.put(message.content)
+            # Same id: the add_messages reducer replaces the message in place
+            updates.append(
+                message.model_copy(
+                    update={
+                        "content": offload_reference(store, digest, message.content, self.preview_chars),
+                        "response_metadata": {
+                            **message.response_metadata,
+                            "offloaded_blob": digest,
+                            "offloaded_chars": len(message.content),
+                        },
+                    }
+                )
+            )
+        if updates:
+            print(f"DEBUG: Offloaded {len(updates)} tool output(s) to the blob store")
+        return updates
+
+    def before_model(self, state, runtime):
+        updates = self._offloaded_messages(state["messages"])
+        return {"messages": updates} if updates else None
+
+    async def abefore_model(self, state, runtime):
+        updates = await asyncio.to_thread(self._offloaded_messages, state["messages"])
+        return {"messages": updates} if updates else None
@@ -0,0 +1,56 @@
+"""Run Context Middleware.
+
+Appends per-run, volatile data (today's date, etc.) to the very end of the
+system prompt so that everything before it - the static agent instructions,
+the deepagents tool/sub-agent sections and the tool schemas - stays
+byte-identical between runs and can be served from the provider prompt cache.
+"""
+
+from datetime import datetime
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import SystemMessage
+
+
+def default_run_context() -> dict:
+    """Volatile values shared by every agent in a run."""
+    return {"Todays date": datetime.now().strftime("%Y-%m-%d")}
+
+
+def render_run_context(values: dict) -> str:
+    """Render the run context block appended after the static prompt."""
+    lines = [f"- {key}: {value}" for key, value in values.items()]
+    return "## Run Context\n" + "\n".join(lines)
+
+
+class RunContextMiddleware(AgentMiddleware):
+    """Append a `## Run Context` section as the last part of the system prompt.
+
+    Because user middleware runs inside the deepagents base stack, the block is
+    added after the filesystem / todo / sub-agent prompt sections, i.e. after
+    every static byte of the prompt.
+    """
+
+    def __init__(self, context_factory=default_run_context):
+        super().__init__()
+        self.context_factory = context_factory
+
+    def _with_run_context(self, request):
+        block = render_run_context(self.context_factory())
+        system_message = request.system_message
+        if system_message is None:
+            return request.override(system_message=SystemMessage(content=block))
+
+        content = system_message.content
+        if isinstance(content, str):
+            new_content = f"{content}\n\n{block}" if content else block
+        else:
+            # Keep existing content blocks (e.g. cache_control markers) untouched
+            new_content = [*content, {"type": "text", "text": f"\n\n{block}"}]
+        return request.override(system_message=SystemMessage(content=new_content))
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._with_run_context(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._with_run_context(request))
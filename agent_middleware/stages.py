@@ -0,0 +1,117 @@
+"""Stage Checkpoint Middleware.
+
+Wraps the orchestrator's `task` delegations to the pipeline stages of
+`pipeline.stages`: a stage whose inputs are unchanged and whose artifacts
+are intact is not run again - its recorded result is returned at once -
+and every run of a stage is recorded as ok or failed. The task description
+is part of the fingerprint, and records are scoped to the conversation
+thread (`configurable.thread_id`).
+"""
+
+import asyncio
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.types import Command
+
+from observability.metrics import STAGE_RUNS
+from pipeline.stages import PipelineStages
+
+
+def _request_text(state) -> str:
+    """The user's request: the first human message of the orchestrator's history."""
+    for message in state.get("messages", []) if isinstance(state, dict) else []:
+        if isinstance(message, HumanMessage):
+            return message.text
+    return ""
+
+
+def _thread_id(request) -> str:
+    config = getattr(request.runtime, "config", None) or {}
+    return str(config.get("configurable", {}).get("thread_id", ""))
+
+
+def _result_text(result) -> str:
+    if isinstance(result, Command):
+        messages = (result.update or {}).get("messages", [])
+        return messages[-1].text if messages else ""
+    if isinstance(result, ToolMessage):
+        return result.text
+    return str(result)
+
+
+class StageCheckpointMiddleware(AgentMiddleware):
+    """Skip fresh pipeline stages and record the outcome of the others."""
+
+    def __init__(self, stages: PipelineStages):
+        super().__init__()
+        self.stages = stages
+
+    def _stage(self, request):
+        call = request.tool_call
+        if call["name"] != "task":
+            return None
+        name = call["args"].get("subagent_type")
+        return name if name in self.stages else None
+
+    def _reused(self, request, name, record) -> ToolMessage:
+        self.stages.reuse(name, record)
+        STAGE_RUNS.labels(stage=name, outcome="skipped").inc()
+        print(f"DEBUG: Stage {name} is fresh, reusing its result")
+        return ToolMessage(
+            content=f"{record['result']}\n\n(Reused from an earlier run: the inputs of this stage have not changed.)",
+            tool_call_id=request.tool_call["id"],
+            name="task",
+        )
+
+    def _fingerprint(self, request, name):
+        return self.stages.fingerprint(
+            name,
+            _request_text(request.state),
+            request.tool_call["args"].get("description", ""),
+            _thread_id(request),
+        )
+
+    def _finish(self, request, name, fingerprint, snapshot, result=None, error=None):
+        record = self.stages.finish(name, fingerprint, snapshot, _result_text(result) if result is not None else None,
+                                    error, _thread_id(request))
+        STAGE_RUNS.labels(stage=name, outcome=record["status"]).inc()
+        if record["error"]:
+            print(f"DEBUG: Stage {name} failed: {record['error']}")
+
+    def wrap_tool_call(self, request, handler):
+        name = self._stage(request)
+        if name is None:
+            return handler(request)
+        fingerprint = self._fingerprint(request, name)
+        record = self.stages.fresh(name, fingerprint, _thread_id(request))
+        if record is not None:
+            return self._reused(request, name, record)
+
+        snapshot = self.stages.begin(name)
+        try:
+            result = handler(request)
+        except Exception as e:
+            self._finish(request, name, fingerprint, snapshot, error=f"{type(e).__name__}: {e}")
+            raise
+        self._finish(request, name, fingerprint, snapshot, result)
+        return result
+
+    async def awrap_tool_call(self, request, handler):
+        name = self._stage(request)
+        if name is None:
+            return await handler(request)
+        fingerprint = await asyncio.to_thread(self._fingerprint, request, name)
+        record = await asyncio.to_thread(self.stages.fresh, name, fingerprint, _thread_id(request))
+        if record is not None:
+            return self._reused(request, name, record)
+
+        snapshot = await asyncio.to_thread(self.stages.begin, name)
+        try:
+            result = await handler(request)
+        except BaseException as e:
+            # Cancelled runs count as failed too, so the retry re-runs the stage
+            self._finish(request, name, fingerprint, snapshot, error=f"{type(e).__name__}: {e}")
+            raise
+        await asyncio.to_thread(self._finish, request, name, fingerprint, snapshot, result)
+        return result
@@ -0,0 +1,44 @@
+"""Tool Error Middleware.
+
+An exception raised by a tool (or a sub-agent behind `task`) would abort the
+whole agent run. This middleware turns it into an error ToolMessage with the
+structured result of `tools.resilience.error_result`, so the agent sees what
+kind of failure it was and whether retrying can help, and carries on.
+"""
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from langgraph.errors import GraphBubbleUp
+
+from tools.resilience import error_result
+
+
+class ToolErrorMiddleware(AgentMiddleware):
+    """Return structured error results instead of raising tool exceptions."""
+
+    def _error(self, request, error: Exception) -> ToolMessage:
+        call = request.tool_call
+        print(f"DEBUG: Tool {call['name']} raised {type(error).__name__}: {error}")
+        return ToolMessage(
+            content=error_result(call["name"], error),
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+
+    def wrap_tool_call(self, request, handler):
+        try:
+            return handler(request)
+        except GraphBubbleUp:
+            # Interrupts and other graph control flow
+            raise
+        except Exception as e:
+            return self._error(request, e)
+
+    async def awrap_tool_call(self, request, handler):
+        try:
+            return await handler(request)
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            return self._error(request, e)
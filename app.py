@@ -1,7 +1,6 @@
 from langchain_core.tools import tool
 from pathlib import Path
 import hashlib
-from docling.document_converter import DocumentConverter
 
 
 from langchain_openai import ChatOpenAI
@@ -19,12 +18,13 @@ model = ChatOpenAI(
 # lets define the technical and pricing subgents tools 
 
 ## technical subagents tools
-import pandas as pd
 
 @tool
 def get_all_products() -> str:
     """Lookup product specifications in the product catalog."""
     # For demonstration, returning a static response
+    import pandas as pd
+
     df = pd.read_csv("artifacts/Product_datasheet.csv")
     markdown = df.to_markdown()
     return markdown
@@ -33,6 +33,8 @@ def get_all_products() -> str:
 def get_price() -> str:
     """Lookup product specifications in the product catalog."""
     # For demonstration, returning a static response
+    import pandas as pd
+
     df = pd.read_csv("artifacts/product_price.csv")
     markdown = df.to_markdown()
     return markdown
@@ -62,7 +64,9 @@ def docling_convert(source: str) -> str:
     Returns: FILENAME where markdown is saved (use read_file to access content)
     """
     try:
-        converter = DocumentConverter()
+        from tools.tool import get_document_converter
+
+        converter = get_document_converter()
         result = converter.convert(source)
         markdown = result.document.export_to_markdown()
         print(markdown)
@@ -94,12 +98,11 @@ from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.store.memory import InMemoryStore
 from deepagents.backends import CompositeBackend, StateBackend, StoreBackend
-from datetime import datetime
 from deepagents.middleware import FilesystemMiddleware
 
 from deepagents import create_deep_agent
-
-todays_date = datetime.now().date()
+from agent_middleware.run_context import RunContextMiddleware
+from observability.metrics import timed_node
 
 store = InMemoryStore()
 checkpointer = MemorySaver()
@@ -113,6 +116,7 @@ backend_factory = lambda rt: CompositeBackend(
 )
 
 # Use with thread_id for short-term memory persistence
+@timed_node("sales_agent_node")
 def sales_agent_node(state: AgentState, config): 
     print("🔵 SALES AGENT NODE - Starting")
     print(f"   Config: {config.get('configurable', {})}")
@@ -121,17 +125,18 @@ def sales_agent_node(state: AgentState, config):
             model = model,
             system_prompt="""You are a sales expert analyzing RFPs. 
             1. Scan the RFPs using `get_pending_rfps` tool
-            2. Choose the most relevant RFP which is due in next 3 months, todays date is {todays_date}
+            2. Choose the most relevant RFP which is due in next 3 months, todays date is given in the Run Context section at the end
             3. Convert the RFP document to markdown using `docling_convert` tool, it will return a whole markdown
             4. write the whole exact markdown in rfp_document.txt
             5. Use `write_todos` to plan analysis, dont make more than 3 steps. 
             6. Write analysis to /memories/sales_analysis.txt
             7. Give the response to main agent like : "sales analysis saved to /memories/sales_analysis.txt"
-            """.format(todays_date=todays_date),
+            """,
             checkpointer = checkpointer,
             store = store,
             tools = [get_pending_rfps, docling_convert],
-            backend=backend_factory
+            backend=backend_factory,
+            middleware=[RunContextMiddleware()],
 
         )
         print("🔵 SALES AGENT - Created successfully")
@@ -251,6 +256,7 @@ Constraints:
 
 ## lets create the main agent
 
+@timed_node("main_agent_node")
 def main_agent_node(state: AgentState, config): 
     print("🟢 MAIN AGENT NODE - Starting")
     print(f"   Config: {config.get('configurable', {})}")
@@ -313,7 +319,8 @@ Constraints:
         print(f"❌ MAIN AGENT NODE - ERROR: {e}")
         print(traceback.format_exc())
         raise
-from IPython.display import Image, display
+from langgraph.graph import StateGraph, START, END
+
 graph = StateGraph(AgentState) 
 graph.add_node("sales_agent_node", sales_agent_node)
 graph.add_node("main_agent_node", main_agent_node)
@@ -324,6 +331,7 @@ graph.add_edge("main_agent_node", END)
 # app = graph.compile(checkpointer=checkpointer, store=store)
 
 ## display the graph 
+# from IPython.display import Image, display
 # display(Image(app.get_graph().draw_mermaid_png(max_retries=5, retry_delay=2.0)))
 
 # Add this to END of app.py (after graph compilation)
@@ -0,0 +1,133 @@
+"""Product catalog load benchmark.
+
+Writes a synthetic catalog (the columns of the bundled datasheet, with
+--skus rows) and compares how long a worker takes to get at it:
+
+- pandas: `pd.read_csv`, as the catalog tools did before
+- mmap: `storage.catalog.load_table` on the compiled Arrow file
+
+and how long a catalog tool call takes in a fresh worker, which returns
+the whole catalog as markdown:
+
+- pandas tool: `pd.read_csv(...).to_markdown()`, as the tools did before
+- compiled tool: `storage.catalog.catalog_markdown`, reading the markdown
+  rendered at compile time
+
+It also reports the memory each load holds per process: the DataFrame's
+size for pandas, the bytes allocated by Arrow for the memory-mapped table
+(near zero, the data stays in the shared page cache), and the peak Python
+allocations of each tool call.
+
+Usage:
+    python -m benchmarks.catalog [--skus 50000] [--repeat 5]
+"""
+
+import argparse
+import csv
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from storage import catalog
+
+COLUMNS = ["SKU", "Product Name", "Conductor", "Cores", "Size (sq mm)", "Insulation", "Armour",
+           "Outer Sheath", "Voltage Grade", "Standard"]
+
+
+def write_catalog(path: Path, skus: int, seed: int = 7):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(skus):
+            metal = rng.choice(["Copper", "Aluminium"])
+            cores = rng.choice([1, 2, 3, 3.5, 4])
+            size = rng.choice([1.5, 2.5, 4, 6, 10, 16, 25, 35, 50, 70, 95, 120, 185, 240, 300])
+            insulation = rng.choice(["XLPE", "PVC"])
+            armour = rng.choice(["Steel Wire", "Steel Strip", "None"])
+            writer.writerow([
+                f"AP-{metal[:2].upper()}-{size}-{i:06d}", f"{cores}C {size} sqmm {metal} {insulation}", metal,
+                cores, size, insulation, armour, rng.choice(["PVC ST2", "FRLS PVC ST2"]),
+                rng.choice(["1.1 kV", "3.3 kV", "11 kV"]), rng.choice(["IS 7098-1", "IS 1554-1"]),
+            ])
+
+
+def _median(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _peak_mb(fn) -> float:
+    """Peak memory allocated (through Python's allocators) while `fn` runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--skus", type=int, default=50000, help="rows in the synthetic catalog")
+    parser.add_argument("--repeat", type=int, default=5, help="loads per method (median is reported)")
+    args = parser.parse_args()
+
+    if catalog.pa is None:
+        print("pyarrow is not installed: nothing to compare.")
+        return
+    import pandas as pd
+    import pyarrow as pa
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory) / "Product_datasheet.csv"
+        write_catalog(csv_path, args.skus)
+        started = time.perf_counter()
+        arrow_path = catalog.compile_catalog(str(csv_path))
+        compile_s = time.perf_counter() - started
+
+        def load_mmap():
+            # A fresh worker: nothing cached in this process yet
+            catalog._tables.clear()
+            return catalog.load_table(str(csv_path))
+
+        def pandas_tool():
+            return pd.read_csv(csv_path).to_markdown()
+
+        def compiled_tool():
+            catalog._tables.clear()
+            return catalog.catalog_markdown(str(csv_path))
+
+        pandas_s = _median(lambda: pd.read_csv(csv_path), args.repeat)
+        mmap_s = _median(load_mmap, args.repeat)
+        pandas_tool_s = _median(pandas_tool, args.repeat)
+        compiled_tool_s = _median(compiled_tool, args.repeat)
+        pandas_tool_mb = _peak_mb(pandas_tool)
+        compiled_tool_mb = _peak_mb(compiled_tool)
+        pandas_mb = pd.read_csv(csv_path).memory_usage(deep=True).sum() / 2**20
+        before = pa.total_allocated_bytes()
+        table = load_mmap()
+        mmap_mb = (pa.total_allocated_bytes() - before) / 2**20
+
+        print(f"catalog: {args.skus} SKUs, CSV {csv_path.stat().st_size / 2**20:.1f} MB, "
+              f"Arrow {arrow_path.stat().st_size / 2**20:.1f} MB (compiled in {compile_s * 1000:.0f} ms)")
+        print(f"{'method':<15}{'ms':>10}{'private MB':>12}")
+        print(f"{'pandas':<15}{pandas_s * 1000:>10.1f}{pandas_mb:>12.1f}")
+        print(f"{'mmap':<15}{mmap_s * 1000:>10.2f}{mmap_mb:>12.1f}")
+        print(f"{'pandas tool':<15}{pandas_tool_s * 1000:>10.1f}{pandas_tool_mb:>12.1f}")
+        print(f"{'compiled tool':<15}{compiled_tool_s * 1000:>10.1f}{compiled_tool_mb:>12.1f}")
+        print(f"\n{table.num_rows} rows memory-mapped, {pandas_s / mmap_s:.0f}x faster than parsing the CSV; "
+              f"a catalog tool call is {pandas_tool_s / compiled_tool_s:.0f}x faster than before")
+        del table
+        catalog._tables.clear()
+
+
+if __name__ == "__main__":
+    main()
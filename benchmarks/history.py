@@ -0,0 +1,89 @@
+"""History compaction benchmark.
+
+Simulates a long follow-up session on one RFP: every turn the client resends
+the whole conversation, and the agent re-reads the RFP markdown and the
+product catalog before answering. Compares the prompt of each turn's model
+calls without compaction and with `agent_middleware.history.HistoryCompactor`
+(summaries from a `StubChatModel`, so no API key is needed).
+
+Reports prompt tokens and simulated model latency per turn, plus the time
+spent compacting (including summary calls).
+
+Usage:
+    python -m benchmarks.history [--turns 40] [--max-tokens 24000] [--window 12]
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent_middleware.history import HistoryCompactor
+from llm.fake import StubChatModel
+from llm.tokens import message_tokens
+
+RFP_DOC = "| Item | Description | Qty |\n" + "| 1.1 | XLPE insulated copper cable 4C x 95 sqmm, 1.1 kV | 1200 m |\n" * 400
+CATALOG = "| SKU | Product | Unit price |\n" + "| CU-XLPE-495 | Copper XLPE 4C x 95 sqmm | 1450 |\n" * 200
+
+
+def turn_messages(turn: int) -> list:
+    """One follow-up: question, read the RFP, read the catalog, answer."""
+    read = {"name": "read_file", "args": {"file_path": "/memories/doc_75e53319.md"}, "id": f"read_{turn}", "type": "tool_call"}
+    catalog = {"name": "get_all_products", "args": {}, "id": f"catalog_{turn}", "type": "tool_call"}
+    return [
+        HumanMessage(content=f"Follow-up {turn}: how does line item {turn} compare with our catalog?"),
+        AIMessage(content="", tool_calls=[read]),
+        ToolMessage(content=RFP_DOC, tool_call_id=read["id"], name="read_file"),
+        AIMessage(content="", tool_calls=[catalog]),
+        ToolMessage(content=CATALOG, tool_call_id=catalog["id"], name="get_all_products"),
+        AIMessage(content=f"Line item {turn} matches CU-XLPE-495 at 1450 per metre; total {1450 * 1200}. " * 5),
+    ]
+
+
+def run(turns: int, compactor=None) -> list:
+    model = StubChatModel()
+    history, rows = [], []
+    for turn in range(1, turns + 1):
+        messages = turn_messages(turn)
+        compact_s, prompt_tokens = 0.0, []
+        # Model calls happen before each AI message of the turn
+        for i, message in enumerate(messages):
+            if isinstance(message, AIMessage):
+                prompt = history + messages[:i]
+                if compactor is not None:
+                    started = time.perf_counter()
+                    prompt = compactor.compact(prompt) or prompt
+                    compact_s += time.perf_counter() - started
+                prompt_tokens.append(message_tokens(prompt))
+        history += messages
+        rows.append({
+            "turn": turn,
+            "max_prompt_tokens": max(prompt_tokens),
+            "model_s": sum(model.simulated_latency(t, model.output_tokens) for t in prompt_tokens),
+            "compact_s": compact_s,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--turns", type=int, default=40, help="follow-up turns in the session")
+    parser.add_argument("--max-tokens", type=int, default=24000, help="compaction threshold")
+    parser.add_argument("--window", type=int, default=12, help="messages kept verbatim")
+    args = parser.parse_args()
+
+    summary_model = StubChatModel(model_name="summary-stub", output_tokens=200, time_scale=0.01)
+    compactor = HistoryCompactor(summary_model=summary_model, max_tokens=args.max_tokens, window=args.window)
+    baseline = run(args.turns)
+    compacted = run(args.turns, compactor)
+
+    print(f"{'turn':>5} {'tokens':>9} {'compacted':>10} {'model s':>8} {'compacted s':>12} {'compact ms':>11}")
+    for b, c in zip(baseline, compacted):
+        if b["turn"] in (1, 2, 5) or b["turn"] % 10 == 0 or b["turn"] == args.turns:
+            print(f"{b['turn']:>5} {b['max_prompt_tokens']:>9} {c['max_prompt_tokens']:>10} "
+                  f"{b['model_s']:>8.2f} {c['model_s']:>12.2f} {c['compact_s'] * 1000:>11.1f}")
+    print(f"\ncompactor stats: {compactor.stats}")
+
+
+if __name__ == "__main__":
+    main()
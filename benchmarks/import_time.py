@@ -0,0 +1,105 @@
+"""Import-time benchmark.
+
+Imports each entry module (server, agent, tools) in a fresh interpreter under
+`python -X importtime` and reports the cold import time and the slowest
+imported packages. It also checks that heavy dependencies which are only needed by
+individual tools or by agent construction are not loaded at import.
+
+Usage:
+    python -m benchmarks.import_time [--repeat 3] [--budget-ms 1500] [--json out.json]
+
+The run fails (exit code 1) when a module's import exceeds the budget or
+pulls in one of the deferred dependencies.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = ("server", "agent", "tools.tool")
+
+# Must only be imported when a tool runs or the agent is built
+DEFERRED = ("docling", "pandas", "pyarrow", "langchain_google_genai", "tavily", "markdownify", "IPython", "deepagents")
+
+
+def measure(module: str) -> dict:
+    """Import `module` in a fresh interpreter and parse the -X importtime log.
+
+    Returns:
+        Dict with total_ms (everything imported), the 10 slowest direct
+        imports and the deferred dependencies that were imported anyway
+    """
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    direct = []
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imported.add(name.strip())
+        # Depth 0 entries are the interpreter's own imports; their cumulative times add up
+        if depth == 0:
+            total_us += int(cumulative)
+        # Depth 1 entries are what the measured module (or site) imports directly
+        elif depth == 1:
+            direct.append((int(cumulative), name.strip()))
+
+    loaded = sorted(
+        dep for dep in DEFERRED
+        if any(name == dep or name.startswith(dep + ".") for name in imported)
+    )
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "slowest": [(name, us / 1000) for us, name in sorted(direct, reverse=True)[:10]],
+        "deferred_loaded": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh imports per module (best is reported)")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="maximum import time per module")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    print(f"{'module':<12} {'import ms':>10}  deferred deps loaded")
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["total_ms"])
+        results.append(best)
+        over = best["total_ms"] > args.budget_ms
+        failed = failed or over or bool(best["deferred_loaded"])
+        flag = "  OVER BUDGET" if over else ""
+        print(f"{module:<12} {best['total_ms']:>10.1f}  {', '.join(best['deferred_loaded']) or '-'}{flag}")
+
+    print("\nSlowest direct imports:")
+    for result in results:
+        print(f"  {result['module']}: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["slowest"][:5]))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if failed:
+        print(f"\nFAILED: budget {args.budget_ms:.0f} ms, deferred: {', '.join(DEFERRED)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""LLM scheduler benchmark.
+
+Several RFP runs' worth of model calls hit a `MockProvider` with tight
+RPM/TPM limits at once: a batch of background-job calls followed shortly
+by interactive chat calls. Two client strategies are compared:
+
+- naive: every call goes straight to the provider and retries 429s with
+  random exponential backoff (what independent ChatOpenAI clients do)
+- scheduled: calls go through `llm.scheduler.LLMScheduler`, interactive
+  calls at higher priority than batch ones
+
+Reports provider 429s, total time and interactive call latency.
+
+Usage:
+    python -m benchmarks.llm_scheduler [--batch 60] [--interactive 20] [--window 2]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from llm.fake import MockProvider, MockProviderChatModel
+from llm.scheduler import BATCH, INTERACTIVE, LLMScheduler, rate_limit_delay
+from llm.tokens import message_tokens
+
+PROMPT = [HumanMessage(content="Summarise the technical requirements of this RFP. " * 40)]
+
+
+async def _naive_call(model, max_retries=8):
+    for attempt in range(max_retries + 1):
+        try:
+            return await model.ainvoke(PROMPT)
+        except Exception as e:
+            if rate_limit_delay(e) is None or attempt == max_retries:
+                raise
+            await asyncio.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+async def _scheduled_call(model, scheduler, priority):
+    tokens = message_tokens(PROMPT) + model.output_tokens
+    return await scheduler.call(lambda: model.ainvoke(PROMPT), tokens, priority=priority, max_retries=8)
+
+
+async def run(strategy, batch, interactive, rpm, tpm, window):
+    provider = MockProvider(rpm=rpm, tpm=tpm, window=window, latency=0.05)
+    model = MockProviderChatModel(provider=provider)
+    scheduler = LLMScheduler(rpm=rpm, tpm=tpm, max_concurrency=16, window=window)
+    latencies = []
+    failures = 0
+
+    async def call(priority):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            if strategy == "naive":
+                await _naive_call(model)
+            else:
+                await _scheduled_call(model, scheduler, priority)
+        except Exception:
+            failures += 1
+        if priority == INTERACTIVE:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(call(BATCH)) for _ in range(batch)]
+    # Interactive users arrive while the batch is running
+    await asyncio.sleep(window / 10)
+    tasks += [asyncio.create_task(call(INTERACTIVE)) for _ in range(interactive)]
+    await asyncio.gather(*tasks)
+    return {
+        "strategy": strategy,
+        "wall_s": time.perf_counter() - started,
+        "provider_429": provider.rejected,
+        "failed": failures,
+        "interactive_p50_s": statistics.median(latencies) if latencies else 0.0,
+        "interactive_max_s": max(latencies) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--batch", type=int, default=60, help="batch (job) calls")
+    parser.add_argument("--interactive", type=int, default=20, help="interactive chat calls")
+    parser.add_argument("--rpm", type=int, default=30, help="provider requests per window")
+    parser.add_argument("--tpm", type=int, default=20000, help="provider tokens per window")
+    parser.add_argument("--window", type=float, default=2.0, help="provider window in seconds (60 in production)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    rows = [
+        asyncio.run(run(strategy, args.batch, args.interactive, args.rpm, args.tpm, args.window))
+        for strategy in ("naive", "scheduled")
+    ]
+    print(f"{'strategy':<10} {'wall s':>7} {'429s':>6} {'failed':>7} {'inter p50 s':>12} {'inter max s':>12}")
+    for r in rows:
+        print(f"{r['strategy']:<10} {r['wall_s']:>7.2f} {r['provider_429']:>6} {r['failed']:>7} "
+              f"{r['interactive_p50_s']:>12.2f} {r['interactive_max_s']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
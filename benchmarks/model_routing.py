@@ -0,0 +1,139 @@
+"""Model routing benchmark.
+
+Replays the model turns of one representative RFP run (orchestrator, sales,
+technical and pricing agents) against stub fast/strong models and reports
+latency and token cost for three configurations:
+
+- all-strong: every turn on the strong model
+- all-fast: every turn on the fast model
+- routed: per-agent config + `llm.router.classify_turn`
+
+Usage:
+    python -m benchmarks.model_routing [--time-scale 0.01]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from llm.config import FAST_ONLY_AGENTS
+from llm.fake import StubChatModel
+from llm.router import classify_turn
+from llm.tokens import message_tokens
+
+SAMPLE_RFP = Path(__file__).resolve().parent.parent / "agent_memories" / "doc_75e53319.md"
+
+# Rough public list-price/latency profiles of a small and a large model
+FAST_PROFILE = dict(model_name="fast", first_token_latency=0.25, seconds_per_1k_input=0.02,
+                    seconds_per_output_token=0.008, usd_per_1k_input=0.00015, usd_per_1k_output=0.0006)
+STRONG_PROFILE = dict(model_name="strong", first_token_latency=0.6, seconds_per_1k_input=0.06,
+                      seconds_per_output_token=0.02, usd_per_1k_input=0.0025, usd_per_1k_output=0.01)
+
+
+def _tool_turn(history, name, content):
+    """Append a tool call + its result and return the history for the next turn."""
+    call_id = f"call_{len(history)}"
+    history = history + [
+        AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": call_id}]),
+        ToolMessage(content=content, name=name, tool_call_id=call_id),
+    ]
+    return history
+
+
+def build_scenario():
+    """Return a list of (agent, messages, output_tokens) model turns."""
+    rfp = SAMPLE_RFP.read_text(encoding="utf-8") if SAMPLE_RFP.exists() else "RFP " * 25000
+    catalog = "| SKU | Conductor | Cores | Size | Insulation |\n" + "| X | Cu | 4 | 2.5 | PVC |\n" * 400
+    prices = "| SKU | Unit Price |\n" + "| X | 100 |\n" * 400
+    turns = []
+
+    def run_agent(agent, task, steps, final_tokens):
+        history = [HumanMessage(content=task)]
+        turns.append((agent, history, 60))
+        for name, content, output_tokens in steps:
+            history = _tool_turn(history, name, content)
+            turns.append((agent, history, output_tokens))
+        turns[-1] = (agent, history, final_tokens)
+
+    run_agent("orchestrator", "Scan all pending RFPs and analyze one", [
+        ("write_todos", "Updated todo list", 40),
+        ("task", "sales analysis saved to /memories/sales_analysis.txt", 900),
+        ("write_file", "Updated file /memories/technical_contextual_summary.md", 700),
+        ("write_file", "Updated file /memories/pricing_contextual_summary.md", 60),
+        ("task", "technical evaluation saved to /memories/technical_evaluation.md", 60),
+        ("task", "pricing saved to /memories/pricing_analysis.md", 60),
+        ("read_file", catalog[:6000], 1500),
+        ("write_file", "Updated file /memories/final_rfp_response.md", 80),
+    ], 400)
+    run_agent("sales-agent", "Scan the pending RFPs and select the one that matches the user request and analyze it", [
+        ("get_pending_rfps", "[{'source': 'https://example/rfp.pdf', 'due_date': '20-12-2025'}]", 40),
+        ("docling_convert", "SAVED to /memories/doc_75e53319.md", 40),
+        ("write_todos", "Updated todo list", 40),
+        ("read_file", rfp, 600),
+        ("write_file", "Updated file /memories/sales_analysis.txt", 40),
+    ], 30)
+    run_agent("technical-agent", "Read /memories/technical_contextual_summary.md", [
+        ("read_file", rfp, 60),
+        ("get_all_products", catalog, 2000),
+        ("write_file", "Updated file /memories/technical_evaluation.md", 30),
+    ], 30)
+    run_agent("pricing-agent", "Read /memories/pricing_contextual_summary.md", [
+        ("read_file", catalog[:3000], 60),
+        ("get_price", prices, 800),
+        ("write_file", "Updated file /memories/pricing_analysis.md", 30),
+    ], 30)
+    return turns
+
+
+CONFIGURATIONS = {
+    "all-strong": lambda agent, messages: "strong",
+    "all-fast": lambda agent, messages: "fast",
+    "routed": lambda agent, messages: "fast" if agent in FAST_ONLY_AGENTS else classify_turn(messages),
+}
+
+
+def run(time_scale: float = 0.01) -> dict:
+    """Run every configuration over the scenario and return the results."""
+    models = {
+        "fast": StubChatModel(time_scale=time_scale, **FAST_PROFILE),
+        "strong": StubChatModel(time_scale=time_scale, **STRONG_PROFILE),
+    }
+    turns = build_scenario()
+    results = {}
+    for config_name, choose in CONFIGURATIONS.items():
+        totals = {"turns": 0, "fast_turns": 0, "input_tokens": 0, "output_tokens": 0,
+                  "wall_s": 0.0, "model_s": 0.0, "usd": 0.0}
+        start = time.perf_counter()
+        for agent, messages, output_tokens in turns:
+            tier = choose(agent, messages)
+            model = models[tier]
+            input_tokens = message_tokens(messages)
+            model.invoke(messages, output_tokens=output_tokens)
+            totals["turns"] += 1
+            totals["fast_turns"] += tier == "fast"
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["model_s"] += model.simulated_latency(input_tokens, output_tokens) / time_scale
+            totals["usd"] += model.cost(input_tokens, output_tokens)
+        totals["wall_s"] = time.perf_counter() - start
+        results[config_name] = totals
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="Multiply simulated latencies by this factor (default: 0.01)")
+    args = parser.parse_args()
+
+    results = run(args.time_scale)
+    print(f"{'config':<12}{'turns':>7}{'fast':>6}{'in tok':>10}{'out tok':>9}{'model s':>10}{'cost $':>10}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['turns']:>7}{r['fast_turns']:>6}{r['input_tokens']:>10}{r['output_tokens']:>9}"
+              f"{r['model_s']:>10.2f}{r['usd']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""PDF fast path benchmark.
+
+Renders every bundled sample RFP (benchmarks/samples/*.md) to a digitally
+born PDF (text layer, ruled tables) plus one scanned page without text, and
+all samples together with a scanned page after every text page (the worst
+case for splitting a document into runs). It then compares docling's
+default conversion (OCR and table models on every page) with
+`tools.pdf_fastpath.convert_pdf`, which skips OCR on text-layer pages and
+the table model on pages without ruled lines. Real documents can be
+measured with --pdf.
+
+Reports the per-page decisions, the docling passes of the fast path, the
+time spent inspecting pages, and - when docling and its models are
+available - the median conversion time of both paths and how similar their
+markdown is (1.00: identical).
+
+Usage:
+    python -m benchmarks.pdf_fastpath [--repeat 3] [--scanned 1] [--pdf a.pdf b.pdf]
+"""
+
+import argparse
+import difflib
+import os
+import statistics
+import time
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+from tools.pdf_fastpath import analyse_pdf, convert_pdf, get_pdf_converter, page_runs
+
+SAMPLES_DIR = Path(__file__).resolve().parent / "samples"
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+LINES_PER_PAGE = 70
+
+
+def _escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_content(lines: list) -> bytes:
+    """Text lines top-down; table rows get a rule underneath."""
+    ops, y = [], PAGE_HEIGHT - 50
+    for line in lines:
+        ops.append(f"BT /F1 8 Tf 40 {y} Td ({_escape(line[:130])}) Tj ET")
+        if line.lstrip().startswith("|"):
+            ops.append(f"0.5 w 40 {y - 3} m 555 {y - 3} l S")
+        y -= 11
+    return "\n".join(ops).encode("latin-1")
+
+
+def markdown_to_pdf(markdown: str, scanned_pages: int = 0, interleave: bool = False) -> bytes:
+    """Minimal PDF of a markdown text (Helvetica, one line per source line).
+
+    `scanned_pages` image-only pages (grey noise, no text layer) are appended,
+    as in RFPs with scanned annexes; with `interleave`, a scanned page
+    follows every text page instead.
+    """
+    lines = [line for line in markdown.splitlines() if line.strip()] or [""]
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    if interleave:
+        pages = [p for page in pages for p in (page, None)]
+    else:
+        pages += [None] * scanned_pages
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids, next_id = [], 4
+
+    def add(body: bytes) -> int:
+        nonlocal next_id
+        objects[next_id] = body
+        next_id += 1
+        return next_id - 1
+
+    def stream(data: bytes, extra: str = "") -> bytes:
+        data = zlib.compress(data)
+        return f"<< /Length {len(data)} /Filter /FlateDecode {extra}>>\nstream\n".encode() + data + b"\nendstream"
+
+    for page_lines in pages:
+        if page_lines is not None:
+            content = add(stream(_page_content(page_lines)))
+            kids.append(add(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>".encode()
+            ))
+            continue
+        image = add(stream(os.urandom(300 * 400), "/Type /XObject /Subtype /Image /Width 300 /Height 400 "
+                                                  "/ColorSpace /DeviceGray /BitsPerComponent 8 "))
+        content = add(stream(f"q {PAGE_WIDTH - 60} 0 0 {PAGE_HEIGHT - 60} 30 30 cm /Im1 Do Q".encode()))
+        kids.append(add(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /XObject << /Im1 {image} 0 R >> >> /Contents {content} 0 R >>".encode()
+        ))
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = out.tell()
+        out.write(f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for number in sorted(objects):
+        out.write(f"{offsets[number]:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _docling_available() -> bool:
+    try:
+        import docling.datamodel.pipeline_options  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _time(fn, repeat: int) -> float:
+    fn()  # warm-up: model loading is not conversion time
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def benchmark(name: str, data: bytes, repeat: int, convert: bool) -> dict:
+    started = time.perf_counter()
+    decisions = analyse_pdf(data)
+    row = {
+        "document": name,
+        "pages": len(decisions),
+        "no_ocr": sum(not d.ocr for d in decisions),
+        "no_tables": sum(not d.tables for d in decisions),
+        "passes": len(page_runs(decisions)),
+        "inspect_ms": (time.perf_counter() - started) * 1000,
+    }
+    if convert:
+        from docling.datamodel.base_models import DocumentStream
+
+        default = get_pdf_converter(True, True)
+        outputs = {}
+
+        def run_default():
+            result = default.convert(DocumentStream(name=name, stream=BytesIO(data)))
+            outputs["default"] = result.document.export_to_markdown()
+
+        def run_fast():
+            outputs["fast"] = convert_pdf(name, data)[0]
+
+        row["default_s"] = _time(run_default, repeat)
+        row["fast_s"] = _time(run_fast, repeat)
+        row["similarity"] = difflib.SequenceMatcher(None, outputs["default"], outputs["fast"]).ratio()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="conversions per path (median is reported)")
+    parser.add_argument("--scanned", type=int, default=1, help="scanned pages appended to each sample")
+    parser.add_argument("--pdf", nargs="*", help="measure these PDFs instead of the samples")
+    args = parser.parse_args()
+
+    if args.pdf:
+        documents = [(Path(p).name, Path(p).read_bytes()) for p in args.pdf]
+    else:
+        samples = [path.read_text(encoding="utf-8") for path in sorted(SAMPLES_DIR.glob("*.md"))]
+        documents = [
+            (f"{path.stem}.pdf", markdown_to_pdf(text, args.scanned))
+            for path, text in zip(sorted(SAMPLES_DIR.glob("*.md")), samples)
+        ]
+        documents.append(("interleaved_scans.pdf", markdown_to_pdf("\n".join(samples), interleave=True)))
+    convert = _docling_available()
+    try:
+        rows = [benchmark(name, data, args.repeat, convert) for name, data in documents]
+    except Exception as e:
+        if not convert:
+            raise
+        # e.g. docling's models cannot be downloaded
+        print(f"docling conversion failed ({type(e).__name__}: {e}); conversion times were not measured.\n")
+        convert = False
+        rows = [benchmark(name, data, args.repeat, convert) for name, data in documents]
+
+    print(f"{'document':<28}{'pages':>6}{'no OCR':>8}{'no tbl':>8}{'passes':>8}{'inspect ms':>12}"
+          + (f"{'default s':>11}{'fast s':>9}{'saved':>8}{'similar':>9}" if convert else ""))
+    for r in rows:
+        line = f"{r['document']:<28}{r['pages']:>6}{r['no_ocr']:>8}{r['no_tables']:>8}{r['passes']:>8}{r['inspect_ms']:>12.1f}"
+        if convert:
+            saved = 1 - r["fast_s"] / r["default_s"] if r["default_s"] else 0.0
+            line += f"{r['default_s']:>11.2f}{r['fast_s']:>9.2f}{saved:>8.0%}{r['similarity']:>9.2f}"
+        print(line)
+    if not _docling_available():
+        print("\ndocling is not installed: conversion times were not measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""End-to-end pipeline benchmark (offline).
+
+Runs the full orchestrator -> sales -> technical -> pricing flow of
+`agent.create_rfp_agent` on every bundled sample RFP (benchmarks/samples),
+with scripted fake chat models and the offline tool stand-ins, so no OpenAI,
+Tavily or Google Drive access is needed. For every stage it reports wall time,
+time spent inside tools, prompt/completion tokens and the Python memory peak.
+
+Usage:
+    python -m benchmarks.pipeline [--repeat 3] [--json out.json]
+    python -m benchmarks.pipeline --baseline out.json --tolerance 0.25
+
+With `--baseline`, the run fails (exit code 1) when any stage's wall time or
+memory peak regresses by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from llm.fake import ScriptedChatModel
+from storage.artifacts import ArtifactStore
+from tools.offline import OFFLINE_TOOLS, SAMPLES_DIR, load_pending_rfps
+
+STAGES = ("orchestrator", "sales-agent", "technical-agent", "pricing-agent")
+USER_REQUEST = "scan the pending RFPs and give me the final report of due one"
+
+
+# ---------------------------------------------------------------------------
+# Scripts for the fake models
+# ---------------------------------------------------------------------------
+
+def _last_tool_output(messages) -> str:
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            return str(message.content)
+    return ""
+
+
+def _read_saved_document(messages):
+    match = re.search(r"SAVED to (/memories/\S+)", _last_tool_output(messages))
+    return {"name": "read_file", "args": {"file_path": match.group(1) if match else "/memories/rfp_document.md"}}
+
+
+def _read_referenced_document(messages):
+    match = re.search(r"(/memories/doc_\S+?\.md)", _last_tool_output(messages))
+    return {"name": "read_file", "args": {"file_path": match.group(1) if match else "/memories/rfp_document.md"}}
+
+
+def _write_from_last_output(file_path, limit=2000):
+    def turn(messages):
+        return {"name": "write_file", "args": {"file_path": file_path, "content": _last_tool_output(messages)[:limit]}}
+    return turn
+
+
+def build_scripts(source: str) -> dict:
+    """Scripted turns of every agent for the RFP at `source`."""
+    doc_hint = "The RFP markdown is in the /memories/ doc_*.md file named in /memories/sales_analysis.txt."
+    return {
+        "orchestrator": [
+            {"name": "write_todos", "args": {"todos": [
+                {"content": "Sales scan and RFP selection", "status": "in_progress"},
+                {"content": "Technical and pricing evaluation", "status": "pending"},
+                {"content": "Consolidate final RFP response", "status": "pending"},
+            ]}},
+            {"name": "task", "args": {"subagent_type": "sales-agent", "description":
+                "Scan the pending RFPs and select the one that matches the user request and analyze it"}},
+            {"name": "read_file", "args": {"file_path": "/memories/sales_analysis.txt"}},
+            lambda messages: [
+                {"name": "write_file", "args": {"file_path": "/memories/technical_contextual_summary.md",
+                                                "content": doc_hint + "\n\n" + _last_tool_output(messages)}},
+                {"name": "write_file", "args": {"file_path": "/memories/pricing_contextual_summary.md",
+                                                "content": "Testing & acceptance requirements:\n" + _last_tool_output(messages)}},
+            ],
+            {"name": "task", "args": {"subagent_type": "technical-agent", "description":
+                "Technical summary: /memories/technical_contextual_summary.md"}},
+            {"name": "task", "args": {"subagent_type": "pricing-agent", "description":
+                "Pricing summary: /memories/pricing_contextual_summary.md"}},
+            {"name": "read_file", "args": {"file_path": "/memories/pricing_analysis.md"}},
+            _write_from_last_output("/memories/final_rfp_response.md"),
+            "Final RFP response saved to /memories/final_rfp_response.md",
+        ],
+        "sales-agent": [
+            {"name": "get_pending_rfps", "args": {}},
+            {"name": "docling_convert", "args": {"source": source}},
+            _read_saved_document,
+            lambda messages: {"name": "write_file", "args": {
+                "file_path": "/memories/sales_analysis.txt",
+                "content": "Selected RFP: " + source + "\n" + _last_tool_output(messages[:-2])[:200]
+                           + "\n" + _last_tool_output(messages)[:1500],
+            }},
+            "sales analysis saved to /memories/sales_analysis.txt",
+        ],
+        "technical-agent": [
+            {"name": "read_file", "args": {"file_path": "/memories/technical_contextual_summary.md"}},
+            _read_referenced_document,
+            {"name": "get_all_products", "args": {}},
+            _write_from_last_output("/memories/technical_evaluation.md"),
+            "technical evaluation saved to /memories/technical_evaluation.md",
+        ],
+        "pricing-agent": [
+            {"name": "read_file", "args": {"file_path": "/memories/pricing_contextual_summary.md"}},
+            {"name": "read_file", "args": {"file_path": "/memories/technical_evaluation.md"}},
+            {"name": "get_price", "args": {}},
+            _write_from_last_output("/memories/pricing_analysis.md"),
+            "pricing analysis saved to /memories/pricing_analysis.md",
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+
+class PipelineProfiler(BaseCallbackHandler):
+    """Collect per-stage wall time, tool time, tokens and memory peaks.
+
+    A stage is a sub-agent run, delimited by the orchestrator's `task` tool
+    call; everything else is attributed to the orchestrator.
+    """
+
+    def __init__(self):
+        self.stages = {name: _empty_stage() for name in STAGES}
+        self._lock = threading.Lock()
+        self._tools = {}
+        self._llm_agents = {}
+        self._active_stage = None
+
+    def _stage_for(self, metadata):
+        agent = (metadata or {}).get("lc_agent_name")
+        if agent in self.stages:
+            return agent
+        return self._active_stage or "orchestrator"
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._llm_agents[run_id] = self._stage_for(metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage = self.stages[self._llm_agents.pop(run_id, "orchestrator")]
+        stage["llm_calls"] += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                stage["input_tokens"] += usage.get("input_tokens", 0)
+                stage["output_tokens"] += usage.get("output_tokens", 0)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, inputs=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name")
+        stage = self._stage_for(metadata)
+        with self._lock:
+            if name == "task":
+                subagent = (inputs or {}).get("subagent_type")
+                if subagent in self.stages:
+                    self._active_stage = subagent
+                    stage = subagent
+                    if tracemalloc.is_tracing():
+                        tracemalloc.reset_peak()
+            self._tools[run_id] = (name, stage, time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id)
+
+    def _finish_tool(self, run_id):
+        with self._lock:
+            name, stage_name, started = self._tools.pop(run_id, (None, "orchestrator", time.perf_counter()))
+            elapsed = time.perf_counter() - started
+            stage = self.stages[stage_name]
+            if name == "task" and stage_name != "orchestrator":
+                stage["wall_s"] += elapsed
+                if tracemalloc.is_tracing():
+                    stage["mem_peak_mb"] = max(stage["mem_peak_mb"], tracemalloc.get_traced_memory()[1] / 2**20)
+                self._active_stage = None
+                return
+            stage["tool_s"] += elapsed
+            stage["tools"][name] = stage["tools"].get(name, 0.0) + elapsed
+
+
+def _empty_stage():
+    return {"wall_s": 0.0, "tool_s": 0.0, "llm_calls": 0, "input_tokens": 0,
+            "output_tokens": 0, "mem_peak_mb": 0.0, "tools": {}}
+
+
+@contextmanager
+def _workdir():
+    """Temporary working directory with the sample catalog under artifacts/."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rfp-bench-") as tmp:
+        artifacts = Path(tmp) / "artifacts"
+        artifacts.mkdir()
+        for name in ("Product_datasheet.csv", "product_price.csv"):
+            shutil.copy(SAMPLES_DIR / name, artifacts / name)
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(previous)
+
+
+def run_sample(rfp: dict, trace_memory: bool = True) -> dict:
+    """Run the full pipeline on one sample RFP and return its stage profile."""
+    # agent.py builds the default OpenAI-backed agent on import; it is never
+    # called here, but the client needs a key to be constructed.
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    from agent import create_rfp_agent
+
+    scripts = build_scripts(rfp["source"])
+    models = {name: ScriptedChatModel(script=script, model_name=f"scripted-{name}") for name, script in scripts.items()}
+    profiler = PipelineProfiler()
+
+    with _workdir() as workdir:
+        rfp_agent = create_rfp_agent(models=models, tools=OFFLINE_TOOLS)
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            rfp_agent.invoke(
+                {"messages": [HumanMessage(content=USER_REQUEST)]},
+                config={"callbacks": [profiler], "recursion_limit": 200,
+                        "configurable": {"thread_id": f"bench-{rfp['file']}"}},
+            )
+            total = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 2**20 if trace_memory else 0.0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        final_response = ArtifactStore(workdir / "agent_memories").exists("final_rfp_response.md")
+
+    stages = profiler.stages
+    orchestrator = stages["orchestrator"]
+    orchestrator["wall_s"] = total - sum(stages[s]["wall_s"] for s in STAGES[1:])
+    # tracemalloc peaks are reset per sub-agent, so the run peak is the max
+    orchestrator["mem_peak_mb"] = max([peak] + [stages[s]["mem_peak_mb"] for s in STAGES[1:]])
+    return {"sample": rfp["file"], "total_s": total, "final_response": final_response, "stages": stages}
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run(repeat: int = 3, trace_memory: bool = True) -> dict:
+    """Benchmark every bundled sample; stage metrics are medians over `repeat` runs."""
+    results = {}
+    for rfp in load_pending_rfps():
+        runs = [run_sample(rfp, trace_memory) for _ in range(repeat)]
+        summary = {"total_s": _median([r["total_s"] for r in runs]),
+                   "final_response": all(r["final_response"] for r in runs), "stages": {}}
+        for stage in STAGES:
+            per_run = [r["stages"][stage] for r in runs]
+            summary["stages"][stage] = {
+                key: _median([p[key] for p in per_run])
+                for key in ("wall_s", "tool_s", "llm_calls", "input_tokens", "output_tokens", "mem_peak_mb")
+            }
+        results[rfp["file"]] = summary
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return human readable regressions of `results` against `baseline`."""
+    regressions = []
+    for sample, summary in results.items():
+        for stage, metrics in summary["stages"].items():
+            base = baseline.get(sample, {}).get("stages", {}).get(stage)
+            if not base:
+                continue
+            for key in ("wall_s", "mem_peak_mb", "input_tokens"):
+                # Ignore noise on tiny absolute values
+                floor = {"wall_s": 0.05, "mem_peak_mb": 1.0, "input_tokens": 100}[key]
+                if metrics[key] > max(base[key], floor) * (1 + tolerance):
+                    regressions.append(f"{sample} {stage} {key}: {base[key]:.3f} -> {metrics[key]:.3f}")
+    return regressions
+
+
+def print_report(results: dict):
+    for sample, summary in results.items():
+        status = "ok" if summary["final_response"] else "NO FINAL RESPONSE"
+        print(f"\n{sample}  total {summary['total_s']:.2f}s  [{status}]")
+        print(f"{'stage':<17}{'wall s':>9}{'tool s':>9}{'llm':>6}{'in tok':>10}{'out tok':>9}{'peak MB':>9}")
+        for stage, m in summary["stages"].items():
+            print(f"{stage:<17}{m['wall_s']:>9.3f}{m['tool_s']:>9.3f}{m['llm_calls']:>6}"
+                  f"{m['input_tokens']:>10}{m['output_tokens']:>9}{m['mem_peak_mb']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per sample (median is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Disable tracemalloc (faster, no memory peaks)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default: 0.25)")
+    args = parser.parse_args()
+
+    results = run(args.repeat, trace_memory=not args.no_memory)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
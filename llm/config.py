@@ -0,0 +1,77 @@
+"""Model Configuration.
+
+Per-agent chat model selection. Every agent gets a "fast" and a "strong" model
+name, both overridable from the environment, so cheap mechanical turns and
+reasoning turns can be served by different models (see `llm.router`).
+
+Environment variables:
+    RFP_FAST_MODEL / RFP_STRONG_MODEL: defaults for all agents
+    RFP_<AGENT>_FAST_MODEL / RFP_<AGENT>_STRONG_MODEL: per-agent overrides,
+        where <AGENT> is ORCHESTRATOR, SALES, TECHNICAL or PRICING
+"""
+
+from functools import lru_cache
+from os import getenv
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_FAST_MODEL = "gpt-4o-mini"
+DEFAULT_STRONG_MODEL = "gpt-4o"
+
+# Agent name -> environment prefix
+AGENT_ENV_PREFIXES = {
+    "orchestrator": "RFP_ORCHESTRATOR",
+    "sales-agent": "RFP_SALES",
+    "technical-agent": "RFP_TECHNICAL",
+    "pricing-agent": "RFP_PRICING",
+}
+
+# Agents whose every turn is mechanical (list RFPs, convert, save files) and
+# therefore never need the strong model.
+FAST_ONLY_AGENTS = {"sales-agent"}
+
+
+def model_names(agent_name: str) -> dict:
+    """Resolve the fast/strong model names for an agent.
+
+    Args:
+        agent_name: One of the keys of `AGENT_ENV_PREFIXES`
+
+    Returns:
+        Dict with "fast" and "strong" model names
+    """
+    prefix = AGENT_ENV_PREFIXES.get(agent_name, "RFP")
+    fast = getenv(f"{prefix}_FAST_MODEL") or getenv("RFP_FAST_MODEL") or DEFAULT_FAST_MODEL
+    strong = getenv(f"{prefix}_STRONG_MODEL") or getenv("RFP_STRONG_MODEL") or DEFAULT_STRONG_MODEL
+    if agent_name in FAST_ONLY_AGENTS:
+        strong = fast
+    return {"fast": fast, "strong": strong}
+
+
+@lru_cache(maxsize=None)
+def build_chat_model(model_name: str):
+    """Create (once per name) the chat model client for `model_name`.
+
+    Instances are cached so all agents sharing a model also share its HTTP
+    connection pool.
+    """
+    from langchain_openai import ChatOpenAI
+
+    from observability.prompt_cache import prompt_cache_stats
+
+    return ChatOpenAI(
+        api_key=getenv("OPENAI_API_KEY"),
+        model=model_name,
+        callbacks=[prompt_cache_stats],
+        # Rate limits are retried by llm.scheduler after the provider's Retry-After
+        # (sync and async calls alike), not by the client's random backoff
+        max_retries=0,
+    )
+
+
+def models_for(agent_name: str) -> dict:
+    """Return the fast/strong chat model instances for an agent."""
+    names = model_names(agent_name)
+    return {tier: build_chat_model(name) for tier, name in names.items()}
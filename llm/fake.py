@@ -0,0 +1,232 @@
+"""Stub and Scripted Chat Models.
+
+Offline stand-ins for the OpenAI chat models, used by the benchmarks to
+measure latency and token cost without API keys: `StubChatModel` simulates a
+model's latency/price profile, `ScriptedChatModel` replays deterministic
+tool-calling turns so the whole agent pipeline can run offline, and
+`MockProviderChatModel` answers through a `MockProvider` that enforces
+requests/tokens-per-minute limits with 429 errors.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from llm.tokens import estimate_tokens, message_tokens
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model with a synthetic latency and price profile.
+
+    Latency is `first_token_latency + input_tokens / 1000 * seconds_per_1k_input
+    + output_tokens * seconds_per_output_token`, multiplied by `time_scale` so
+    benchmarks can run faster than real time while keeping the ratios.
+    """
+
+    model_name: str = "stub"
+    first_token_latency: float = 0.3
+    seconds_per_1k_input: float = 0.05
+    seconds_per_output_token: float = 0.01
+    usd_per_1k_input: float = 0.0
+    usd_per_1k_output: float = 0.0
+    output_tokens: int = 50
+    time_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+
+    def simulated_latency(self, input_tokens: int, output_tokens: int) -> float:
+        return self.time_scale * (
+            self.first_token_latency
+            + input_tokens / 1000 * self.seconds_per_1k_input
+            + output_tokens * self.seconds_per_output_token
+        )
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return input_tokens / 1000 * self.usd_per_1k_input + output_tokens / 1000 * self.usd_per_1k_output
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        input_tokens = message_tokens(messages)
+        output_tokens = kwargs.get("output_tokens", self.output_tokens)
+        time.sleep(self.simulated_latency(input_tokens, output_tokens))
+        message = AIMessage(
+            content="ok " * output_tokens,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model that replays a script of turns.
+
+    The n-th call of a conversation (n = number of AI messages already in the
+    history) returns `script[n]`, which is one of:
+
+    - a string: the final answer
+    - a dict `{"name": ..., "args": ...}`: a single tool call
+    - a list of such dicts: parallel tool calls
+    - a callable taking the messages and returning one of the above
+
+    When streamed, answers are emitted word by word like a real provider.
+    """
+
+    script: list
+    model_name: str = "scripted"
+    seconds_per_call: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls come from the script, so the tool schemas are not needed
+        return self
+
+    def _next_turn(self, messages):
+        step = sum(isinstance(m, AIMessage) for m in messages)
+        turn = self.script[min(step, len(self.script) - 1)]
+        if callable(turn):
+            turn = turn(messages)
+        if isinstance(turn, dict):
+            turn = [turn]
+        if isinstance(turn, list):
+            tool_calls = [
+                {"name": call["name"], "args": call.get("args", {}), "id": f"call_{step}_{i}", "type": "tool_call"}
+                for i, call in enumerate(turn)
+            ]
+            return "", tool_calls
+        return str(turn), []
+
+    def _usage(self, messages, content, tool_calls):
+        input_tokens = message_tokens(messages)
+        output_tokens = estimate_tokens(content + str([c["args"] for c in tool_calls]))
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.seconds_per_call:
+            time.sleep(self.seconds_per_call)
+        content, tool_calls = self._next_turn(messages)
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata=self._usage(messages, content, tool_calls),
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.seconds_per_call:
+            time.sleep(self.seconds_per_call)
+        content, tool_calls = self._next_turn(messages)
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        # Tool calls and usage arrive in the closing chunk
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i, "type": "tool_call_chunk"}
+                    for i, c in enumerate(tool_calls)
+                ],
+                usage_metadata=self._usage(messages, content, tool_calls),
+                response_metadata={"model_name": self.model_name},
+            )
+        )
+
+
+class MockRateLimitError(Exception):
+    """HTTP 429 from `MockProvider`, shaped like `openai.RateLimitError`."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached, retry after {retry_after:.2f}s")
+        self.response = SimpleNamespace(headers={"retry-after": f"{retry_after:.3f}"})
+
+
+class MockProvider:
+    """Local provider with per-model RPM/TPM limits over a sliding window.
+
+    Args:
+        rpm: Requests accepted per `window` seconds
+        tpm: Tokens accepted per `window` seconds
+        window: Window length in seconds (shorten it to speed up benchmarks)
+        latency: Seconds each accepted call takes
+    """
+
+    def __init__(self, rpm: int, tpm: int, window: float = 60.0, latency: float = 0.05):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.latency = latency
+        self.accepted = 0
+        self.rejected = 0
+        self._calls = deque()
+
+    def admit(self, tokens: int):
+        """Record a call of `tokens` tokens or raise MockRateLimitError."""
+        now = time.monotonic()
+        while self._calls and self._calls[0][0] <= now - self.window:
+            self._calls.popleft()
+        used = sum(t for _, t in self._calls)
+        if len(self._calls) >= self.rpm or (self._calls and used + tokens > self.tpm):
+            self.rejected += 1
+            raise MockRateLimitError(self._calls[0][0] + self.window - now)
+        self._calls.append((now, tokens))
+        self.accepted += 1
+
+
+class MockProviderChatModel(BaseChatModel):
+    """Chat model served by a shared `MockProvider`."""
+
+    provider: Any
+    model_name: str = "mock"
+    output_tokens: int = 50
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock-provider-chat-model"
+
+    def _result(self, messages):
+        input_tokens = message_tokens(messages)
+        message = AIMessage(
+            content="ok " * self.output_tokens,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": input_tokens + self.output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.provider.admit(message_tokens(messages) + self.output_tokens)
+        time.sleep(self.provider.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.provider.admit(message_tokens(messages) + self.output_tokens)
+        await asyncio.sleep(self.provider.latency)
+        return self._result(messages)
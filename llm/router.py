@@ -0,0 +1,94 @@
+"""Model Router.
+
+Agent middleware that picks the model for every turn: mechanical
+tool-orchestration turns (the previous step only listed RFPs, wrote files or
+updated todos) go to the fast model, everything that has to read and reason
+over content (catalog tables, RFP markdown, sub-agent reports, user requests)
+goes to the strong model.
+"""
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+# Tools whose results need no reasoning: the next step is another mechanical
+# call or a short acknowledgement.
+MECHANICAL_TOOLS = frozenset({
+    "get_pending_rfps",
+    "docling_convert",
+    "ingest_rfp_bundle",
+    "write_file",
+    "edit_file",
+    "ls",
+    "write_todos",
+})
+
+
+def trailing_tool_names(messages) -> list:
+    """Names of the tool results produced by the most recent tool-call batch."""
+    names = []
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            names.append(message.name)
+            continue
+        break
+    return names
+
+
+def classify_turn(messages, mechanical_tools=MECHANICAL_TOOLS) -> str:
+    """Classify the next model turn as "fast" or "strong".
+
+    Args:
+        messages: Conversation so far (without the system message)
+        mechanical_tools: Tool names considered mechanical
+
+    Returns:
+        "fast" when the last tool batch only contains mechanical tools,
+        otherwise "strong"
+    """
+    if not messages or not isinstance(messages[-1], ToolMessage):
+        # New request or follow-up from the user/orchestrator: plan with the strong model
+        return "strong"
+    names = trailing_tool_names(messages)
+    if names and all(name in mechanical_tools for name in names):
+        return "fast"
+    return "strong"
+
+
+class ModelRouterMiddleware(AgentMiddleware):
+    """Route each model call of an agent to its fast or strong model."""
+
+    def __init__(self, fast_model, strong_model, classifier=classify_turn):
+        super().__init__()
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.classifier = classifier
+        self.decisions = {"fast": 0, "strong": 0}
+
+    def _route(self, request):
+        tier = self.classifier(request.messages)
+        self.decisions[tier] += 1
+        model = self.fast_model if tier == "fast" else self.strong_model
+        if model is request.model:
+            return request
+        return request.override(model=model)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._route(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._route(request))
+
+
+def routed_agent_spec(agent_name: str):
+    """Return (default model, middleware list) for an agent from `llm.config`.
+
+    The strong model is the agent's default; a router is only added when the
+    fast and strong models differ.
+    """
+    from llm.config import models_for
+
+    models = models_for(agent_name)
+    if models["fast"] is models["strong"]:
+        return models["strong"], []
+    return models["strong"], [ModelRouterMiddleware(models["fast"], models["strong"])]
+
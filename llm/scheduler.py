@@ -0,0 +1,301 @@
+"""LLM Call Scheduler.
+
+One shared async scheduler per model sits in front of every chat model call
+(via `agent_middleware.llm_scheduler.LLMSchedulerMiddleware`), so overlapping
+RFP runs stay inside the provider's limits instead of colliding and retrying
+at random:
+
+- requests-per-minute and tokens-per-minute budgets over a sliding window;
+  a call waits until its estimated tokens fit
+- a priority queue: interactive chat calls go before batch job calls
+- adaptive concurrency (AIMD): the in-flight limit grows by one per window of
+  successful calls and halves on a 429, and the whole model pauses for the
+  provider's Retry-After before the call is retried
+
+Environment variables:
+    RFP_LLM_RPM: requests per minute per model (default 500)
+    RFP_LLM_TPM: tokens per minute per model (default 200000)
+    RFP_LLM_MAX_CONCURRENCY: upper bound of in-flight calls per model (default 16)
+    RFP_LLM_MAX_RETRIES: retries after a rate limit or transient error (default 4)
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import getenv
+from typing import Optional
+
+LLM_RPM = int(getenv("RFP_LLM_RPM", "500"))
+LLM_TPM = int(getenv("RFP_LLM_TPM", "200000"))
+LLM_MAX_CONCURRENCY = int(getenv("RFP_LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(getenv("RFP_LLM_MAX_RETRIES", "4"))
+
+INTERACTIVE = 0
+BATCH = 1
+
+_priority = ContextVar("rfp_llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run model calls made inside the block (and tasks it spawns) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def rate_limit_delay(error) -> Optional[float]:
+    """Seconds to pause for a retryable provider error, None if not retryable.
+
+    Rate limits (HTTP 429) use the provider's Retry-After header when present;
+    connection errors and 5xx responses pause briefly.
+    """
+    status = getattr(error, "status_code", None)
+    name = type(error).__name__
+    if status == 429 or name == "RateLimitError":
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after", 1.0))
+        except (TypeError, ValueError):
+            return 1.0
+    if (isinstance(status, int) and status >= 500) or name in ("APIConnectionError", "APITimeoutError"):
+        return 0.5
+    return None
+
+
+class _Permit:
+    def __init__(self, entry):
+        self.entry = entry  # [timestamp, tokens] in the token window
+
+
+class LLMScheduler:
+    """Rate-budgeted, prioritised and adaptively concurrent model call gate.
+
+    Args:
+        rpm: Requests allowed per `window` seconds
+        tpm: Tokens allowed per `window` seconds
+        max_concurrency: Upper bound for the adaptive in-flight limit
+        window: Length of the budget window in seconds
+    """
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM, max_concurrency: int = LLM_MAX_CONCURRENCY, window: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.window = window
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0, "wait_seconds": 0.0}
+        self._requests = deque()
+        self._tokens = deque()
+        self._token_total = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._timer = None
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] <= cutoff:
+            self._requests.popleft()
+        while self._tokens and self._tokens[0][0] <= cutoff:
+            self._token_total -= self._tokens.popleft()[1]
+
+    def _blocked_for(self, tokens, now) -> Optional[float]:
+        """0 if a call of `tokens` may start now, seconds to wait, or None (wait for a release)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= max(1, int(self.limit)):
+            return None
+        waits = []
+        if len(self._requests) >= self.rpm:
+            waits.append(self._requests[0] + self.window - now)
+        # An oversize call runs alone rather than never
+        if self._token_total and self._token_total + tokens > self.tpm:
+            freed = self._token_total + tokens - self.tpm
+            for ts, used in self._tokens:
+                freed -= used
+                if freed <= 0:
+                    waits.append(ts + self.window - now)
+                    break
+        return max(waits) if waits else 0.0
+
+    def _dispatch(self):
+        self._timer = None
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            self._prune(now)
+            delay = self._blocked_for(tokens, now)
+            if delay is None:
+                return
+            if delay > 0:
+                self._timer = loop.call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            entry = [now, tokens]
+            self._requests.append(now)
+            self._tokens.append(entry)
+            self._token_total += tokens
+            self.in_flight += 1
+            future.set_result(_Permit(entry))
+
+    def _kick(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None) -> _Permit:
+        """Wait until a call of about `tokens` tokens may start.
+
+        Args:
+            tokens: Estimated prompt plus completion tokens
+            priority: INTERACTIVE or BATCH; defaults to the `llm_priority` context
+
+        Returns:
+            A permit to hand back to `release`
+        """
+        priority = _priority.get() if priority is None else priority
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        started = time.monotonic()
+        self._kick()
+        try:
+            permit = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            raise
+        self.stats["wait_seconds"] += time.monotonic() - started
+        return permit
+
+    def release(self, permit: _Permit, used_tokens: Optional[int] = None, retry_after: Optional[float] = None):
+        """Finish a call.
+
+        Args:
+            permit: From `acquire`
+            used_tokens: Actual token usage, replacing the estimate in the window
+            retry_after: Set when the provider rate limited the call; halves the
+                concurrency limit and pauses the model for that many seconds
+        """
+        self.in_flight -= 1
+        if used_tokens is not None and permit.entry in self._tokens:
+            self._token_total += used_tokens - permit.entry[1]
+            permit.entry[1] = used_tokens
+        if retry_after is not None:
+            self.limit = max(1.0, self.limit / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._kick()
+
+    async def call(self, fn, tokens: int, priority: Optional[int] = None, max_retries: int = LLM_MAX_RETRIES):
+        """Run `await fn()` under the budgets, retrying rate limits after the pause.
+
+        Args:
+            fn: Zero-argument coroutine function making the provider call
+            tokens: Estimated prompt plus completion tokens
+            priority: INTERACTIVE or BATCH; defaults to the `llm_priority` context
+            max_retries: Retries after rate limit / transient errors
+
+        Returns:
+            Whatever `fn` returns
+        """
+        for attempt in range(max_retries + 1):
+            permit = await self.acquire(tokens, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = rate_limit_delay(e)
+                if delay is None or attempt == max_retries:
+                    self.release(permit)
+                    raise
+                self.stats["rate_limited"] += 1
+                self.stats["retries"] += 1
+                print(f"DEBUG: LLM rate limited, pausing {delay:.1f}s (limit {self.limit:.1f})")
+                self.release(permit, retry_after=delay)
+                continue
+            except BaseException:
+                self.release(permit)
+                raise
+            self.stats["calls"] += 1
+            self.release(permit, used_tokens=_usage(result))
+            return result
+
+    def call_sync(self, fn, max_retries: int = LLM_MAX_RETRIES):
+        """Run `fn()` from synchronous code, retrying rate limits after the pause.
+
+        Sync calls (e.g. `agent.invoke`) run outside the event loop the
+        budgets and queue live on, so they are not budgeted; they wait out the
+        model's pause and retry 429 / transient errors like `call`, and a
+        rate limit they hit pauses the async calls too.
+
+        Args:
+            fn: Zero-argument function making the provider call
+            max_retries: Retries after rate limit / transient errors
+
+        Returns:
+            Whatever `fn` returns
+        """
+        for attempt in range(max_retries + 1):
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = rate_limit_delay(e)
+                if delay is None or attempt == max_retries:
+                    raise
+                self.stats["rate_limited"] += 1
+                self.stats["retries"] += 1
+                print(f"DEBUG: LLM rate limited (sync call), pausing {delay:.1f}s")
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                continue
+            self.stats["calls"] += 1
+            return result
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._prune(now)
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.limit, 2),
+            "queued": sum(1 for *_, f in self._waiters if not f.done()),
+            "requests_in_window": len(self._requests),
+            "tokens_in_window": self._token_total,
+            "paused_for": round(max(0.0, self.paused_until - now), 2),
+        }
+
+
+def _usage(result) -> Optional[int]:
+    """Total tokens reported by a model response (ModelResponse or message)."""
+    messages = getattr(result, "result", None) or [result]
+    totals = [m.usage_metadata["total_tokens"] for m in messages if getattr(m, "usage_metadata", None)]
+    return sum(totals) if totals else None
+
+
+_schedulers = {}
+
+
+def get_scheduler(model_name: str) -> LLMScheduler:
+    """The process-wide scheduler for a model (provider limits are per model)."""
+    if model_name not in _schedulers:
+        _schedulers[model_name] = LLMScheduler()
+    return _schedulers[model_name]
+
+
+def scheduler_snapshot() -> dict:
+    return {name: scheduler.snapshot() for name, scheduler in _schedulers.items()}
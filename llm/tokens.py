@@ -0,0 +1,16 @@
+"""Token Estimates.
+
+Cheap, provider-independent token counts used to budget model calls
+(`llm.scheduler`) and to size conversation histories
+(`agent_middleware.history`) before the provider reports real usage.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def message_tokens(messages) -> int:
+    """Rough prompt token count for a list of messages."""
+    return sum(estimate_tokens(str(m.content)) for m in messages)
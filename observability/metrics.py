@@ -0,0 +1,194 @@
+"""Prometheus Metrics.
+
+Latency and token metrics for RFP runs, exposed by `server.py` at `/metrics`:
+
+- rfp_graph_node_duration_seconds{agent,node}: LangGraph node executions
+- rfp_subagent_duration_seconds{subagent,status}: deep-agent `task` delegations
+- rfp_tool_duration_seconds{tool,status}: tool calls (docling_convert, get_all_products, ...)
+- rfp_llm_duration_seconds{agent,model}: chat model calls
+- rfp_llm_tokens_total{agent,model,kind}: input / output / cached prompt tokens
+- rfp_active_streams: chat streams currently open
+- rfp_stream_disconnects_total: runs cancelled because the client went away
+- rfp_admission_wait_seconds{source}: time chat runs waited for a run slot
+- rfp_admission_queue_depth / rfp_admission_active_runs: queued and running chat runs
+- rfp_admission_rejected_total{reason}: requests refused with 429
+- rfp_tool_failures_total{tool,kind}: failed external tool attempts (timeout, unavailable, circuit_open, ...)
+- rfp_circuit_open{host}: 1 while a host's circuit breaker is open
+- rfp_stage_runs_total{stage,outcome}: pipeline stages run (ok / failed) or skipped as fresh
+
+Pass a `MetricsCallbackHandler()` in the run config callbacks to record a run.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Agent runs range from milliseconds (file tools) to minutes (sub-agents)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+GRAPH_NODE_DURATION = Histogram(
+    "rfp_graph_node_duration_seconds", "Duration of LangGraph node executions",
+    ["agent", "node"], buckets=LATENCY_BUCKETS,
+)
+SUBAGENT_DURATION = Histogram(
+    "rfp_subagent_duration_seconds", "Duration of sub-agent task delegations",
+    ["subagent", "status"], buckets=LATENCY_BUCKETS,
+)
+TOOL_DURATION = Histogram(
+    "rfp_tool_duration_seconds", "Duration of tool calls",
+    ["tool", "status"], buckets=LATENCY_BUCKETS,
+)
+LLM_DURATION = Histogram(
+    "rfp_llm_duration_seconds", "Duration of chat model calls",
+    ["agent", "model"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "rfp_llm_tokens_total", "Tokens used by chat model calls",
+    ["agent", "model", "kind"],
+)
+ACTIVE_STREAMS = Gauge("rfp_active_streams", "Chat streams currently open")
+STREAM_DISCONNECTS = Counter("rfp_stream_disconnects_total", "Chat streams cancelled because the client went away")
+ADMISSION_WAIT = Histogram(
+    "rfp_admission_wait_seconds", "Time chat runs waited in the admission queue",
+    ["source"], buckets=LATENCY_BUCKETS,
+)
+ADMISSION_QUEUE_DEPTH = Gauge("rfp_admission_queue_depth", "Chat runs waiting for a run slot")
+ADMISSION_ACTIVE = Gauge("rfp_admission_active_runs", "Chat runs holding a run slot")
+ADMISSION_REJECTED = Counter("rfp_admission_rejected_total", "Chat requests rejected by admission control", ["reason"])
+TOOL_FAILURES = Counter(
+    "rfp_tool_failures_total", "Failed external tool attempts by failure kind",
+    ["tool", "kind"],
+)
+CIRCUIT_OPEN = Gauge("rfp_circuit_open", "Whether the circuit breaker of a host is open", ["host"])
+STAGE_RUNS = Counter(
+    "rfp_stage_runs_total", "Pipeline stage delegations by outcome (ok, failed, skipped as fresh)",
+    ["stage", "outcome"],
+)
+
+
+def render_metrics():
+    """Return (body, content type) of the Prometheus exposition."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def timed_node(node_name: str, agent: str = "graph"):
+    """Decorator recording a plain LangGraph node function's duration."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                GRAPH_NODE_DURATION.labels(agent, node_name).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record node, sub-agent, tool and LLM metrics from LangChain callbacks.
+
+    Runs are attributed to an agent by walking the run tree: everything below a
+    `task` tool call belongs to the sub-agent it delegated to, everything else
+    to the orchestrator.
+    """
+
+    def __init__(self):
+        self._runs = {}
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def _agent(self, run_id, parent_run_id, agent=None):
+        with self._lock:
+            if agent is None:
+                agent = self._agents.get(parent_run_id, "orchestrator")
+            self._agents[run_id] = agent
+        return agent
+
+    def _start(self, run_id, *labels):
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), labels)
+
+    def _finish(self, run_id):
+        with self._lock:
+            self._agents.pop(run_id, None)
+            started, labels = self._runs.pop(run_id, (None, None))
+        if started is None:
+            return None, None
+        return time.perf_counter() - started, labels
+
+    # Graph nodes -----------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, name=None, **kwargs):
+        agent = self._agent(run_id, parent_run_id)
+        node = (metadata or {}).get("langgraph_node")
+        # Only the runnable that *is* the node, not everything nested inside it
+        if node and (name or (serialized or {}).get("name")) == node:
+            self._start(run_id, "node", agent, node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish_node(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish_node(run_id)
+
+    def _finish_node(self, run_id):
+        if run_id not in self._runs:
+            with self._lock:
+                self._agents.pop(run_id, None)
+            return
+        elapsed, labels = self._finish(run_id)
+        if labels and labels[0] == "node":
+            GRAPH_NODE_DURATION.labels(*labels[1:]).observe(elapsed)
+
+    # Tools and sub-agents ------------------------------------------------------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, inputs=None, **kwargs):
+        tool_name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        subagent = (inputs or {}).get("subagent_type") if tool_name == "task" else None
+        self._agent(run_id, parent_run_id, subagent)
+        self._start(run_id, "tool", tool_name, subagent)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, "error")
+
+    def _finish_tool(self, run_id, status):
+        elapsed, labels = self._finish(run_id)
+        if not labels:
+            return
+        _, tool_name, subagent = labels
+        if tool_name == "task":
+            SUBAGENT_DURATION.labels(subagent or "unknown", status).observe(elapsed)
+        TOOL_DURATION.labels(tool_name, status).observe(elapsed)
+
+    # LLM calls ---------------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        agent = self._agent(run_id, parent_run_id)
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self._start(run_id, "llm", agent, model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        elapsed, labels = self._finish(run_id)
+        if not labels:
+            return
+        _, agent, model = labels
+        LLM_DURATION.labels(agent, model).observe(elapsed)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+                LLM_TOKENS.labels(agent, model, "input").inc(usage.get("input_tokens", 0) or 0)
+                LLM_TOKENS.labels(agent, model, "output").inc(usage.get("output_tokens", 0) or 0)
+                LLM_TOKENS.labels(agent, model, "cached").inc(cached)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
@@ -0,0 +1,97 @@
+"""Prompt Cache Instrumentation.
+
+Callback handler that reports cached vs. uncached prompt tokens for every
+chat model call, using the `input_token_details.cache_read` usage field that
+OpenAI (and Anthropic) return when a prompt prefix was served from cache.
+"""
+
+import threading
+from collections import deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Per-call records kept for inspection; totals cover every call
+RECENT_CALLS = 1000
+
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Collect per-call and per-agent prompt cache usage.
+
+    Attach it to a chat model (`ChatOpenAI(callbacks=[handler])`) or to a run
+    config. Each call prints one line; `summary()` returns the aggregate.
+    Memory stays bounded in a long-running server: per-agent totals are kept
+    as running sums and only the last `recent` call records are retained.
+    """
+
+    def __init__(self, verbose: bool = True, recent: int = RECENT_CALLS):
+        self.verbose = verbose
+        self.calls = deque(maxlen=recent)
+        self.total_calls = 0
+        self._totals = {}
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        agent_name = metadata.get("lc_agent_name") or metadata.get("langgraph_node") or "unknown"
+        with self._lock:
+            self._agents[run_id] = agent_name
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            agent_name = self._agents.pop(run_id, "unknown")
+
+        usage = _usage_from_result(response)
+        if usage is None:
+            return
+
+        input_tokens = usage.get("input_tokens", 0) or 0
+        details = usage.get("input_token_details") or {}
+        cached = details.get("cache_read", 0) or 0
+        record = {
+            "agent": agent_name,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": max(input_tokens - cached, 0),
+            "output_tokens": usage.get("output_tokens", 0) or 0,
+        }
+        with self._lock:
+            self.calls.append(record)
+            self.total_calls += 1
+            totals = self._totals.setdefault(
+                agent_name, {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "uncached_tokens": 0}
+            )
+            totals["calls"] += 1
+            for key in ("input_tokens", "cached_tokens", "uncached_tokens"):
+                totals[key] += record[key]
+
+        if self.verbose:
+            ratio = (cached / input_tokens * 100) if input_tokens else 0.0
+            print(
+                f"DEBUG: Prompt cache [{agent_name}]: {cached}/{input_tokens} prompt tokens cached "
+                f"({ratio:.0f}%), {record['uncached_tokens']} uncached"
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._agents.pop(run_id, None)
+
+    def summary(self) -> dict:
+        """Aggregate cached/uncached prompt tokens per agent."""
+        with self._lock:
+            return {agent: dict(totals) for agent, totals in self._totals.items()}
+
+
+def _usage_from_result(response):
+    """Return the `usage_metadata` dict of the first generation, if any."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return usage
+    return None
+
+
+# Shared instance used by agent.py and reported by the server
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,171 @@
+"""OpenTelemetry Tracing.
+
+Builds one trace per chat request: the HTTP request span (created in
+`server.py`) is the root, with child spans for every LangGraph node, deep-agent
+sub-agent `task`, tool call and chat model call, so a slow RFP run shows up as
+a waterfall of its critical path.
+
+Exporters are picked from the environment:
+    OTEL_EXPORTER_OTLP_ENDPOINT: send spans to an OTLP/HTTP collector
+    RFP_TRACE_FILE: append spans as JSON lines to a local file
+Without either, tracing is a no-op.
+"""
+
+import json
+import os
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+TRACER_NAME = "rfp-agent"
+_setup_lock = threading.Lock()
+_configured = False
+
+
+def setup_tracing(service_name: str = "rfp-agent") -> bool:
+    """Install the tracer provider and exporters once per process.
+
+    Returns:
+        True when an exporter is configured, False when tracing is disabled
+    """
+    global _configured
+    with _setup_lock:
+        if _configured:
+            return True
+        otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+        trace_file = os.getenv("RFP_TRACE_FILE")
+        if not otlp_endpoint and not trace_file:
+            return False
+
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        if otlp_endpoint:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        if trace_file:
+            out = open(trace_file, "a", encoding="utf-8")
+            exporter = ConsoleSpanExporter(
+                out=out, formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n"
+            )
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+        return True
+
+
+def get_tracer():
+    return trace.get_tracer(TRACER_NAME)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turn LangChain callbacks of one run into OpenTelemetry spans.
+
+    Spans are parented through `parent_run_id`; runs that are not traced
+    themselves (internal chains inside a node) pass their parent span through.
+    The top of the run is parented to `parent_context` (the HTTP request span).
+    """
+
+    def __init__(self, parent_context=None):
+        self.parent_context = parent_context
+        self.tracer = get_tracer()
+        self._spans = {}
+        self._parents = {}
+        self._lock = threading.Lock()
+
+    def _context_for(self, parent_run_id):
+        with self._lock:
+            span = self._spans.get(parent_run_id) or self._parents.get(parent_run_id)
+        if span is None:
+            return self.parent_context
+        return trace.set_span_in_context(span)
+
+    def _start_span(self, run_id, parent_run_id, name, attributes):
+        span = self.tracer.start_span(name, context=self._context_for(parent_run_id), attributes=attributes)
+        with self._lock:
+            self._spans[run_id] = span
+        return span
+
+    def _pass_through(self, run_id, parent_run_id):
+        with self._lock:
+            parent = self._spans.get(parent_run_id) or self._parents.get(parent_run_id)
+            if parent is not None:
+                self._parents[run_id] = parent
+
+    def _end_span(self, run_id, error=None, attributes=None):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if attributes:
+            span.set_attributes(attributes)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        span.end()
+
+    # Graph nodes -----------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, name=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        run_name = name or (serialized or {}).get("name")
+        if parent_run_id is None:
+            self._start_span(run_id, parent_run_id, f"graph {run_name or 'run'}", {"rfp.thread_id": str(
+                metadata.get("thread_id", ""))})
+        elif node and run_name == node:
+            self._start_span(run_id, parent_run_id, f"node {node}", {"langgraph.node": node,
+                             "langgraph.step": metadata.get("langgraph_step", -1)})
+        else:
+            self._pass_through(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_span(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_span(run_id, error)
+
+    # Tools and sub-agents ------------------------------------------------------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, inputs=None, **kwargs):
+        tool_name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        attributes = {"tool.name": tool_name}
+        name = f"tool {tool_name}"
+        if tool_name == "task":
+            subagent = (inputs or {}).get("subagent_type", "unknown")
+            attributes["rfp.subagent"] = subagent
+            name = f"subagent {subagent}"
+        self._start_span(run_id, parent_run_id, name, attributes)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_span(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_span(run_id, error)
+
+    # LLM calls ---------------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self._start_span(run_id, parent_run_id, f"llm {model}", {"gen_ai.request.model": model})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        attributes = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    attributes = {
+                        "gen_ai.usage.input_tokens": usage.get("input_tokens", 0) or 0,
+                        "gen_ai.usage.output_tokens": usage.get("output_tokens", 0) or 0,
+                    }
+        self._end_span(run_id, attributes=attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end_span(run_id, error)
@@ -0,0 +1,328 @@
+"""Resumable Pipeline Stages.
+
+The RFP flow runs as three delegated stages - sales (select and convert the
+RFP), technical (match products), pricing - each leaving artifacts in
+/memories/. After every stage a record stores the fingerprint of its inputs
+and the digests of the artifacts it produced. When the orchestrator delegates
+a stage whose inputs have not changed and whose outputs are intact, the stage
+is skipped and its previous result returned, so a retried run resumes at the
+first stale or failed stage instead of re-converting and re-matching.
+
+A stage's input fingerprint covers:
+- its configuration: system prompt, model and tools
+- the orchestrator's task description for the delegation
+- external data, e.g. the product catalog CSV of the technical stage
+- upstream artifacts (selected outputs of the stages it depends on), by
+  content digest
+- for the first stage, the user's request and today's date
+
+Records are scoped to the conversation thread: a stage is only reused, and
+upstream outputs only read, from runs of the same thread.
+
+The orchestrator's own contextual summaries are derived from the RFP
+document, which is fingerprinted instead, so rewording them does not
+invalidate downstream stages.
+
+Records are kept in `agent_memories/.stages.json`; set RFP_STAGE_CACHE=0 to
+always run every stage.
+
+Usage:
+    python -m pipeline.stages status
+    python -m pipeline.stages clear [stage]
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from os import getenv
+from typing import Callable
+
+from storage.artifacts import MEMORY_DIR, get_artifact_store
+
+STAGE_CACHE = getenv("RFP_STAGE_CACHE", "1") != "0"
+STAGES_FILE = os.path.join(MEMORY_DIR, ".stages.json")
+# Records kept per stage (one per distinct thread and input fingerprint)
+MAX_RECORDS = 100
+
+
+@dataclass
+class StageSpec:
+    """A pipeline stage (a sub-agent) and what its result depends on.
+
+    Attributes:
+        name: Sub-agent name used in `task` calls
+        outputs: Artifact name patterns the stage writes
+        required: Artifacts that must exist for the stage to count as successful
+        depends: Upstream stage name -> patterns of its outputs this stage reads
+        external: Callables returning a fingerprint of external inputs
+        config: Text identifying the stage's prompt, model and tools
+        uses_request: Whether the user's request and date select the stage's work
+    """
+
+    name: str
+    outputs: tuple = ()
+    required: tuple = ()
+    depends: dict = field(default_factory=dict)
+    external: tuple = ()
+    config: str = ""
+    uses_request: bool = False
+
+
+def file_digest(path: str) -> Callable[[], str]:
+    """External input: the content digest of a local file ("missing" if absent)."""
+    def digest():
+        try:
+            with open(path, "rb") as f:
+                return f"{path}:{hashlib.sha256(f.read()).hexdigest()}"
+        except FileNotFoundError:
+            return f"{path}:missing"
+    return digest
+
+
+def data_output(name: str, fn: Callable[[], object]) -> Callable[[], str]:
+    """External input: the data `fn` returns (e.g. the pending RFP list).
+
+    `fn` must be free of side effects: it runs on every delegation, so pass
+    the data source rather than a tool that, say, starts downloads.
+    """
+    return lambda: f"{name}:{fn()}"
+
+
+def stage_config(spec: dict) -> str:
+    """Configuration text of a deepagents sub-agent spec."""
+    model = spec.get("model")
+    model_name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+    tools = ",".join(sorted(t.name for t in spec.get("tools", [])))
+    return f"{spec.get('system_prompt', '')}\n{model_name}\n{tools}"
+
+
+class StageStore:
+    """Stage records in a JSON file, newest last per stage."""
+
+    def __init__(self, path: str = STAGES_FILE):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save(self, records: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def put(self, stage: str, record: dict):
+        """Add `record` as the stage's newest, replacing one with the same fingerprint."""
+        with self._lock:
+            records = self.load()
+            history = [r for r in records.get(stage, []) if r["fingerprint"] != record["fingerprint"]]
+            records[stage] = (history + [record])[-MAX_RECORDS:]
+            self._save(records)
+
+    def clear(self, stage: str = None):
+        with self._lock:
+            records = self.load()
+            if stage is None:
+                records = {}
+            else:
+                records.pop(stage, None)
+            self._save(records)
+
+
+class PipelineStages:
+    """Fingerprints, freshness checks and records for a set of stages.
+
+    Args:
+        specs: StageSpecs of the pipeline
+        store: Where records are kept
+        artifacts: ArtifactStore holding the stages' outputs
+    """
+
+    def __init__(self, specs, store: StageStore = None, artifacts=None):
+        self.specs = {spec.name: spec for spec in specs}
+        self.store = store or StageStore()
+        self.artifacts = artifacts or get_artifact_store()
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def _latest_ok(self, stage: str, records: dict, thread: str):
+        for record in reversed(records.get(stage, [])):
+            if record["status"] == "ok" and record.get("thread", "") == thread:
+                return record
+        return None
+
+    def fingerprint(self, name: str, request: str = "", description: str = "", thread: str = "") -> str:
+        """Fingerprint of everything stage `name` reads.
+
+        Args:
+            name: Stage name
+            request: The user's request (used by stages with `uses_request`)
+            description: The task description the stage is delegated with
+            thread: Conversation thread; upstream outputs are those of its runs
+        """
+        spec = self.specs[name]
+        records = self.store.load()
+        h = hashlib.sha256(f"{name}\n{spec.config}\nthread:{thread}\ntask:{description}".encode())
+        if spec.uses_request:
+            h.update(f"\nrequest:{request}\ndate:{date.today().isoformat()}".encode())
+        for external in spec.external:
+            h.update(f"\nexternal:{external()}".encode())
+        for upstream, patterns in sorted(spec.depends.items()):
+            record = self._latest_ok(upstream, records, thread)
+            names = sorted(n for n in (record or {}).get("outputs", {}) if any(fnmatch.fnmatch(n, p) for p in patterns))
+            for artifact in names:
+                info = self.artifacts.stat(artifact)
+                h.update(f"\n{upstream}:{artifact}:{info.digest if info else 'missing'}".encode())
+            if record is None:
+                h.update(f"\n{upstream}:not run".encode())
+        return h.hexdigest()
+
+    def _intact(self, record: dict) -> bool:
+        for artifact, digest in record["outputs"].items():
+            info = self.artifacts.stat(artifact)
+            if info is None or info.digest != digest:
+                return False
+        return True
+
+    def fresh(self, name: str, fingerprint: str, thread: str = ""):
+        """The stage's successful record for `fingerprint` in `thread` if its outputs are intact, else None."""
+        if not STAGE_CACHE:
+            return None
+        for record in self.store.load().get(name, []):
+            if record["fingerprint"] == fingerprint and record.get("thread", "") == thread \
+                    and record["status"] == "ok" and self._intact(record):
+                return record
+        return None
+
+    def reuse(self, name: str, record: dict):
+        """Mark a fresh record as the stage's latest (downstream stages read its outputs)."""
+        self.store.put(name, {**record, "reused": time.time()})
+
+    def _matching(self, spec: StageSpec) -> dict:
+        return {
+            n: info for n, info in self.artifacts.entries().items()
+            if any(fnmatch.fnmatch(n, p) for p in spec.outputs)
+        }
+
+    def begin(self, name: str) -> dict:
+        """Snapshot of the stage's output artifacts before it runs."""
+        return {"started": time.time(), "before": self._matching(self.specs[name])}
+
+    def finish(self, name: str, fingerprint: str, snapshot: dict, result: str = None, error: str = None,
+               thread: str = "") -> dict:
+        """Record a stage run; it failed if it raised or did not write a required artifact.
+
+        Outputs are the artifacts matching the stage's patterns that were
+        written while it ran: new, changed, or rewritten (a rewrite with the
+        same content still updates the modification time). Artifacts left
+        over from earlier runs do not count, so a required one the run did
+        not write makes it fail.
+        """
+        spec = self.specs[name]
+        after = self._matching(spec)
+        outputs = {
+            n: info.digest for n, info in after.items()
+            if info.digest and snapshot["before"].get(n) != info
+        }
+        missing = [n for n in spec.required if n not in outputs]
+        if error is None and missing:
+            error = f"did not write: {', '.join(missing)}"
+        record = {
+            "fingerprint": fingerprint,
+            "thread": thread,
+            "status": "failed" if error else "ok",
+            "error": error,
+            "result": result,
+            "outputs": outputs,
+            "started": snapshot["started"],
+            "finished": time.time(),
+        }
+        self.store.put(name, record)
+        return record
+
+    def status(self) -> dict:
+        """Latest record of each stage (without the result text)."""
+        records = self.store.load()
+        return {
+            name: {k: v for k, v in records[name][-1].items() if k != "result"} if records.get(name) else None
+            for name in self.specs
+        }
+
+
+def rfp_stages(subagents: list, pending_rfps: Callable[[], list]) -> list:
+    """StageSpecs of the sales -> technical -> pricing flow.
+
+    Args:
+        subagents: The deepagents sub-agent specs (for their configuration)
+        pending_rfps: Returns the pending RFP list the sales stage chooses from
+
+    Returns:
+        List of StageSpec
+    """
+    configs = {spec["name"]: stage_config(spec) for spec in subagents}
+    rfp_document = ("doc_*.md",)
+    return [
+        StageSpec(
+            name="sales-agent",
+            outputs=("sales_analysis.txt", "doc_*.md"),
+            required=("sales_analysis.txt",),
+            external=(data_output("pending_rfps", pending_rfps),),
+            config=configs.get("sales-agent", ""),
+            uses_request=True,
+        ),
+        StageSpec(
+            name="technical-agent",
+            outputs=("technical_evaluation.md",),
+            required=("technical_evaluation.md",),
+            depends={"sales-agent": rfp_document},
+            external=(file_digest("artifacts/Product_datasheet.csv"),),
+            config=configs.get("technical-agent", ""),
+        ),
+        StageSpec(
+            name="pricing-agent",
+            outputs=("pricing_analysis.md",),
+            required=("pricing_analysis.md",),
+            depends={"sales-agent": rfp_document, "technical-agent": ("technical_evaluation.md",)},
+            external=(file_digest("artifacts/product_price.csv"),),
+            config=configs.get("pricing-agent", ""),
+        ),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or reset the pipeline stage records.")
+    parser.add_argument("--file", default=STAGES_FILE, help="Stage records (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Latest record of every stage")
+    clear_parser = commands.add_parser("clear", help="Forget records so stages run again")
+    clear_parser.add_argument("stage", nargs="?", help="Only this stage")
+    args = parser.parse_args(argv)
+
+    store = StageStore(args.file)
+    if args.command == "clear":
+        store.clear(args.stage)
+        print(f"Cleared {args.stage or 'all stages'}")
+        return
+    for stage, history in store.load().items():
+        latest = history[-1]
+        finished = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(latest["finished"]))
+        print(f"{stage:<16} {latest['status']:<7} {finished}  thread: {latest.get('thread') or '-'}  outputs: {', '.join(latest['outputs']) or '-'}"
+              + (f"  error: {latest['error']}" if latest["error"] else ""))
+
+
+if __name__ == "__main__":
+    main()
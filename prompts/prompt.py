@@ -296,8 +296,8 @@ SALES_AGENT_INSTRUCTIONS = """
 You are a sales expert analyzing RFPs. You have tools like `get_pending_rfps` to find RFPs and `docling_convert` to convert documents to markdown. You will be instructed by the main agent to do the following tasks.
 Your tasks are:
             1. Scan the RFPs using `get_pending_rfps` tool, it will return a list of RFPs with source link, due_date and status.
-            2. Choose the most relevant RFP which is due in next 3 months. Todays date is {date}
-            3. Convert the RFP document to markdown using `docling_convert` tool, it will return a whole markdown
+            2. Choose the most relevant RFP which is due in next 3 months. Todays date is given in the Run Context section at the end of these instructions.
+            3. Convert the RFP document to markdown using `docling_convert` tool, it will return a whole markdown (if the RFP has several documents, use `ingest_rfp_bundle` with all of them instead: it saves one indexed markdown bundle)
             4. write the whole exact markdown in rfp_document.md in your memory.
             5. Use `write_todos` to plan analysis, dont make more than 3 steps. 
             6. Write analysis to /memories/sales_analysis.txt
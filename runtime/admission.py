@@ -0,0 +1,252 @@
+"""Admission Control for Chat Runs.
+
+Every chat run (streamed or background job) needs a run slot before the
+agent starts. The controller enforces:
+
+- a global cap on concurrently running agents (RFP_MAX_CONCURRENT_RUNS)
+- a per-tenant token bucket on new requests (RFP_RATE_PER_MINUTE, RFP_RATE_BURST)
+- a bounded wait queue (RFP_MAX_QUEUED_RUNS), served round-robin across
+  tenants so one busy tenant cannot starve the others
+
+A tenant is the `X-Tenant-ID` header, falling back to the thread id. A
+tenant's bucket is dropped once it has been idle long enough to refill,
+so arbitrary header values cannot grow the table.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from os import getenv
+from typing import Optional
+
+from observability.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+MAX_CONCURRENT_RUNS = int(getenv("RFP_MAX_CONCURRENT_RUNS", "4"))
+MAX_QUEUED_RUNS = int(getenv("RFP_MAX_QUEUED_RUNS", "32"))
+RATE_PER_MINUTE = float(getenv("RFP_RATE_PER_MINUTE", "10"))
+RATE_BURST = int(getenv("RFP_RATE_BURST", "5"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request may not run now (maps to HTTP 429).
+
+    Args:
+        reason: "rate_limited" or "queue_full"
+        retry_after: Seconds after which retrying is expected to succeed
+        queue_depth: Runs waiting when the request was refused
+    """
+
+    def __init__(self, reason: str, retry_after: float, queue_depth: int = 0):
+        super().__init__(f"{reason}, retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def idle(self, now: float) -> bool:
+        """Whether the bucket has refilled, i.e. is no different from a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def take(self) -> float:
+        """Take one token; return 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Ticket:
+    """A request's place in the admission queue; `release()` it when the run ends."""
+
+    def __init__(self, controller, tenant: str, source: str):
+        self.controller = controller
+        self.tenant = tenant
+        self.source = source
+        self.enqueued = time.monotonic()
+        self.granted = asyncio.get_running_loop().create_future()
+        self.released = False
+
+    @property
+    def position(self) -> Optional[int]:
+        """1-based position in the fair queue, None once admitted."""
+        return self.controller.position(self)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to `timeout` seconds for a run slot; return True once admitted."""
+        if not self.granted.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self.granted), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def release(self):
+        """Free the run slot, or leave the queue if not admitted yet."""
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """Global run slots, per-tenant rate limits and a fair wait queue.
+
+    Args:
+        max_concurrent: Runs allowed to execute at the same time
+        max_queued: Requests allowed to wait for a slot before 429
+        rate_per_minute: Sustained new requests per tenant (0 disables)
+        burst: Requests a tenant may make at once before the rate applies
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_RUNS,
+        max_queued: int = MAX_QUEUED_RUNS,
+        rate_per_minute: float = RATE_PER_MINUTE,
+        burst: int = RATE_BURST,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.active = 0
+        # tenant -> TokenBucket, least recently used first
+        self._buckets = OrderedDict()
+        # tenant -> deque of waiting tickets; the order of keys is the round-robin order
+        self._waiting = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    def check_rate(self, tenant: str):
+        """Consume one request from the tenant's bucket or raise AdmissionRejected."""
+        if self.rate <= 0:
+            return
+        self._evict_buckets()
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            bucket = self._buckets[tenant] = TokenBucket(self.rate, self.burst)
+        self._buckets.move_to_end(tenant)
+        retry_after = bucket.take()
+        if retry_after:
+            ADMISSION_REJECTED.labels(reason="rate_limited").inc()
+            raise AdmissionRejected("rate_limited", retry_after, self.queued)
+
+    def _evict_buckets(self):
+        # Refilled buckets are dropped; the least recently used come first,
+        # so stop at the first one still refilling
+        now = time.monotonic()
+        while self._buckets:
+            tenant, bucket = next(iter(self._buckets.items()))
+            if not bucket.idle(now):
+                break
+            del self._buckets[tenant]
+
+    def check_queue(self):
+        """Raise AdmissionRejected if a new request would have to wait and the queue is full."""
+        if self.active < self.max_concurrent and not self._waiting:
+            return
+        if self.queued >= self.max_queued:
+            ADMISSION_REJECTED.labels(reason="queue_full").inc()
+            # Rough estimate: one slot frees up per minute
+            raise AdmissionRejected("queue_full", 60 * self.queued / max(self.max_concurrent, 1), self.queued)
+
+    def admit(self, tenant: str, source: str = "chat", rate_limit: bool = True, bounded: bool = True) -> Ticket:
+        """Rate-check a request and queue it for a run slot.
+
+        Args:
+            tenant: Rate limit and fairness key
+            source: Label for the wait-time metric ("chat", "job")
+            rate_limit: Apply the tenant's token bucket
+            bounded: Refuse if the wait queue is full (jobs are already queued
+                by the job manager and skip this)
+
+        Returns:
+            A Ticket; await `ticket.wait()` before running, then `release()` it
+
+        Raises:
+            AdmissionRejected: If rate limited or the queue is full
+        """
+        if rate_limit:
+            self.check_rate(tenant)
+        ticket = Ticket(self, tenant, source)
+        if self.active < self.max_concurrent and not self._waiting:
+            self._grant(ticket)
+            return ticket
+        if bounded:
+            self.check_queue()
+        self._waiting.setdefault(tenant, deque()).append(ticket)
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+        return ticket
+
+    def position(self, ticket: Ticket) -> Optional[int]:
+        if ticket.granted.done():
+            return None
+        queue = self._waiting.get(ticket.tenant)
+        if not queue or ticket not in queue:
+            return None
+        # Round-robin order: everyone's 1st ticket, then everyone's 2nd, ...
+        rank = queue.index(ticket)
+        position = 1
+        seen = False
+        for tenant, waiting in self._waiting.items():
+            position += min(len(waiting), rank)
+            if tenant == ticket.tenant:
+                seen = True
+            elif not seen and len(waiting) > rank:
+                position += 1
+        return position
+
+    def _grant(self, ticket):
+        self.active += 1
+        ADMISSION_ACTIVE.set(self.active)
+        ADMISSION_WAIT.labels(source=ticket.source).observe(time.monotonic() - ticket.enqueued)
+        ticket.granted.set_result(True)
+
+    def _release(self, ticket):
+        if ticket.granted.done():
+            self.active -= 1
+            ADMISSION_ACTIVE.set(self.active)
+        else:
+            # Gave up while queued (client disconnected, job cancelled)
+            queue = self._waiting.get(ticket.tenant)
+            if queue and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._waiting[ticket.tenant]
+            ticket.granted.cancel()
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.max_concurrent and self._waiting:
+            tenant, queue = next(iter(self._waiting.items()))
+            ticket = queue.popleft()
+            # Served tenant goes to the back of the rotation
+            del self._waiting[tenant]
+            if queue:
+                self._waiting[tenant] = queue
+            self._grant(ticket)
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+
+    def snapshot(self) -> dict:
+        """Current slots and queue, for the status endpoint."""
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "queued_by_tenant": {tenant: len(q) for tenant, q in self._waiting.items()},
+            "rate_buckets": len(self._buckets),
+        }
@@ -0,0 +1,97 @@
+"""Append-only Event Log.
+
+Each background job writes its NDJSON stream events to `<job_id>.ndjson`.
+Lines are never rewritten, so a client can re-attach at any time and resume
+from the number of lines it already received (the offset). Writes run in a
+worker thread on a file kept open for the job's lifetime, so a slow disk
+does not stall the event loop.
+"""
+
+import asyncio
+import os
+
+
+class EventLog:
+    """NDJSON file with an in-memory line index and live followers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.closed = False
+        self._positions = []
+        self._size = 0
+        self._file = None
+        self._write_lock = asyncio.Lock()
+        self._changed = asyncio.Condition()
+        if os.path.exists(path):
+            # Existing log from a previous server run: index it, append nothing more
+            with open(path, "rb") as f:
+                for line in f:
+                    self._positions.append(self._size)
+                    self._size += len(line)
+            self.closed = True
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _write(self, line: bytes):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(line)
+        # Followers read the file: the line must be there before they are woken
+        self._file.flush()
+
+    async def append(self, line: bytes):
+        """Append one encoded event (a newline-terminated NDJSON line)."""
+        if self.closed:
+            raise ValueError(f"Event log {self.path} is closed")
+        async with self._write_lock:
+            await asyncio.to_thread(self._write, line)
+            self._positions.append(self._size)
+            self._size += len(line)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def close(self):
+        """Mark the log complete; followers stop once they reach the end."""
+        self.closed = True
+        async with self._write_lock:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def follow(self, offset: int = 0, is_disconnected=None, poll_seconds: float = 1.0):
+        """Yield lines from `offset` on, waiting for new ones until the log closes.
+
+        Args:
+            offset: Index of the first line to send
+            is_disconnected: Optional async callable; following stops once it
+                returns True
+            poll_seconds: How often to check for a disconnect while idle
+
+        Yields:
+            Encoded NDJSON lines
+        """
+        offset = max(offset, 0)
+        while True:
+            if offset < len(self._positions):
+                end = len(self._positions)
+                with open(self.path, "rb") as f:
+                    f.seek(self._positions[offset])
+                    for _ in range(end - offset):
+                        yield f.readline()
+                offset = end
+                continue
+            if self.closed:
+                return
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.closed or offset < len(self._positions)),
+                        timeout=poll_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            if is_disconnected is not None and await is_disconnected():
+                return
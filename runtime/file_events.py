@@ -0,0 +1,179 @@
+"""Memory File Change Events.
+
+Pushes created / modified / deleted events for files in `agent_memories`
+(with a unified diff against the previous version) to subscribers, driven by
+the watch events of `runtime.files.FileIndex`, so UIs no longer poll
+`/api/files` to notice `technical_evaluation.md` or `final_rfp_response.md`.
+
+Events can be scoped to a conversation thread: `FileClaimCallbackHandler`
+records which thread's tool calls wrote which /memories/ file.
+
+Events are built (files read and diffed) in a worker thread, one change at
+a time and in order, so the event loop never waits on them. Previous
+versions are only kept while someone is subscribed.
+"""
+
+import asyncio
+import difflib
+from collections import defaultdict
+from os import getenv
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from runtime.files import FileIndex, artifact_etag
+
+MEMORY_PREFIX = "/memories/"
+WRITE_TOOLS = ("write_file", "edit_file")
+# Larger files are announced without content or diff; fetch them via /api/files/{name}/raw
+DIFF_MAX_BYTES = int(getenv("RFP_FILE_DIFF_MAX_BYTES", "262144"))
+SUBSCRIBER_QUEUE = 256
+
+
+class FileEventHub:
+    """Fan-out of file change events to per-thread subscribers.
+
+    Args:
+        index: Watched index whose changes are published
+    """
+
+    def __init__(self, index: FileIndex):
+        self.index = index
+        self.owners = defaultdict(set)
+        self._snapshots = {}
+        self._subscribers = set()
+        self._changes = None
+        self._builder = None
+        index.listeners.append(self.publish)
+
+    def claim(self, path: str, thread_id: str):
+        """Record that `thread_id` writes the /memories/ file `path`."""
+        if path.startswith(MEMORY_PREFIX):
+            self.owners[path[len(MEMORY_PREFIX):]].add(thread_id)
+
+    def _read(self, name):
+        info = self.index.stat(name)
+        try:
+            if info is None or info.size > DIFF_MAX_BYTES:
+                return None
+            return self.index.read(name, info)
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _event(self, change, name):
+        event = {"type": f"file_{change}", "file": name, "threads": sorted(self.owners.get(name, ()))}
+        previous = self._snapshots.pop(name, None)
+        if change == "deleted":
+            self.owners.pop(name, None)
+            return event
+        info = self.index.stat(name)
+        if info is None:
+            raise FileNotFoundError(name)
+        event.update(size=info.size, etag=artifact_etag(info))
+        content = self._read(name)
+        if content is None:
+            return event
+        self._snapshots[name] = content
+        if previous is None:
+            event["content"] = content
+        else:
+            event["diff"] = "".join(difflib.unified_diff(
+                previous.splitlines(keepends=True), content.splitlines(keepends=True),
+                fromfile=f"a/{name}", tofile=f"b/{name}",
+            ))
+        return event
+
+    def publish(self, change: str, name: str):
+        """FileIndex listener: queue the change for the event builder (never blocks)."""
+        if not self._subscribers:
+            # Nobody listening: nothing to read or diff
+            self._snapshots.pop(name, None)
+            if change == "deleted":
+                self.owners.pop(name, None)
+            return
+        if self._changes is None:
+            self._changes = asyncio.Queue()
+        self._changes.put_nowait((change, name))
+        if self._builder is None or self._builder.done():
+            self._builder = asyncio.get_running_loop().create_task(self._build_events())
+
+    async def _build_events(self):
+        while not self._changes.empty():
+            change, name = self._changes.get_nowait()
+            try:
+                event = await asyncio.to_thread(self._event, change, name)
+            except FileNotFoundError:
+                continue
+            for subscriber in list(self._subscribers):
+                if subscriber.thread_id is None or subscriber.thread_id in event["threads"]:
+                    subscriber.put(event)
+
+    def snapshot_all(self):
+        """Remember current file contents so the first change can be diffed."""
+        for name in self.index.entries():
+            content = self._read(name)
+            if content is not None:
+                self._snapshots[name] = content
+
+    async def subscribe(self, thread_id: Optional[str] = None, keepalive: Optional[float] = None):
+        """Yield change events (all files, or those written by `thread_id`).
+
+        Args:
+            thread_id: Only files claimed by this thread; None for every file
+            keepalive: If set, yield None after this many idle seconds so the
+                caller can send a heartbeat
+
+        Yields:
+            Event dicts; {"type": "resync"} if events were dropped because
+            the subscriber fell behind
+        """
+        subscriber = _Subscriber(thread_id)
+        if not self._subscribers:
+            # First subscriber: start keeping versions to diff against
+            await asyncio.to_thread(self.snapshot_all)
+        self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if subscriber.overflowed and subscriber.queue.empty():
+                    subscriber.overflowed = False
+                yield event
+        finally:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                self._snapshots.clear()
+
+
+class _Subscriber:
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.overflowed = False
+
+    def put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop further events until the client catches up and re-fetches
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class FileClaimCallbackHandler(BaseCallbackHandler):
+    """Attributes /memories/ files written by a run's tool calls to its thread."""
+
+    def __init__(self, hub: FileEventHub, thread_id: str):
+        self.hub = hub
+        self.thread_id = thread_id
+
+    def on_tool_start(self, serialized, input_str, *, inputs=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name")
+        if name in WRITE_TOOLS and isinstance(inputs, dict):
+            self.hub.claim(inputs.get("file_path") or "", self.thread_id)
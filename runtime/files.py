@@ -0,0 +1,164 @@
+"""Agent Memory File Index.
+
+In-memory index of the artifacts in `agent_memories` (the /memories/ route,
+stored compressed by `storage.artifacts`) used by the `/api/files` endpoints:
+
+- listing is served from the index instead of re-reading the manifest per poll
+- the index is kept current by filesystem watch events (watchfiles) when
+  available, otherwise re-scanned whenever the directory mtime changes
+- ETag / Last-Modified helpers so pollers get 304 Not Modified
+- listeners are told about every created / modified / deleted file (see
+  runtime.file_events)
+"""
+
+import asyncio
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+
+try:
+    from watchfiles import awatch
+except ImportError:  # fall back to directory mtime checks
+    awatch = None
+
+from storage.artifacts import MEMORY_DIR, get_artifact_store
+
+
+def artifact_etag(info) -> str:
+    """ETag of an artifact version: its content digest, or the file formula for plain files."""
+    if info.digest:
+        return f'"{info.digest[:32]}"'
+    base = f"{info.mtime}-{info.size}"
+    return f'"{hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def not_modified(headers, etag: str, mtime: float = None) -> bool:
+    """True if the request's conditional headers match the current version.
+
+    If-None-Match takes precedence; If-Modified-Since is only checked when
+    `mtime` is given.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@lru_cache(maxsize=32)
+def read_text(root: str, name: str, etag: str) -> str:
+    """Artifact content, cached per version (the ETag is part of the key)."""
+    return get_artifact_store(root).read(name)
+
+
+class FileIndex:
+    """Names, sizes, mtimes and digests of the artifacts in `root`."""
+
+    def __init__(self, root: str = MEMORY_DIR):
+        self.store = get_artifact_store(root)
+        self.root = self.store.root
+        self.watching = False
+        self._entries = None
+        self._dir_mtime = None
+        self._etag = None
+        self._stop = None
+        # Called with (change, name) for each watched change; change is
+        # "created", "modified" or "deleted"
+        self.listeners = []
+
+    def _scan(self):
+        if os.path.isdir(self.root):
+            # The manifest is replaced on every write, which bumps the directory mtime
+            self._dir_mtime = os.stat(self.root).st_mtime_ns
+        self._set(self.store.entries())
+
+    def _set(self, entries):
+        self._entries = entries
+        listing = "\n".join(f"{name}:{i.size}:{i.mtime}:{i.digest}" for name, i in sorted(entries.items()))
+        self._etag = f'"{hashlib.md5(listing.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def _current(self):
+        if self._entries is None:
+            self._scan()
+        elif not self.watching:
+            try:
+                mtime = os.stat(self.root).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._dir_mtime:
+                self._scan()
+        return self._entries
+
+    def entries(self) -> dict:
+        """Mapping of file name to ArtifactInfo (size, mtime, digest)."""
+        return dict(self._current())
+
+    @property
+    def etag(self) -> str:
+        """ETag of the whole listing."""
+        self._current()
+        return self._etag
+
+    def valid_name(self, filename: str) -> bool:
+        """False for names that escape the root or are reserved by the store."""
+        return self.store.valid_name(filename)
+
+    def stat(self, filename: str):
+        """ArtifactInfo of `filename`, or None if it does not exist."""
+        return self.store.stat(filename)
+
+    def read(self, filename: str, info=None) -> str:
+        """Content of `filename` (cached per version)."""
+        info = info or self.stat(filename)
+        if info is None:
+            raise FileNotFoundError(filename)
+        return read_text(self.root, filename, artifact_etag(info))
+
+    def apply(self, changes):
+        """Update the index from watchfiles `(Change, path)` events.
+
+        Any change in the root (manifest rewrite, plain file) triggers a
+        re-scan; listeners get the names whose version changed.
+        """
+        if not any(os.path.dirname(os.path.abspath(path)) == self.root for _, path in changes):
+            return
+        previous = dict(self._current())
+        self._scan()
+        events = [("deleted", name) for name in previous if name not in self._entries]
+        for name, info in self._entries.items():
+            if name not in previous:
+                events.append(("created", name))
+            elif previous[name] != info:
+                events.append(("modified", name))
+        for change, name in events:
+            for listener in self.listeners:
+                listener(change, name)
+
+    async def watch(self):
+        """Keep the index current from filesystem events until `stop()`."""
+        if awatch is None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._stop = asyncio.Event()
+        self._scan()
+        self.watching = True
+        try:
+            async for changes in awatch(self.root, stop_event=self._stop, recursive=False, debounce=200):
+                self.apply(changes)
+        finally:
+            self.watching = False
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
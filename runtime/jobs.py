@@ -0,0 +1,230 @@
+"""Background Chat Jobs.
+
+A job is a chat run that is decoupled from the HTTP connection which
+submitted it: `JobManager.submit` returns immediately, a bounded pool of
+worker tasks executes queued jobs, and each job's events go to an
+append-only `EventLog` that clients can follow from any offset.
+
+Configuration (environment):
+- RFP_JOB_WORKERS: concurrent job runs (default 2)
+- RFP_JOB_QUEUE: maximum queued jobs before submit is rejected (default 100)
+- RFP_JOBS_DIR: where event logs and job metadata are kept (default ./jobs)
+- RFP_JOB_RETENTION_DAYS: finished jobs older than this are deleted by
+  `JobManager.gc` (default 7, 0 keeps all)
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Optional
+
+from runtime.event_log import EventLog
+
+JOB_WORKERS = int(getenv("RFP_JOB_WORKERS", "2"))
+JOB_QUEUE = int(getenv("RFP_JOB_QUEUE", "100"))
+JOBS_DIR = getenv("RFP_JOBS_DIR", "./jobs")
+JOB_RETENTION_DAYS = float(getenv("RFP_JOB_RETENTION_DAYS", "7"))
+
+FINISHED = ("succeeded", "failed", "cancelled", "interrupted")
+
+
+class JobQueueFull(Exception):
+    """Raised by `JobManager.submit` when the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    id: str
+    log: EventLog
+    request: Any = None
+    thread_id: Optional[str] = None
+    status: str = "queued"
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def info(self) -> dict:
+        """Public description of the job (no request body or task handle)."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "thread_id": self.thread_id,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "events": len(self.log),
+        }
+
+
+class JobManager:
+    """Queue plus bounded worker pool for background chat runs.
+
+    Args:
+        runner: Async callable `runner(job)` that executes the job and appends
+            its events to `job.log`
+        workers: Number of jobs run concurrently
+        max_queued: Jobs allowed to wait before `submit` raises JobQueueFull
+        root: Directory for event logs and job metadata
+    """
+
+    def __init__(self, runner, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE, root: str = JOBS_DIR):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.root = root
+        self.jobs = {}
+        # Jobs waiting to run (cancelled ones stay in the asyncio queue but not here)
+        self._waiting = 0
+        self._queue = None
+        self._worker_tasks = []
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Recover jobs of earlier server runs; unfinished ones are marked interrupted."""
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                meta = json.load(f)
+            job = Job(id=meta["job_id"], log=EventLog(self._log_path(meta["job_id"])))
+            for key in ("status", "thread_id", "error", "created", "started", "finished"):
+                setattr(job, key, meta.get(key))
+            if job.status not in FINISHED:
+                job.status = "interrupted"
+                self._save(job)
+            self.jobs[job.id] = job
+
+    def _log_path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.ndjson")
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def _save(self, job):
+        with open(self._meta_path(job.id), "w", encoding="utf-8") as f:
+            json.dump(job.info(), f)
+
+    def _start_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, request, thread_id: Optional[str] = None) -> Job:
+        """Queue a run and return its job immediately.
+
+        Args:
+            request: Whatever the runner needs to execute the job
+            thread_id: Conversation thread, reported in the job info
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: If `max_queued` jobs are already waiting
+        """
+        self._start_workers()
+        if self._waiting >= self.max_queued:
+            raise JobQueueFull(f"{self._waiting} jobs already queued")
+        job_id = uuid.uuid4().hex
+        job = Job(id=job_id, log=EventLog(self._log_path(job_id)), request=request, thread_id=thread_id)
+        self.jobs[job_id] = job
+        self._save(job)
+        self._queue.put_nowait(job)
+        self._waiting += 1
+        print(f"DEBUG: Job {job_id} queued ({self._waiting} waiting)")
+        return job
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """1-based position among queued jobs, or None if not queued."""
+        if job.status != "queued":
+            return None
+        queued = [j for j in self.jobs.values() if j.status == "queued"]
+        return queued.index(job) + 1
+
+    async def cancel(self, job: Job) -> Job:
+        """Cancel a queued or running job."""
+        if job.status == "queued":
+            self._waiting -= 1
+            await self._finish(job, "cancelled")
+        elif job.status == "running" and job.task is not None:
+            job.task.cancel()
+            await job.done.wait()
+        return job
+
+    async def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job.request = None
+        # The last line of every job log is its final status
+        await job.log.append((json.dumps({"type": "job", "job_id": job.id, "status": status, "error": error}, separators=(",", ":")) + "\n").encode())
+        await job.log.close()
+        await asyncio.to_thread(self._save, job)
+        job.done.set()
+        print(f"DEBUG: Job {job.id} {status}")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != "queued":
+                continue
+            self._waiting -= 1
+            job.status = "running"
+            job.started = time.time()
+            await asyncio.to_thread(self._save, job)
+            job.task = asyncio.create_task(self.runner(job))
+            # Waiting (rather than awaiting the task) keeps a job cancellation from cancelling the worker
+            await asyncio.wait({job.task})
+            if job.task.cancelled():
+                await self._finish(job, "cancelled")
+            elif job.task.exception() is not None:
+                await self._finish(job, "failed", str(job.task.exception()))
+            else:
+                await self._finish(job, "succeeded")
+            job.task = None
+
+    async def gc(self, retention_days: float = JOB_RETENTION_DAYS, now: float = None) -> list:
+        """Delete finished jobs (metadata and event log) older than `retention_days`.
+
+        Returns:
+            Ids of the deleted jobs
+        """
+        if retention_days <= 0:
+            return []
+        now = time.time() if now is None else now
+        cutoff = now - retention_days * 86400
+        expired = [
+            job for job in self.jobs.values()
+            if job.status in FINISHED and (job.finished or job.created or 0) < cutoff
+        ]
+        for job in expired:
+            del self.jobs[job.id]
+
+        def remove():
+            for job in expired:
+                for path in (self._meta_path(job.id), self._log_path(job.id)):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        await asyncio.to_thread(remove)
+        if expired:
+            print(f"DEBUG: Job GC removed {len(expired)} finished job(s)")
+        return [job.id for job in expired]
+
+    async def shutdown(self):
+        """Cancel workers and running jobs (server shutdown)."""
+        for job in self.jobs.values():
+            if job.task is not None:
+                job.task.cancel()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
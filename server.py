@@ -1,17 +1,33 @@
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
 import asyncio
-import os
+from contextlib import aclosing
+from os import getenv
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from langgraph.graph import StateGraph, END
+from observability.prompt_cache import prompt_cache_stats
+from observability.metrics import ACTIVE_STREAMS, STREAM_DISCONNECTS, MetricsCallbackHandler, render_metrics
+from observability.tracing import TracingCallbackHandler, get_tracer, setup_tracing
+from streaming.events import stream_agent_events
+from streaming.serialize import EventEncoder
+from streaming.coalesce import pump_events
+from runtime.jobs import JobManager, JobQueueFull
+from runtime.admission import AdmissionController, AdmissionRejected
+from runtime.files import MEMORY_DIR, FileIndex, artifact_etag, http_date, not_modified
+from runtime.file_events import FileClaimCallbackHandler, FileEventHub
+from storage.artifacts import RETENTION_DAYS, MAX_MB
+from storage.blobs import get_blob_store
+from llm.scheduler import BATCH, llm_priority, scheduler_snapshot
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind
 
 # Try to import agent, otherwise use a mock
+# (cheap: the agent itself is built on first use or by the startup warm-up)
 try:
-    from agent import agent
+    from agent import get_agent
 except ImportError:
     print("Warning: 'agent.py' not found. Using a mock agent for testing.")
     
@@ -19,6 +35,7 @@ except ImportError:
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
+setup_tracing()
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,82 +48,141 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     messages: List[Dict[str, Any]]
     thread_id: Optional[str] = None
+    # Optional server-side stream filters: event kinds ("token", "tool_start",
+    # "tool_end", "values") and agents ("orchestrator", "sales-agent", ...)
+    events: Optional[List[str]] = None
+    agents: Optional[List[str]] = None
 
-# Helper to serialize LangChain objects
-def _serialize(obj):
-    try:
-        # Check for LangGraph Command object specifically
-        if type(obj).__name__ == "Command":
-            # Try to extract message content from the updates
-            if hasattr(obj, "update") and isinstance(obj.update, dict):
-                messages = obj.update.get("messages", [])
-                if messages and isinstance(messages, list):
-                    # Return the content of the last message if available
-                    last_msg = messages[-1]
-                    if hasattr(last_msg, "content"):
-                        return last_msg.content
-            # Fallback for Command
-            return "Task Update processed."
-
-        if hasattr(obj, "model_dump"):
-            return obj.model_dump()
-        if hasattr(obj, "dict"):
-            return obj.dict()
-        
-        if isinstance(obj, list):
-            return [_serialize(item) for item in obj]
-        if isinstance(obj, dict):
-            return {k: _serialize(v) for k, v in obj.items()}
-            
-        if not isinstance(obj, (str, int, float, bool, type(None))):
-            return str(obj)
-        return obj
-    except Exception:
-        return str(obj)
+file_index = FileIndex(MEMORY_DIR)
+file_events = FileEventHub(file_index)
+
+@app.on_event("startup")
+async def warm_up_agent():
+    # Build the agent in the background so the server accepts connections at once
+    app.state.agent_warm_up = asyncio.create_task(asyncio.to_thread(get_agent))
+
+@app.on_event("startup")
+async def watch_files():
+    app.state.file_watch = asyncio.create_task(file_index.watch())
+
+@app.on_event("shutdown")
+async def stop_watching_files():
+    file_index.stop()
+
+# Retention policy of the agent_memories artifact store
+ARTIFACT_GC_HOURS = float(getenv("RFP_ARTIFACT_GC_HOURS", "24"))
+
+async def _collect_artifacts():
+    while True:
+        try:
+            await asyncio.to_thread(file_index.store.gc, RETENTION_DAYS, MAX_MB)
+        except OSError as e:
+            print(f"DEBUG: Artifact GC failed: {e}")
+        try:
+            await jobs.gc()
+        except OSError as e:
+            print(f"DEBUG: Job GC failed: {e}")
+        try:
+            await asyncio.to_thread(get_blob_store().gc)
+        except OSError as e:
+            print(f"DEBUG: Blob GC failed: {e}")
+        await asyncio.sleep(ARTIFACT_GC_HOURS * 3600)
+
+@app.on_event("startup")
+async def collect_artifacts():
+    if ARTIFACT_GC_HOURS > 0:
+        app.state.artifact_gc = asyncio.create_task(_collect_artifacts())
+
+@app.on_event("startup")
+async def compile_catalog():
+    # Workers then memory-map the compiled catalog instead of parsing the CSVs
+    from storage.catalog import compile_all
+
+    app.state.catalog_compile = asyncio.create_task(asyncio.to_thread(compile_all))
+
+def _file_headers(etag, mtime):
+    return {"ETag": etag, "Last-Modified": http_date(mtime), "Cache-Control": "no-cache"}
 
 @app.get("/api/files")
-async def list_files():
-    """List all files in the agent_memories directory."""
-    mem_dir = "./agent_memories"
-    if not os.path.exists(mem_dir):
-        return {"files": []}
-    
-    files = []
-    for f in os.listdir(mem_dir):
-        if os.path.isfile(os.path.join(mem_dir, f)):
-            files.append(f)
-    return {"files": files}
+async def list_files(http_request: Request):
+    """List all files in the agent_memories directory (304 if unchanged)."""
+    etag = file_index.etag
+    if not_modified(http_request.headers, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse({"files": sorted(file_index.entries())}, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-@app.get("/api/files/{filename}")
-async def get_file_content(filename: str):
-    """Get content of a specific file."""
-    mem_dir = "./agent_memories"
-    filepath = os.path.join(mem_dir, filename)
-    
+def _stat_file(filename: str):
     # Security check: ensure parsing path doesn't go outside
-    if not os.path.abspath(filepath).startswith(os.path.abspath(mem_dir)):
+    if not file_index.valid_name(filename):
         raise HTTPException(status_code=403, detail="Access denied")
-        
-    if not os.path.exists(filepath):
+    info = file_index.stat(filename)
+    if info is None:
         raise HTTPException(status_code=404, detail="File not found")
-        
+    return info
+
+@app.get("/api/files/events")
+async def file_events_sse(http_request: Request, thread_id: Optional[str] = None):
+    """
+    Server-sent events for created / modified / deleted memory files, with
+    diffs. With `thread_id`, only files written by that thread's runs.
+    """
+    async def event_stream():
+        encoder = EventEncoder()
+        async with aclosing(file_events.subscribe(thread_id, keepalive=15.0)) as events:
+            async for event in events:
+                if await http_request.is_disconnected():
+                    return
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: " + event["type"].encode() + b"\ndata: " + encoder.encode(event).rstrip(b"\n") + b"\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/ws/files")
+async def file_events_ws(websocket: WebSocket, thread_id: Optional[str] = None):
+    """WebSocket variant of /api/files/events: one JSON message per file event."""
+    await websocket.accept()
+    try:
+        async with aclosing(file_events.subscribe(thread_id, keepalive=15.0)) as events:
+            async for event in events:
+                await websocket.send_json(event if event is not None else {"type": "keepalive"})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/api/files/{filename}")
+async def get_file_content(filename: str, http_request: Request):
+    """Get content of a specific file (ETag / Last-Modified, 304 if unchanged)."""
+    info = _stat_file(filename)
+    etag = artifact_etag(info)
+    headers = _file_headers(etag, info.mtime)
+    if not_modified(http_request.headers, etag, info.mtime):
+        return Response(status_code=304, headers=headers)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        return {"filename": filename, "content": content}
+        content = file_index.read(filename, info)
+        return JSONResponse({"filename": filename, "content": content}, headers=headers)
     except Exception as e:
          return {"filename": filename, "content": f"Error reading file: {str(e)}"}
 
-@app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
+@app.get("/api/files/{filename}/raw")
+async def get_file_raw(filename: str, http_request: Request):
     """
-    Stream chat responses from the agent.
-    Returns a stream of JSON lines.
+    Stream a file as-is, e.g. large converted documents.
+    Supports Range requests and conditional GETs.
     """
-    
-    # Convert input messages to LangChain format explicitly
+    info = _stat_file(filename)
+    headers = _file_headers(artifact_etag(info), info.mtime)
+    if not_modified(http_request.headers, headers["ETag"], info.mtime):
+        return Response(status_code=304, headers=headers)
+    # Compressed artifacts are served from a decompressed cache copy
+    path = await asyncio.to_thread(file_index.store.materialize, filename)
+    media_type = "text/markdown; charset=utf-8" if filename.endswith(".md") else None
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def _convert_messages(messages):
+    """Convert input messages to LangChain format explicitly."""
     converted_messages = []
-    for m in request.messages:
+    for m in messages:
         role = m.get("role")
         content = m.get("content", "")
         if role in ["user", "human"]:
@@ -116,79 +192,243 @@ async def chat_endpoint(request: ChatRequest):
         elif role == "tool":
             # Tool messages need a tool_call_id, defaulting if missing (though strictly required)
             converted_messages.append(ToolMessage(content=content, tool_call_id=m.get("tool_call_id", "unknown")))
-    
-    inputs = {"messages": converted_messages}
-    
+    return converted_messages
+
+async def _run_chat(request: ChatRequest, span, is_disconnected=None, raise_errors=False):
+    """
+    Run the agent for a chat request and yield its NDJSON lines.
+    Always ends with a "done" line; ends `span` when finished.
+    With `raise_errors`, a failed run re-raises after its "error" line
+    (and sends no "done"), so a job is recorded as failed.
+    """
+    inputs = {"messages": _convert_messages(request.messages)}
+    span.set_attribute("rfp.messages", len(inputs["messages"]))
+
     # distinct thread_id for persistence if provided
-    config = {"configurable": {"thread_id": request.thread_id or "default_thread"}}
+    config = {
+        "configurable": {"thread_id": request.thread_id or "default_thread"},
+        # A full RFP run takes far more than LangGraph's default 25 steps
+        "recursion_limit": 1000,
+        "callbacks": [
+            MetricsCallbackHandler(),
+            TracingCallbackHandler(trace.set_span_in_context(span)),
+            FileClaimCallbackHandler(file_events, request.thread_id or "default_thread"),
+        ],
+    }
+
+    encoder = EventEncoder()
+    try:
+        # astream_events v2, subscribed only to the event kinds/agents the client wants
+        # Coalesced tokens, bounded buffering; the run is cancelled if the client leaves
+        events = pump_events(
+            stream_agent_events(get_agent(), inputs, config, kinds=request.events, agents=request.agents),
+            is_disconnected=is_disconnected,
+            on_disconnect=STREAM_DISCONNECTS.inc,
+        )
+        async with aclosing(events):
+            async for payload in events:
+                kind = payload["type"]
+                if kind == "tool_start":
+                    print(f"DEBUG: Tool Start: {payload['tool']}")
+                elif kind == "tool_end":
+                    print(f"DEBUG: Tool End: {payload['tool']}")
+                elif kind == "values":
+                    print("DEBUG: Updating Todos")
+                yield encoder.encode(payload)
+
+    except Exception as e:
+        print(f"Server Error: {e}")
+        import traceback
+        traceback.print_exc()
+        span.record_exception(e)
+        span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+        yield encoder.encode({"type": "error", "content": str(e)})
+        if raise_errors:
+            raise
+    finally:
+        span.end()
+
+    # Send a final done message
+    print("DEBUG: Stream Done")
+    yield encoder.encode({"type": "done"})
+
+admission = AdmissionController()
+
+def _tenant(request: ChatRequest, http_request: Request):
+    return http_request.headers.get("X-Tenant-ID") or request.thread_id or "default_thread"
+
+def _rejected(e: AdmissionRejected):
+    """429 with the reason, queue depth and a Retry-After hint."""
+    return HTTPException(
+        status_code=429,
+        detail={"reason": e.reason, "retry_after": round(e.retry_after, 1), "queue_depth": e.queue_depth},
+        headers={"Retry-After": str(max(1, round(e.retry_after)))},
+    )
+
+@app.post("/api/chat")
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Stream chat responses from the agent.
+    Returns a stream of JSON lines.
+    While waiting for a run slot, {"type": "queued", "position": N} lines are sent.
+    """
+    tenant = _tenant(request, http_request)
+    try:
+        admission.check_rate(tenant)
+        admission.check_queue()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+    # Root span of this run, continuing the caller's trace (W3C traceparent) if any.
+    # It stays open until the stream finishes.
+    request_span = get_tracer().start_span(
+        "POST /api/chat",
+        context=propagate.extract(http_request.headers),
+        kind=SpanKind.SERVER,
+        attributes={"rfp.thread_id": request.thread_id or "default_thread"},
+    )
 
     async def event_generator():
-        # stream_mode="events" or ["messages", "values"]
-        # We use ["messages", "values"] to get token-by-token and state updates
-        
+        # The run slot is only taken once the response is streaming, so a
+        # response that is never sent holds no slot
+        encoder = EventEncoder()
+        try:
+            ticket = admission.admit(tenant, rate_limit=False)
+        except AdmissionRejected as e:
+            # The queue filled up after the check above
+            request_span.end()
+            yield encoder.encode({"type": "error", "content": str(e)})
+            yield encoder.encode({"type": "done"})
+            return
+        ACTIVE_STREAMS.inc()
         try:
-            # We use astream_events to get granular token updates
-            # v1 is the standard legacy version, v2 is newer but sometimes has breaking changes. v1 is safe.
-            async for event in agent.astream_events(inputs, config=config, version="v1"):
-                kind = event["event"]
-                data = event["data"]
-
-                # Stream partial tokens for the final response
-                if kind == "on_chat_model_stream":
-                    chunk = data.get("chunk")
-                    # chunk is an AIMessageChunk, we need its content
-                    if chunk and hasattr(chunk, "content"):
-                        content = chunk.content
-                        if content:
-                            # print(f"DEBUG: Token: {content[0:5]}...") # Too verbose to print every token
-                            yield json.dumps({
-                                "type": "token",
-                                "content": content
-                            }) + "\n"
-                
-                # Stream tool start events (to show "Calling tool..." in UI)
-                elif kind == "on_tool_start":
-                    print(f"DEBUG: Tool Start: {event['name']}")
-                    yield json.dumps({
-                        "type": "tool_start",
-                        "tool": event["name"],
-                        "run_id": event["run_id"],
-                        "input": _serialize(data.get("input"))
-                    }) + "\n"
-
-                # Stream tool end events
-                elif kind == "on_tool_end":
-                    print(f"DEBUG: Tool End: {event['name']}")
-                    output = data.get("output")
-                    yield json.dumps({
-                        "type": "tool_end",
-                        "tool": event["name"],
-                        "run_id": event["run_id"],
-                        "output": _serialize(output)
-                    }) + "\n"
-                
-                # Capture state updates (like todos)
-                elif kind == "on_chain_end":
-                    # Check if this update contains 'todos'
-                    output = data.get("output")
-                    if output and isinstance(output, dict) and "todos" in output:
-                        print("DEBUG: Updating Todos")
-                        yield json.dumps({
-                            "type": "values",
-                            "todos": _serialize(output["todos"])
-                        }) + "\n"
-                    
-        except Exception as e:
-            print(f"Server Error: {e}")
-            import traceback
-            traceback.print_exc()
-            yield json.dumps({"type": "error", "content": str(e)}) + "\n"
-            
-        # Send a final done message
-        print("DEBUG: Stream Done")
-        yield json.dumps({"type": "done"}) + "\n"
-
-    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+            while not await ticket.wait(timeout=1.0):
+                if await http_request.is_disconnected():
+                    return
+                yield encoder.encode({"type": "queued", "position": ticket.position})
+            async with aclosing(_run_chat(request, request_span, http_request.is_disconnected)) as lines:
+                async for line in lines:
+                    yield line
+        finally:
+            ticket.release()
+            ACTIVE_STREAMS.dec()
+            # Not ended by _run_chat if the client left while queued
+            if request_span.is_recording():
+                request_span.end()
+
+    trace_headers = {}
+    propagate.inject(trace_headers, context=trace.set_span_in_context(request_span))
+    return StreamingResponse(event_generator(), media_type="application/x-ndjson", headers=trace_headers)
+
+async def _run_job(job):
+    """Job runner: the chat run's lines go to the job's event log instead of a connection."""
+    span = get_tracer().start_span(
+        "chat job",
+        context=job.request["trace_context"],
+        kind=SpanKind.CONSUMER,
+        attributes={"rfp.thread_id": job.thread_id, "rfp.job_id": job.id},
+    )
+    # Jobs are already queued by the job manager, so only the run slot applies
+    ticket = admission.admit(job.request["tenant"], source="job", rate_limit=False, bounded=False)
+    try:
+        await ticket.wait()
+        # Interactive chats get their model calls scheduled first
+        with llm_priority(BATCH):
+            async with aclosing(_run_chat(job.request["chat"], span, raise_errors=True)) as lines:
+                async for line in lines:
+                    await job.log.append(line)
+    finally:
+        ticket.release()
+        # Not ended by _run_chat if cancelled while waiting for a slot
+        if span.is_recording():
+            span.end()
+
+jobs = JobManager(_run_job)
+
+@app.on_event("shutdown")
+async def shutdown_jobs():
+    await jobs.shutdown()
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: ChatRequest, http_request: Request):
+    """
+    Queue a chat run in the background and return its job id immediately.
+    Follow its events with GET /api/jobs/{job_id}/events.
+    """
+    tenant = _tenant(request, http_request)
+    try:
+        admission.check_rate(tenant)
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    try:
+        job = jobs.submit(
+            {"chat": request, "tenant": tenant, "trace_context": propagate.extract(http_request.headers)},
+            thread_id=request.thread_id or "default_thread",
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue full: {e}", headers={"Retry-After": "30"})
+    return {**job.info(), "queue_position": jobs.queue_position(job), "events_url": f"/api/jobs/{job.id}/events"}
+
+@app.get("/api/jobs")
+def list_jobs():
+    """All known jobs, newest first."""
+    return {"jobs": [job.info() for job in sorted(jobs.jobs.values(), key=lambda j: j.created, reverse=True)]}
+
+def _get_job(job_id: str):
+    job = jobs.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = _get_job(job_id)
+    return {**job.info(), "queue_position": jobs.queue_position(job)}
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, http_request: Request, offset: int = 0):
+    """
+    Stream a job's NDJSON events starting at line `offset`, following the log
+    until the job finishes. Re-attach after a dropped connection by passing the
+    number of lines already received.
+    """
+    job = _get_job(job_id)
+    return StreamingResponse(
+        job.log.follow(offset, is_disconnected=http_request.is_disconnected),
+        media_type="application/x-ndjson",
+        headers={"X-Job-Status": job.status},
+    )
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await jobs.cancel(_get_job(job_id))
+    return job.info()
+
+@app.get("/api/admission")
+def admission_status():
+    """Run slots in use and queued chat runs per tenant."""
+    return admission.snapshot()
+
+@app.get("/api/llm-scheduler")
+def llm_scheduler_status():
+    """Per-model LLM call budgets, queue and adaptive concurrency limit."""
+    return scheduler_snapshot()
+
+@app.get("/api/storage")
+async def storage_usage():
+    """Disk usage of the agent_memories artifact store (logical vs stored bytes)."""
+    return await asyncio.to_thread(file_index.store.usage)
+
+@app.get("/api/prompt-cache")
+def prompt_cache_report():
+    """Cached vs. uncached prompt tokens per agent since server start."""
+    return {"agents": prompt_cache_stats.summary(), "calls": prompt_cache_stats.total_calls}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics (node, sub-agent, tool and LLM latency, tokens, active streams)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/health")
 def health():
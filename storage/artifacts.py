@@ -0,0 +1,466 @@
+"""Compressed, Deduplicated Artifact Store.
+
+Backs the agents' `/memories/` route (`agent_memories/`). Every artifact is
+stored once per distinct content, zstd-compressed, and named through a
+manifest:
+
+    agent_memories/.manifest.json            name -> digest, size, timestamps
+    agent_memories/.objects/ab/<digest>.zst  compressed content (sha256 of the text)
+
+Runs that save the same converted RFP or the same intermediate table share a
+single object. Files placed directly in `agent_memories/` (e.g. by older
+versions) remain readable and are moved into the store when rewritten or by
+`migrate()`.
+
+Retention: `gc()` drops artifacts not modified for `RFP_ARTIFACT_RETENTION_DAYS`
+(default 30), then the oldest ones while the store exceeds
+`RFP_ARTIFACT_MAX_MB`, and deletes objects no name refers to. `usage()`
+reports logical vs stored bytes. Both are available from the command line:
+
+    python -m storage.artifacts usage
+    python -m storage.artifacts gc [--retention-days N] [--max-mb N]
+    python -m storage.artifacts migrate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the thread lock only (run a single worker)
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback, still deduplicated
+    zstandard = None
+
+MEMORY_DIR = "./agent_memories"
+MANIFEST = ".manifest.json"
+LOCK_FILE = ".manifest.lock"
+OBJECTS_DIR = ".objects"
+CACHE_DIR = ".cache"
+
+ZSTD_LEVEL = int(os.getenv("RFP_ARTIFACT_ZSTD_LEVEL", "10"))
+RETENTION_DAYS = float(os.getenv("RFP_ARTIFACT_RETENTION_DAYS", "30"))
+MAX_MB = float(os.getenv("RFP_ARTIFACT_MAX_MB", "0"))
+
+# File extension of each codec's objects
+CODECS = {"zstd": ".zst", "zlib": ".zz"}
+
+# Size and mtime are those of the uncompressed artifact; digest is None for
+# plain files not (yet) in the store
+ArtifactInfo = namedtuple("ArtifactInfo", ["size", "mtime", "digest"])
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive `flock` on `path` (created if missing), against other processes.
+
+    Not reentrant and not a thread lock: callers hold their own lock as well.
+    Without fcntl (Windows) it does nothing.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _compress(data: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd artifacts (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ArtifactStore:
+    """Named artifacts over compressed, content-addressed objects."""
+
+    def __init__(self, root: str = MEMORY_DIR):
+        self.root = os.path.abspath(root)
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._files = {}
+        self._manifest_version = None
+
+    # -- manifest --
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the store for a manifest update or GC, against other threads and processes.
+
+        Several server workers share one store: the manifest is re-read,
+        changed and rewritten under an exclusive `flock` on `.manifest.lock`,
+        so no update is lost and GC never sees an object whose name is
+        still being recorded. Reentrant within a thread.
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with file_lock(os.path.join(self.root, LOCK_FILE)):
+                # Another process may have rewritten it within the mtime granularity
+                self._manifest_version = None
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def _load(self):
+        """Re-read the manifest if another writer changed it."""
+        try:
+            stat = os.stat(self._manifest_path())
+        except FileNotFoundError:
+            self._files, self._manifest_version = {}, None
+            return
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version != self._manifest_version:
+            with open(self._manifest_path(), "rb") as f:
+                self._files = json.load(f)["files"]
+            self._manifest_version = version
+
+    def _save(self):
+        data = json.dumps({"version": 1, "files": self._files}, indent=1, sort_keys=True).encode()
+        _atomic_write(self._manifest_path(), data)
+        stat = os.stat(self._manifest_path())
+        self._manifest_version = (stat.st_mtime_ns, stat.st_size)
+
+    # -- names --
+
+    def valid_name(self, name: str) -> bool:
+        """True for relative names inside the store that are not reserved."""
+        parts = name.replace("\\", "/").split("/")
+        return bool(name) and not name.startswith("/") and all(p and p not in (".", "..") for p in parts) \
+            and not parts[0].startswith(".")
+
+    def _plain_path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def _plain_files(self):
+        entries = {}
+        if os.path.isdir(self.root):
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        entries[entry.name] = ArtifactInfo(stat.st_size, stat.st_mtime, None)
+        return entries
+
+    def entries(self) -> dict:
+        """Mapping of artifact name to ArtifactInfo."""
+        with self._lock:
+            self._load()
+            entries = self._plain_files()
+            for name, meta in self._files.items():
+                entries[name] = ArtifactInfo(meta["size"], meta["modified_at"], meta["digest"])
+            return entries
+
+    def stat(self, name: str):
+        """ArtifactInfo of `name`, or None if it does not exist."""
+        if not self.valid_name(name):
+            return None
+        with self._lock:
+            self._load()
+            meta = self._files.get(name)
+            if meta is not None:
+                return ArtifactInfo(meta["size"], meta["modified_at"], meta["digest"])
+        try:
+            stat = os.stat(self._plain_path(name))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return ArtifactInfo(stat.st_size, stat.st_mtime, None) if os.path.isfile(self._plain_path(name)) else None
+
+    def exists(self, name: str) -> bool:
+        return self.stat(name) is not None
+
+    # -- objects --
+
+    def _object_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], digest + CODECS[codec])
+
+    def _find_object(self, digest: str):
+        for codec in CODECS:
+            path = self._object_path(digest, codec)
+            if os.path.exists(path):
+                return codec, path
+        return None, None
+
+    def _put_object(self, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        codec, _ = self._find_object(digest)
+        if codec is None:
+            codec, compressed = _compress(data)
+            _atomic_write(self._object_path(digest, codec), compressed)
+        return digest, codec
+
+    # -- read / write --
+
+    def read_bytes(self, name: str) -> bytes:
+        """Content of an artifact; raises FileNotFoundError if it does not exist."""
+        if not self.valid_name(name):
+            raise FileNotFoundError(name)
+        with self._lock:
+            self._load()
+            meta = self._files.get(name)
+        if meta is None:
+            with open(self._plain_path(name), "rb") as f:
+                return f.read()
+        with open(self._object_path(meta["digest"], meta["codec"]), "rb") as f:
+            return _decompress(meta["codec"], f.read())
+
+    def read(self, name: str) -> str:
+        return self.read_bytes(name).decode("utf-8")
+
+    def write(self, name: str, content) -> ArtifactInfo:
+        """Store `content` (str or bytes) under `name`, replacing any previous version."""
+        if not self.valid_name(name):
+            raise ValueError(f"Invalid artifact name: {name!r}")
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        now = time.time()
+        # Under the store lock, so gc() (in any worker) cannot reclaim the
+        # object before it is named
+        with self._exclusive():
+            digest, codec = self._put_object(data)
+            self._load()
+            previous = self._files.get(name)
+            created_at = previous["created_at"] if previous else now
+            plain = self._plain_path(name)
+            if previous is None and os.path.isfile(plain):
+                created_at = os.stat(plain).st_mtime
+            self._files[name] = {
+                "digest": digest, "codec": codec, "size": len(data),
+                "created_at": created_at, "modified_at": now,
+            }
+            self._save()
+            if os.path.isfile(plain):
+                os.remove(plain)
+        return ArtifactInfo(len(data), now, digest)
+
+    def delete(self, name: str) -> bool:
+        """Remove `name`; its object is reclaimed by the next `gc()`."""
+        if not self.valid_name(name):
+            return False
+        with self._exclusive():
+            self._load()
+            removed = self._files.pop(name, None) is not None
+            if removed:
+                self._save()
+            plain = self._plain_path(name)
+            if os.path.isfile(plain):
+                os.remove(plain)
+                removed = True
+        return removed
+
+    def materialize(self, name: str) -> str:
+        """Path of a plain, uncompressed copy of `name` (e.g. for range requests)."""
+        info = self.stat(name)
+        if info is None:
+            raise FileNotFoundError(name)
+        if info.digest is None:
+            return self._plain_path(name)
+        path = os.path.join(self.root, CACHE_DIR, info.digest)
+        if not os.path.exists(path):
+            _atomic_write(path, self.read_bytes(name))
+        return path
+
+    def migrate(self) -> list:
+        """Move the plain files in the store root into the store."""
+        migrated = []
+        for name in self._plain_files():
+            plain = self._plain_path(name)
+            # One exclusive section per file: write() reloads the manifest
+            # under the lock, and no other process can change it before the
+            # timestamps are restored
+            with self._exclusive():
+                try:
+                    mtime = os.stat(plain).st_mtime
+                    with open(plain, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    # Migrated (or deleted) by another worker meanwhile
+                    continue
+                self.write(name, data)
+                self._load()
+                # Keep the original timestamps for retention
+                self._files[name].update(created_at=mtime, modified_at=mtime)
+                self._save()
+            migrated.append(name)
+        return migrated
+
+    # -- retention / reporting --
+
+    def _objects(self):
+        objects = {}
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        for dirpath, _, filenames in os.walk(objects_dir):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                digest = filename.split(".", 1)[0]
+                objects[digest] = (os.path.join(dirpath, filename), os.path.getsize(os.path.join(dirpath, filename)))
+        return objects
+
+    def gc(self, retention_days: float = RETENTION_DAYS, max_mb: float = MAX_MB, now: float = None) -> dict:
+        """Apply the retention policy and delete unreferenced objects.
+
+        Args:
+            retention_days: Remove artifacts not modified for this many days (0 keeps all)
+            max_mb: Then remove the oldest artifacts while stored bytes exceed this (0: no limit)
+            now: Current time, for tests
+
+        Returns:
+            Names removed, objects deleted and bytes freed
+        """
+        now = time.time() if now is None else now
+        removed = []
+        with self._exclusive():
+            self._load()
+            if retention_days > 0:
+                cutoff = now - retention_days * 86400
+                removed += [n for n, m in self._files.items() if m["modified_at"] < cutoff]
+                for name in removed:
+                    del self._files[name]
+
+            objects = self._objects()
+            if max_mb > 0:
+                refs = {}
+                for meta in self._files.values():
+                    refs[meta["digest"]] = refs.get(meta["digest"], 0) + 1
+                stored = sum(objects.get(d, (None, 0))[1] for d in refs)
+                for name, meta in sorted(self._files.items(), key=lambda item: item[1]["modified_at"]):
+                    if stored <= max_mb * 1024 * 1024:
+                        break
+                    del self._files[name]
+                    removed.append(name)
+                    refs[meta["digest"]] -= 1
+                    if not refs[meta["digest"]]:
+                        stored -= objects.get(meta["digest"], (None, 0))[1]
+
+            if removed:
+                self._save()
+            referenced = {m["digest"] for m in self._files.values()}
+            freed, deleted = 0, 0
+            for digest, (path, size) in objects.items():
+                if digest not in referenced:
+                    os.remove(path)
+                    freed += size
+                    deleted += 1
+            cache_dir = os.path.join(self.root, CACHE_DIR)
+            if os.path.isdir(cache_dir):
+                for digest in os.listdir(cache_dir):
+                    if digest not in referenced:
+                        os.remove(os.path.join(cache_dir, digest))
+
+        if removed or deleted:
+            print(f"DEBUG: Artifact GC removed {len(removed)} artifact(s), {deleted} object(s), {freed} bytes")
+        return {"removed": sorted(removed), "objects_deleted": deleted, "bytes_freed": freed}
+
+    def usage(self) -> dict:
+        """Disk-usage report: logical size, stored size, dedup and compression."""
+        with self._lock:
+            self._load()
+            files = dict(self._files)
+        plain = {n: i for n, i in self._plain_files().items() if n not in files}
+        objects = self._objects()
+        referenced = {m["digest"] for m in files.values()}
+        logical = sum(m["size"] for m in files.values())
+        unique = sum({m["digest"]: m["size"] for m in files.values()}.values())
+        stored = sum(size for d, (_, size) in objects.items() if d in referenced)
+        orphaned = sum(size for d, (_, size) in objects.items() if d not in referenced)
+        cache_dir = os.path.join(self.root, CACHE_DIR)
+        cache = sum(e.stat().st_size for e in os.scandir(cache_dir)) if os.path.isdir(cache_dir) else 0
+        return {
+            "root": self.root,
+            "codec": "zstd" if zstandard is not None else "zlib",
+            "artifacts": len(files),
+            "objects": len(referenced),
+            "logical_bytes": logical,
+            "unique_bytes": unique,
+            "stored_bytes": stored,
+            "dedup_ratio": round(logical / unique, 2) if unique else 1.0,
+            "compression_ratio": round(unique / stored, 2) if stored else 1.0,
+            "orphaned_bytes": orphaned,
+            "cache_bytes": cache,
+            "plain_files": len(plain),
+            "plain_bytes": sum(i.size for i in plain.values()),
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_artifact_store(root: str = MEMORY_DIR) -> ArtifactStore:
+    """The shared store for `root` (one per directory, so its lock is shared)."""
+    root = os.path.abspath(root)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ArtifactStore(root)
+        return _stores[root]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the compressed agent_memories artifact store.")
+    parser.add_argument("--root", default=MEMORY_DIR, help="Store directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("usage", help="Print the disk-usage report")
+    gc_parser = commands.add_parser("gc", help="Apply the retention policy and delete unreferenced objects")
+    gc_parser.add_argument("--retention-days", type=float, default=RETENTION_DAYS)
+    gc_parser.add_argument("--max-mb", type=float, default=MAX_MB)
+    commands.add_parser("migrate", help="Move plain files into the store")
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.root)
+    if args.command == "gc":
+        result = store.gc(args.retention_days, args.max_mb)
+    elif args.command == "migrate":
+        result = {"migrated": store.migrate()}
+    else:
+        result = store.usage()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Content-Addressed Blob Store.
+
+Large tool outputs and state files are written here once, keyed by the
+SHA-256 of their content, so agent state and checkpoints only carry a short
+reference. Identical content is stored once.
+
+Layout: `<root>/<digest[:2]>/<digest>`. The root is also mounted read-only
+for the agents at `/blobs/` (see agent.backend_factory), so a reference
+`/blobs/ab/abcd...` can be opened with `read_file`.
+
+Retention: a blob's modification time is refreshed whenever it is stored
+again or read through `get`; `gc()` deletes blobs unused for
+`RFP_BLOB_RETENTION_DAYS` (default 7), then the least recently used ones
+while the store exceeds `RFP_BLOB_MAX_MB` (default 0, no limit).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+BLOB_DIR = os.getenv("RFP_BLOB_DIR", "./agent_blobs")
+BLOB_RETENTION_DAYS = float(os.getenv("RFP_BLOB_RETENTION_DAYS", "7"))
+BLOB_MAX_MB = float(os.getenv("RFP_BLOB_MAX_MB", "0"))
+
+# Virtual path prefix of the blob store in the agents' filesystem
+BLOB_ROUTE = "/blobs/"
+
+# Tool outputs and state files longer than this are offloaded
+OFFLOAD_THRESHOLD_CHARS = int(os.getenv("RFP_OFFLOAD_THRESHOLD_CHARS", "10000"))
+
+
+class BlobStore:
+    """Write-once files named by the SHA-256 of their content."""
+
+    def __init__(self, root: str = BLOB_DIR):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        """Filesystem path of a blob."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def virtual_path(self, digest: str) -> str:
+        """Path of a blob under the agents' `/blobs/` route."""
+        return f"{BLOB_ROUTE}{digest[:2]}/{digest}"
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data) -> str:
+        """Store `data` (str or bytes) and return its digest.
+
+        The blob is written to a temporary file and renamed into place, so
+        readers never see a partial blob; existing content is not rewritten.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if self._touch(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return digest
+
+    def put_file(self, source: str) -> str:
+        """Move the file at `source` into the store and return its digest.
+
+        For content that is already on disk (downloads); `source` must be on
+        the same filesystem and is consumed.
+        """
+        h = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        path = self.path(digest)
+        if self._touch(path):
+            os.remove(source)
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source, path)
+        return digest
+
+    def _touch(self, path: str) -> bool:
+        """Mark an existing blob as used (for retention); False if it does not exist."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get(self, digest: str) -> bytes:
+        """Content of a blob; raises FileNotFoundError if it is missing."""
+        with open(self.path(digest), "rb") as f:
+            data = f.read()
+        self._touch(self.path(digest))
+        return data
+
+    def get_text(self, digest: str) -> str:
+        return self.get(digest).decode("utf-8")
+
+    def gc(self, retention_days: float = BLOB_RETENTION_DAYS, max_mb: float = BLOB_MAX_MB, now: float = None) -> dict:
+        """Delete blobs unused for `retention_days`, then the oldest while over `max_mb`.
+
+        Args:
+            retention_days: Age of the last use after which a blob is deleted (0 keeps all)
+            max_mb: Size limit of the store (0: no limit)
+            now: Current time, for tests
+
+        Returns:
+            Blobs deleted and bytes freed
+        """
+        now = time.time() if now is None else now
+        blobs = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # Temporary files of interrupted writes are removed after an hour
+                if filename.startswith(".tmp-"):
+                    if stat.st_mtime < now - 3600:
+                        os.remove(path)
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+
+        blobs.sort()
+        cutoff = now - retention_days * 86400 if retention_days > 0 else None
+        total = sum(size for _, size, _ in blobs)
+        deleted, freed = 0, 0
+        for mtime, size, path in blobs:
+            expired = cutoff is not None and mtime < cutoff
+            if not expired and not (max_mb > 0 and total > max_mb * 2**20):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            deleted += 1
+            freed += size
+        if deleted:
+            print(f"DEBUG: Blob GC deleted {deleted} blob(s), {freed} bytes")
+        return {"blobs_deleted": deleted, "bytes_freed": freed}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """The shared blob store at RFP_BLOB_DIR."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
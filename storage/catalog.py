@@ -0,0 +1,214 @@
+"""Compiled Product Catalog.
+
+The product catalog CSVs (`artifacts/Product_datasheet.csv`,
+`artifacts/product_price.csv`) are compiled once to uncompressed Arrow IPC
+files in `artifacts/.catalog/`. Every worker process memory-maps them
+read-only: opening a table is zero-copy and near-instant whatever the
+catalog size, and the pages are shared between processes through the OS
+page cache instead of each worker holding its own parsed copy.
+
+The markdown the catalog tools return is rendered once at compile time
+too (`<name>.md` next to the Arrow file), so a tool call reads a file
+instead of converting the whole table to pandas in every worker.
+
+A compiled file records the size and modification time of its CSV; when
+the CSV changes it is recompiled on next use (written to a temporary file
+and renamed, so readers never see a partial file). Without pyarrow the CSV
+is read with pandas as before.
+
+Usage:
+    python -m storage.catalog compile [--dir artifacts]
+    python -m storage.catalog status [--dir artifacts]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from os import getenv
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+CATALOG_DIR = getenv("RFP_CATALOG_DIR", "artifacts")
+CATALOG_FILES = ("Product_datasheet.csv", "product_price.csv")
+COMPILED_DIR = ".catalog"
+# Cells pandas.read_csv reads as missing; the compiled catalog must agree
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+             "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+_lock = threading.Lock()
+# CSV path -> (source stamp, Arrow table / DataFrame / markdown), per process
+_tables = {}
+# Only used without pyarrow; otherwise the markdown is compiled
+_markdown = {}
+
+
+def _stamp(csv_path: str) -> dict:
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def compiled_paths(csv_path: str):
+    """(Arrow file, metadata file) of a catalog CSV."""
+    csv_path = Path(csv_path)
+    base = csv_path.parent / COMPILED_DIR / csv_path.stem
+    return base.with_suffix(".arrow"), base.with_suffix(".json")
+
+
+def markdown_path(csv_path: str) -> Path:
+    """Compiled markdown rendering of a catalog CSV."""
+    return compiled_paths(csv_path)[0].with_suffix(".md")
+
+
+def is_fresh(csv_path: str) -> bool:
+    """Whether the compiled files exist and match the CSV."""
+    arrow_path, meta_path = compiled_paths(csv_path)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    return arrow_path.exists() and markdown_path(csv_path).exists() and meta.get("source") == _stamp(csv_path)
+
+
+def _write(path: Path, write):
+    """Write a compiled file through a temporary file and rename it into place."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def render_markdown(table) -> str:
+    """Markdown rendering of a catalog table, as the catalog tools return it."""
+    df = table if pa is None else table.to_pandas()
+    # Arrow string nulls come back as None; render them as pandas' NaN does
+    return df.to_markdown(missingval="nan")
+
+
+def compile_catalog(csv_path: str) -> Path:
+    """Compile a catalog CSV to an uncompressed Arrow IPC file (memory-mappable) and its markdown."""
+    arrow_path, meta_path = compiled_paths(csv_path)
+    arrow_path.parent.mkdir(parents=True, exist_ok=True)
+    stamp = _stamp(csv_path)
+    started = time.perf_counter()
+    options = pa_csv.ConvertOptions(null_values=NA_VALUES, strings_can_be_null=True)
+    table = pa_csv.read_csv(csv_path, convert_options=options)
+
+    def write_arrow(sink):
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _write(arrow_path, write_arrow)
+    markdown = render_markdown(table).encode("utf-8")
+    _write(markdown_path(csv_path), lambda f: f.write(markdown))
+    fd, tmp = tempfile.mkstemp(dir=arrow_path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"source": stamp, "rows": table.num_rows, "columns": table.num_columns, "compiled_at": time.time()}, f)
+    os.replace(tmp, meta_path)
+    print(f"DEBUG: Compiled {csv_path} ({table.num_rows} rows) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return arrow_path
+
+
+def load_table(csv_path: str):
+    """The catalog as an Arrow table memory-mapped from its compiled file.
+
+    Compiles the CSV first if needed; the mapping is reused by later calls
+    in this process until the CSV changes. Without pyarrow, returns a pandas
+    DataFrame read from the CSV.
+    """
+    csv_path = os.path.abspath(csv_path)
+    stamp = _stamp(csv_path)
+    cached = _tables.get(csv_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        cached = _tables.get(csv_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        if pa is None:
+            import pandas as pd
+
+            table = pd.read_csv(csv_path)
+        else:
+            if not is_fresh(csv_path):
+                compile_catalog(csv_path)
+            arrow_path, _ = compiled_paths(csv_path)
+            table = pa_ipc.open_file(pa.memory_map(str(arrow_path), "r")).read_all()
+        _tables[csv_path] = (stamp, table)
+        return table
+
+
+def catalog_markdown(csv_path: str) -> str:
+    """Markdown rendering of a catalog, as the catalog tools return it.
+
+    Read from the compiled markdown file (compiling the CSV first if it is
+    missing or stale). Without pyarrow, rendered from the DataFrame and
+    cached per CSV version.
+    """
+    csv_path = os.path.abspath(csv_path)
+    if pa is not None:
+        if not is_fresh(csv_path):
+            with _lock:
+                if not is_fresh(csv_path):
+                    compile_catalog(csv_path)
+        return markdown_path(csv_path).read_text(encoding="utf-8")
+    stamp = _stamp(csv_path)
+    cached = _markdown.get(csv_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    markdown = render_markdown(load_table(csv_path))
+    _markdown[csv_path] = (stamp, markdown)
+    return markdown
+
+
+def compile_all(directory: str = CATALOG_DIR) -> list:
+    """Compile every catalog CSV in `directory` that is missing or stale."""
+    compiled = []
+    if pa is None:
+        print("DEBUG: pyarrow is not installed, catalog CSVs are read directly")
+        return compiled
+    for name in CATALOG_FILES:
+        csv_path = os.path.join(directory, name)
+        if os.path.exists(csv_path) and not is_fresh(csv_path):
+            compile_catalog(csv_path)
+            compiled.append(csv_path)
+    return compiled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the product catalog CSVs to memory-mapped Arrow files.")
+    parser.add_argument("command", choices=("compile", "status"))
+    parser.add_argument("--dir", default=CATALOG_DIR, help="Catalog directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        compiled = compile_all(args.dir)
+        print(f"Compiled {len(compiled)} catalog file(s)")
+        return
+    for name in CATALOG_FILES:
+        csv_path = os.path.join(args.dir, name)
+        if not os.path.exists(csv_path):
+            print(f"{name:<24} missing")
+            continue
+        arrow_path, _ = compiled_paths(csv_path)
+        state = "fresh" if is_fresh(csv_path) else "stale"
+        size = f"{arrow_path.stat().st_size / 2**20:.1f} MB" if arrow_path.exists() else "-"
+        print(f"{name:<24} {state:<6} {size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Download Cache.
+
+RFP source documents downloaded from Google Drive (or any URL) are kept in
+`RFP_DOWNLOAD_DIR` (default `./agent_downloads`), content-addressed like the
+blob store, so a document is fetched once and converted once however many
+runs select it.
+
+Layout:
+    <root>/<digest[:2]>/<digest>      downloaded documents
+    <root>/.index.json                source URL -> digest, name, size, times
+    <root>/.index.lock                held while the index is rewritten
+    <root>/.partial/<key>(.json)      interrupted downloads and their validator
+    <root>/.converted/<digest>-<converter>.md
+                                      markdown conversions, by document digest
+                                      and converter (name and version)
+
+Interrupted downloads resume with a Range request when the server gave an
+ETag or Last-Modified validator (sent back as If-Range, so a changed file
+restarts from scratch). Downloads larger than `RFP_DOWNLOAD_MAX_MB` are
+refused, and the least recently used documents are evicted while the cache
+exceeds `RFP_DOWNLOAD_CACHE_MB`. A document's last use is its file's
+modification time, refreshed on every read, so reads never rewrite the
+index; index updates hold a `flock` so server workers sharing the cache
+do not lose each other's downloads.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from os import getenv
+from pathlib import Path
+
+from storage.artifacts import file_lock
+from storage.blobs import BlobStore
+
+DOWNLOAD_DIR = getenv("RFP_DOWNLOAD_DIR", "./agent_downloads")
+DOWNLOAD_MAX_MB = float(getenv("RFP_DOWNLOAD_MAX_MB", "100"))
+DOWNLOAD_CACHE_MB = float(getenv("RFP_DOWNLOAD_CACHE_MB", "2048"))
+# Cached documents older than this are downloaded again
+DOWNLOAD_TTL_HOURS = float(getenv("RFP_DOWNLOAD_TTL_HOURS", "24"))
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+DownloadEntry = namedtuple("DownloadEntry", "url digest name size content_type fetched_at")
+
+
+def download_name(url: str, headers) -> str:
+    """File name of a download: Content-Disposition, the URL path, or the content type.
+
+    docling detects the document format from the name's extension.
+    """
+    import mimetypes
+    from urllib.parse import unquote, urlsplit
+
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)", headers.get("content-disposition", ""))
+    if match:
+        return Path(unquote(match.group(1))).name
+    name = Path(urlsplit(url).path).name
+    if Path(name).suffix:
+        return name
+    content_type = headers.get("content-type", "").split(";")[0].strip()
+    return f"{name or 'document'}{mimetypes.guess_extension(content_type) or '.pdf'}"
+
+
+def _total_size(response, offset: int):
+    """Full size of the document from Content-Range / Content-Length, if given."""
+    match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("content-range", ""))
+    if match:
+        return int(match.group(1))
+    length = response.headers.get("content-length")
+    return int(length) + offset if length and length.isdigit() else None
+
+
+class DownloadCache:
+    """Content-addressed cache of downloaded documents.
+
+    Args:
+        root: Cache directory
+        max_bytes: Largest document accepted
+        cache_bytes: Size the cache is evicted down to
+        ttl_s: Age after which a cached document is downloaded again
+    """
+
+    def __init__(self, root: str = DOWNLOAD_DIR, max_bytes: float = DOWNLOAD_MAX_MB * 2**20,
+                 cache_bytes: float = DOWNLOAD_CACHE_MB * 2**20, ttl_s: float = DOWNLOAD_TTL_HOURS * 3600):
+        self.root = os.path.abspath(root)
+        self.blobs = BlobStore(self.root)
+        self.max_bytes = max_bytes
+        self.cache_bytes = cache_bytes
+        self.ttl_s = ttl_s
+        self._index_path = os.path.join(self.root, ".index.json")
+        self._index_lock_path = os.path.join(self.root, ".index.lock")
+        self._partial_dir = os.path.join(self.root, ".partial")
+        self._converted_dir = os.path.join(self.root, ".converted")
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @contextmanager
+    def _index_lock(self):
+        """Hold the index for a read-modify-write, against other threads and processes."""
+        with self._lock, file_lock(self._index_lock_path):
+            yield
+
+    def _save(self, index: dict):
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+    def lookup(self, url: str):
+        """Cached DownloadEntry of `url` if it is present and fresh, else None."""
+        record = self._load().get(url)
+        if record is None or not self.blobs.exists(record["digest"]):
+            return None
+        if time.time() - record["fetched_at"] > self.ttl_s:
+            return None
+        return DownloadEntry(url, **{k: record[k] for k in DownloadEntry._fields if k != "url"})
+
+    def path(self, entry: DownloadEntry) -> str:
+        return self.blobs.path(entry.digest)
+
+    def read(self, entry: DownloadEntry) -> bytes:
+        # Reading refreshes the document's mtime, its last use for eviction
+        return self.blobs.get(entry.digest)
+
+    def _used_at(self, record: dict) -> float:
+        try:
+            return os.path.getmtime(self.blobs.path(record["digest"]))
+        except FileNotFoundError:
+            return record["used_at"]
+
+    def _partial(self, url: str) -> str:
+        os.makedirs(self._partial_dir, exist_ok=True)
+        return os.path.join(self._partial_dir, hashlib.sha256(url.encode()).hexdigest()[:32])
+
+    def download(self, url: str, timeout: float) -> DownloadEntry:
+        """Download `url` into the cache (one attempt), resuming a partial download.
+
+        Raises:
+            httpx.HTTPError: The request failed (the partial file is kept)
+            tools.resilience.ToolFailure: The document exceeds max_bytes
+        """
+        import httpx
+
+        from tools.resilience import ToolFailure
+
+        part = self._partial(url)
+        try:
+            with open(part + ".json", encoding="utf-8") as f:
+                validator = json.load(f).get("validator")
+        except FileNotFoundError:
+            validator = None
+        offset = os.path.getsize(part) if validator and os.path.exists(part) else 0
+
+        headers = dict(BROWSER_HEADERS)
+        if offset:
+            headers.update({"Range": f"bytes={offset}-", "If-Range": validator})
+        try:
+            meta, size = self._stream(url, part, headers, offset, timeout)
+        except ToolFailure:
+            # Too large: nothing worth resuming
+            self.discard_partial(url)
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 416 or not offset:
+                raise
+            # The partial file does not fit the document any more
+            self.discard_partial(url)
+            meta, size = self._stream(url, part, dict(BROWSER_HEADERS), 0, timeout)
+
+        digest = self.blobs.put_file(part)
+        os.remove(part + ".json")
+        now = time.time()
+        record = {"digest": digest, "name": meta["name"], "size": size, "content_type": meta["content_type"],
+                  "fetched_at": now, "used_at": now}
+        with self._index_lock():
+            index = self._load()
+            index[url] = record
+            self._save(index)
+        self.evict(keep=digest)
+        return DownloadEntry(url, **{k: record[k] for k in DownloadEntry._fields if k != "url"})
+
+    def _stream(self, url: str, part: str, headers: dict, offset: int, timeout: float):
+        """Write the response to the partial file; returns (metadata, document size)."""
+        import httpx
+
+        from tools.resilience import ToolFailure, host_of
+
+        with httpx.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0
+            total = _total_size(response, offset)
+            if total is not None and total > self.max_bytes:
+                raise ToolFailure("too_large", f"{total / 2**20:.1f} MB exceeds the {self.max_bytes / 2**20:g} MB limit", host=host_of(url))
+            meta = {
+                "validator": response.headers.get("etag") or response.headers.get("last-modified"),
+                "name": download_name(url, response.headers),
+                "content_type": response.headers.get("content-type", "").split(";")[0].strip(),
+            }
+            with open(part + ".json", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            if offset:
+                print(f"DEBUG: Resuming download of {url} at {offset} bytes")
+            size = offset
+            with open(part, "ab" if offset else "wb") as f:
+                for chunk in response.iter_bytes(1 << 16):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ToolFailure("too_large", f"more than the {self.max_bytes / 2**20:g} MB limit", host=host_of(url))
+                    f.write(chunk)
+        return meta, size
+
+    def discard_partial(self, url: str):
+        """Forget a partial download (e.g. after a size-limit refusal)."""
+        part = self._partial(url)
+        for path in (part, part + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _converted_path(self, digest: str, converter: str) -> str:
+        return os.path.join(self._converted_dir, f"{digest}-{re.sub(r'[^A-Za-z0-9_.-]', '_', converter)}.md")
+
+    def _converted_paths(self, digest: str) -> list:
+        """Every cached conversion of a document (any converter)."""
+        if not os.path.isdir(self._converted_dir):
+            return []
+        return [os.path.join(self._converted_dir, name) for name in os.listdir(self._converted_dir)
+                if name.startswith(digest)]
+
+    def markdown(self, digest: str, converter: str):
+        """Cached markdown conversion of a document by `converter`, or None.
+
+        Args:
+            digest: Document digest
+            converter: Converter name and version; conversions by other
+                converters (or older versions) are not returned
+        """
+        try:
+            with open(self._converted_path(digest, converter), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_markdown(self, digest: str, markdown: str, converter: str):
+        os.makedirs(self._converted_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._converted_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        os.replace(tmp, self._converted_path(digest, converter))
+
+    def evict(self, keep: str = None):
+        """Drop least recently used documents while the cache is over cache_bytes.
+
+        Also removes partial downloads older than the TTL.
+        """
+        with self._index_lock():
+            index = self._load()
+            sizes = {r["digest"]: r["size"] for r in index.values()}
+            total = sum(sizes.values())
+            for url, record in sorted(index.items(), key=lambda item: self._used_at(item[1])):
+                if total <= self.cache_bytes:
+                    break
+                if record["digest"] == keep:
+                    continue
+                del index[url]
+                if all(r["digest"] != record["digest"] for r in index.values()):
+                    total -= sizes[record["digest"]]
+                    for path in (self.blobs.path(record["digest"]), *self._converted_paths(record["digest"])):
+                        if os.path.exists(path):
+                            os.remove(path)
+                print(f"DEBUG: Evicted cached download {url}")
+            self._save(index)
+
+        if os.path.isdir(self._partial_dir):
+            cutoff = time.time() - self.ttl_s
+            for name in os.listdir(self._partial_dir):
+                path = os.path.join(self._partial_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
@@ -0,0 +1,158 @@
+"""Artifact Store Backend.
+
+deepagents backend for the `/memories/` route that reads and writes through
+`storage.artifacts.ArtifactStore` instead of plain files, so the agents'
+file tools see ordinary paths while artifacts are stored compressed and
+deduplicated.
+"""
+
+from datetime import datetime
+
+from deepagents.backends.protocol import (
+    BackendProtocol,
+    EditResult,
+    FileDownloadResponse,
+    FileUploadResponse,
+    WriteResult,
+)
+from deepagents.backends.utils import (
+    _glob_search_files,
+    format_content_with_line_numbers,
+    check_empty_content,
+    grep_matches_from_files,
+    perform_string_replacement,
+)
+
+from storage.artifacts import MEMORY_DIR, get_artifact_store
+
+
+class ArtifactBackend(BackendProtocol):
+    """Backend over an ArtifactStore; paths are virtual (`/name`) as in virtual_mode."""
+
+    def __init__(self, root: str = MEMORY_DIR, store=None):
+        self.store = store or get_artifact_store(root)
+
+    @staticmethod
+    def _name(path: str) -> str:
+        return path.lstrip("/")
+
+    def _file_infos(self, prefix: str = "/"):
+        """FileData-like entries (without content) for names under `prefix`."""
+        files = {}
+        for name, info in self.store.entries().items():
+            path = "/" + name
+            if path.startswith(prefix):
+                files[path] = {"size": info.size, "modified_at": datetime.fromtimestamp(info.mtime).isoformat()}
+        return files
+
+    def ls_info(self, path: str):
+        prefix = path if path.endswith("/") else path + "/"
+        infos, subdirs = [], set()
+        for file_path, fd in self._file_infos(prefix).items():
+            relative = file_path[len(prefix):]
+            if "/" in relative:
+                subdirs.add(prefix + relative.split("/")[0] + "/")
+                continue
+            infos.append({"path": file_path, "is_dir": False, "size": int(fd["size"]), "modified_at": fd["modified_at"]})
+        infos += [{"path": d, "is_dir": True, "size": 0, "modified_at": ""} for d in sorted(subdirs)]
+        infos.sort(key=lambda x: x.get("path", ""))
+        return infos
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        try:
+            content = self.store.read(self._name(file_path))
+        except FileNotFoundError:
+            return f"Error: File '{file_path}' not found"
+        except (OSError, UnicodeDecodeError) as e:
+            return f"Error reading file '{file_path}': {e}"
+
+        empty_msg = check_empty_content(content)
+        if empty_msg:
+            return empty_msg
+        lines = content.splitlines()
+        if offset >= len(lines):
+            return f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
+        return format_content_with_line_numbers(lines[offset:offset + limit], start_line=offset + 1)
+
+    def write(self, file_path: str, content: str) -> WriteResult:
+        name = self._name(file_path)
+        if self.store.exists(name):
+            return WriteResult(error=f"Cannot write to {file_path} because it already exists. Read and then make an edit, or write to a new path.")
+        try:
+            self.store.write(name, content)
+        except (OSError, ValueError, UnicodeEncodeError) as e:
+            return WriteResult(error=f"Error writing file '{file_path}': {e}")
+        return WriteResult(path=file_path, files_update=None)
+
+    def edit(self, file_path: str, old_string: str, new_string: str, replace_all: bool = False) -> EditResult:
+        name = self._name(file_path)
+        try:
+            content = self.store.read(name)
+        except FileNotFoundError:
+            return EditResult(error=f"Error: File '{file_path}' not found")
+        except (OSError, UnicodeDecodeError) as e:
+            return EditResult(error=f"Error editing file '{file_path}': {e}")
+
+        result = perform_string_replacement(content, old_string, new_string, replace_all)
+        if isinstance(result, str):
+            return EditResult(error=result)
+
+        new_content, occurrences = result
+        try:
+            self.store.write(name, new_content)
+        except (OSError, UnicodeEncodeError) as e:
+            return EditResult(error=f"Error editing file '{file_path}': {e}")
+        return EditResult(path=file_path, files_update=None, occurrences=int(occurrences))
+
+    def grep_raw(self, pattern: str, path: str = "/", glob: str | None = None):
+        files = {}
+        for file_path in self._file_infos(path or "/"):
+            try:
+                files[file_path] = {"content": self.store.read(self._name(file_path)).split("\n")}
+            except (OSError, UnicodeDecodeError):
+                continue
+        return grep_matches_from_files(files, pattern, path, glob)
+
+    def glob_info(self, pattern: str, path: str = "/"):
+        files = self._file_infos()
+        result = _glob_search_files(files, pattern, path)
+        if result == "No files found":
+            return []
+        return [
+            {"path": p, "is_dir": False, "size": int(files[p]["size"]), "modified_at": files[p]["modified_at"]}
+            for p in result.split("\n")
+        ]
+
+    def upload_files(self, files: list[tuple[str, bytes]]) -> list[FileUploadResponse]:
+        """Store each (path, content) pair, replacing existing artifacts as a filesystem upload does."""
+        responses = []
+        for path, content in files:
+            try:
+                self.store.write(self._name(path), content)
+                responses.append(FileUploadResponse(path=path, error=None))
+            except ValueError:
+                responses.append(FileUploadResponse(path=path, error="invalid_path"))
+            except PermissionError:
+                responses.append(FileUploadResponse(path=path, error="permission_denied"))
+        return responses
+
+    def download_files(self, paths: list[str]) -> list[FileDownloadResponse]:
+        """Content of each artifact, with an error code for paths that are not artifacts."""
+        responses = []
+        for path in paths:
+            name = self._name(path)
+            if not self.store.valid_name(name):
+                responses.append(FileDownloadResponse(path=path, content=None, error="invalid_path"))
+                continue
+            try:
+                content = self.store.read_bytes(name)
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                prefix = "/" + name.rstrip("/") + "/"
+                error = "is_directory" if self._file_infos(prefix) else "file_not_found"
+                responses.append(FileDownloadResponse(path=path, content=None, error=error))
+                continue
+            except PermissionError:
+                responses.append(FileDownloadResponse(path=path, content=None, error="permission_denied"))
+                continue
+            responses.append(FileDownloadResponse(path=path, content=content, error=None))
+        return responses
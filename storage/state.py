@@ -0,0 +1,142 @@
+"""Blob-Offloading State Backend.
+
+A StateBackend whose large files live in the blob store: the file entry in
+agent state keeps its timestamps, size and the blob digest, with empty
+`content`. Reads, edits and greps load the content back transparently, so
+the agents' file tools behave as before while the checkpointed state stays
+small however large the converted documents are.
+"""
+
+from deepagents.backends import FilesystemBackend, StateBackend
+from deepagents.backends.protocol import EditResult, FileDownloadResponse, WriteResult
+from deepagents.backends.utils import (
+    file_data_to_string,
+    format_read_response,
+    grep_matches_from_files,
+    perform_string_replacement,
+    update_file_data,
+)
+
+from storage.blobs import OFFLOAD_THRESHOLD_CHARS, get_blob_store
+
+
+class BlobStateBackend(StateBackend):
+    """StateBackend that stores files above a size threshold as blob references."""
+
+    def __init__(self, runtime, store=None, threshold: int = OFFLOAD_THRESHOLD_CHARS):
+        super().__init__(runtime)
+        self.store = store or get_blob_store()
+        self.threshold = threshold
+
+    def _offload(self, file_data: dict) -> dict:
+        """Move a file entry's content to the blob store if it is too large."""
+        content = file_data_to_string(file_data)
+        if len(content) <= self.threshold:
+            return file_data
+        return {
+            "content": [],
+            "blob": self.store.put(content),
+            "size": len(content),
+            "created_at": file_data["created_at"],
+            "modified_at": file_data["modified_at"],
+        }
+
+    def _load(self, file_data: dict) -> dict:
+        """File entry with its content loaded back from the blob store."""
+        if "blob" not in file_data:
+            return file_data
+        content = self.store.get_text(file_data["blob"])
+        return {**file_data, "content": content.split("\n")}
+
+    def _with_sizes(self, infos: list) -> list:
+        files = self.runtime.state.get("files", {})
+        for info in infos:
+            file_data = files.get(info["path"])
+            if file_data and "blob" in file_data:
+                info["size"] = int(file_data["size"])
+        return infos
+
+    def ls_info(self, path: str):
+        return self._with_sizes(super().ls_info(path))
+
+    def glob_info(self, pattern: str, path: str = "/"):
+        return self._with_sizes(super().glob_info(pattern, path))
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        file_data = self.runtime.state.get("files", {}).get(file_path)
+        if file_data is None:
+            return f"Error: File '{file_path}' not found"
+        try:
+            file_data = self._load(file_data)
+        except FileNotFoundError:
+            return f"Error: The content of '{file_path}' has expired from the blob store"
+        return format_read_response(file_data, offset, limit)
+
+    def write(self, file_path: str, content: str) -> WriteResult:
+        result = super().write(file_path, content)
+        if result.files_update:
+            result.files_update = {p: self._offload(fd) for p, fd in result.files_update.items()}
+        return result
+
+    def edit(self, file_path: str, old_string: str, new_string: str, replace_all: bool = False) -> EditResult:
+        file_data = self.runtime.state.get("files", {}).get(file_path)
+        if file_data is None:
+            return EditResult(error=f"Error: File '{file_path}' not found")
+
+        try:
+            content = file_data_to_string(self._load(file_data))
+        except FileNotFoundError:
+            return EditResult(error=f"Error: The content of '{file_path}' has expired from the blob store")
+        result = perform_string_replacement(content, old_string, new_string, replace_all)
+        if isinstance(result, str):
+            return EditResult(error=result)
+
+        new_content, occurrences = result
+        new_file_data = self._offload(update_file_data(file_data, new_content))
+        return EditResult(path=file_path, files_update={file_path: new_file_data}, occurrences=int(occurrences))
+
+    def grep_raw(self, pattern: str, path: str = "/", glob: str | None = None):
+        prefix = path or "/"
+        files = {}
+        for p, fd in self.runtime.state.get("files", {}).items():
+            if not p.startswith(prefix):
+                files[p] = fd
+                continue
+            try:
+                files[p] = self._load(fd)
+            except FileNotFoundError:
+                # Expired from the blob store: nothing left to search
+                continue
+        return grep_matches_from_files(files, pattern, path, glob)
+
+
+class BlobReadOnlyBackend(FilesystemBackend):
+    """The blob store mounted at `/blobs/`: readable, never written by agents."""
+
+    def __init__(self, store=None):
+        self.store = store or get_blob_store()
+        super().__init__(root_dir=self.store.root, virtual_mode=True)
+
+    def _touch(self, file_path: str):
+        """Refresh a blob's retention when an agent reads it."""
+        try:
+            path = self._resolve_path(file_path)
+        except ValueError:
+            return
+        if path.is_file():
+            self.store._touch(str(path))
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        self._touch(file_path)
+        return super().read(file_path, offset, limit)
+
+    def download_files(self, paths: list[str]) -> list[FileDownloadResponse]:
+        for path in paths:
+            self._touch(path)
+        return super().download_files(paths)
+
+    def write(self, file_path: str, content: str) -> WriteResult:
+        return WriteResult(error=f"Cannot write to {file_path}: /blobs/ is read-only")
+
+    def edit(self, file_path: str, old_string: str, new_string: str, replace_all: bool = False) -> EditResult:
+        return EditResult(error=f"Cannot edit {file_path}: /blobs/ is read-only")
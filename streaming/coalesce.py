@@ -0,0 +1,123 @@
+"""Token Coalescing and Backpressure.
+
+`pump_events` sits between the agent event stream and the HTTP response:
+
+- the agent run is consumed by a producer task feeding a bounded queue, so a
+  slow client makes the run wait (backpressure) instead of buffering the whole
+  response in memory
+- consecutive token events of the same agent are merged until
+  `RFP_STREAM_COALESCE_CHARS` characters are buffered or
+  `RFP_STREAM_COALESCE_MS` elapsed, turning thousands of tiny writes into a
+  few larger ones
+- while idle, the client connection is polled; when it is gone the producer,
+  and with it the agent run, is cancelled
+"""
+
+import asyncio
+from contextlib import suppress
+from os import getenv
+
+COALESCE_SECONDS = int(getenv("RFP_STREAM_COALESCE_MS", "50")) / 1000
+COALESCE_CHARS = int(getenv("RFP_STREAM_COALESCE_CHARS", "1024"))
+BUFFER_EVENTS = int(getenv("RFP_STREAM_BUFFER_EVENTS", "256"))
+DISCONNECT_POLL_SECONDS = 1.0
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+async def pump_events(
+    source,
+    is_disconnected=None,
+    max_delay: float = COALESCE_SECONDS,
+    max_chars: int = COALESCE_CHARS,
+    buffer_size: int = BUFFER_EVENTS,
+    on_disconnect=None,
+):
+    """Re-yield `source` payloads with token coalescing and backpressure.
+
+    Args:
+        source: Async iterator of stream payloads (see streaming.events)
+        is_disconnected: Optional async callable returning True once the
+            client has gone away (e.g. `Request.is_disconnected`)
+        max_delay: Longest time a token may wait in the buffer, in seconds
+        max_chars: Flush the token buffer once it holds this many characters
+        buffer_size: Maximum number of events queued ahead of the client
+        on_disconnect: Optional callback invoked when a disconnect is detected
+
+    Yields:
+        Payload dicts; runs of token events are merged into one
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=buffer_size)
+
+    async def produce():
+        try:
+            async for payload in source:
+                await queue.put(payload)
+            await queue.put(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(_Failure(e))
+
+    producer = asyncio.create_task(produce())
+    tokens = []
+    buffered = 0
+    deadline = None
+    agent = None
+
+    def flush():
+        nonlocal tokens, buffered, deadline
+        payload = {"type": "token", "content": "".join(tokens), "agent": agent}
+        tokens, buffered, deadline = [], 0, None
+        return payload
+
+    try:
+        while True:
+            timeout = max(deadline - loop.time(), 0) if tokens else DISCONNECT_POLL_SECONDS
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                if tokens:
+                    yield flush()
+                elif is_disconnected is not None and await is_disconnected():
+                    if on_disconnect is not None:
+                        on_disconnect()
+                    return
+                continue
+
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                if tokens:
+                    yield flush()
+                raise item.error
+
+            if item.get("type") == "token" and isinstance(item.get("content"), str):
+                if tokens and item.get("agent") != agent:
+                    yield flush()
+                if not tokens:
+                    agent = item.get("agent")
+                    deadline = loop.time() + max_delay
+                tokens.append(item["content"])
+                buffered += len(item["content"])
+                if buffered >= max_chars or loop.time() >= deadline:
+                    yield flush()
+                continue
+
+            if tokens:
+                yield flush()
+            yield item
+
+        if tokens:
+            yield flush()
+    finally:
+        # Client gone, error or normal end: stop the agent run
+        producer.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await producer
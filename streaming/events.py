@@ -0,0 +1,120 @@
+"""Agent Event Streaming.
+
+Thin layer over `astream_events(version="v2")` for the chat endpoint. Only the
+event types the client asked for are subscribed to (`include_types`), so
+LangChain drops everything else before it reaches Python-level handling, and
+chain events - whose outputs are whole graph states - are never requested at
+all. Todo updates are read from the `write_todos` tool result instead.
+
+Yielded payloads are plain dicts ready for serialisation:
+    {"type": "token", "content": ..., "agent": ...}
+    {"type": "tool_start", "tool": ..., "run_id": ..., "agent": ..., "input": ...}
+    {"type": "tool_end", "tool": ..., "run_id": ..., "agent": ..., "output": ...}
+    {"type": "values", "todos": [...]}
+"""
+
+EVENT_KINDS = ("token", "tool_start", "tool_end", "values")
+
+# Client event kind -> astream_events run type that produces it
+_RUN_TYPES = {"token": "chat_model", "tool_start": "tool", "tool_end": "tool", "values": "tool"}
+
+ORCHESTRATOR = "orchestrator"
+
+
+def agent_for(event, task_runs) -> str:
+    """Name of the agent an event belongs to.
+
+    Args:
+        event: astream_events v2 event
+        task_runs: run_id of every `task` tool call -> sub-agent name
+
+    Returns:
+        The sub-agent of the innermost enclosing `task` call, or "orchestrator"
+    """
+    for parent_id in reversed(event.get("parent_ids", ())):
+        if parent_id in task_runs:
+            return task_runs[parent_id]
+    return ORCHESTRATOR
+
+
+def _todos_from(output):
+    """Todos written by a `write_todos` call (a Command updating state)."""
+    update = getattr(output, "update", None)
+    if isinstance(update, dict):
+        return update.get("todos")
+    return None
+
+
+async def stream_agent_events(agent, inputs, config, kinds=None, agents=None):
+    """Stream filtered agent events.
+
+    Args:
+        agent: Compiled graph to run
+        inputs: Graph input
+        config: Run config
+        kinds: Event kinds to emit (subset of EVENT_KINDS), all if None
+        agents: Agent names ("orchestrator", "sales-agent", ...) whose events
+            are emitted, all if None
+
+    Yields:
+        Event payload dicts (see module docstring)
+    """
+    kinds = set(kinds or EVENT_KINDS)
+    agents = set(agents) if agents else None
+    include_types = {_RUN_TYPES[kind] for kind in kinds if kind in _RUN_TYPES}
+    if agents is not None:
+        # `task` tool starts are needed to attribute events to sub-agents
+        include_types.add("tool")
+
+    task_runs = {}
+    async for event in agent.astream_events(
+        inputs, config=config, version="v2", include_types=sorted(include_types)
+    ):
+        kind = event["event"]
+        data = event["data"]
+
+        if kind == "on_tool_start" and event["name"] == "task":
+            task_input = data.get("input") or {}
+            task_runs[event["run_id"]] = task_input.get("subagent_type", "unknown")
+
+        if kind not in ("on_chat_model_stream", "on_tool_start", "on_tool_end"):
+            continue
+        agent_name = agent_for(event, task_runs)
+        if agents is not None and agent_name not in agents:
+            continue
+
+        # Stream partial tokens
+        if kind == "on_chat_model_stream":
+            if "token" not in kinds:
+                continue
+            chunk = data.get("chunk")
+            content = getattr(chunk, "content", None)
+            if content:
+                yield {"type": "token", "content": content, "agent": agent_name}
+
+        # Tool start events (to show "Calling tool..." in UI)
+        elif kind == "on_tool_start":
+            if "tool_start" in kinds:
+                yield {
+                    "type": "tool_start",
+                    "tool": event["name"],
+                    "run_id": event["run_id"],
+                    "agent": agent_name,
+                    "input": data.get("input"),
+                }
+
+        # Tool end events, plus todo updates from write_todos
+        elif kind == "on_tool_end":
+            output = data.get("output")
+            if "tool_end" in kinds:
+                yield {
+                    "type": "tool_end",
+                    "tool": event["name"],
+                    "run_id": event["run_id"],
+                    "agent": agent_name,
+                    "output": output,
+                }
+            if "values" in kinds and event["name"] == "write_todos":
+                todos = _todos_from(output)
+                if todos is not None:
+                    yield {"type": "values", "todos": todos}
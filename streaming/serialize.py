@@ -0,0 +1,125 @@
+"""Chat Stream Serialisation.
+
+Encodes stream payloads (see `streaming.events`) as NDJSON lines with orjson,
+keeping them small:
+
+- strings longer than `RFP_STREAM_PREVIEW_CHARS` (default 2000) are cut to a
+  preview with a size marker
+- contents of /memories/ files (write_file inputs, read_file results) are
+  replaced by a reference to the `/api/files/{name}` endpoint
+- LangChain messages are reduced to the fields the UI uses instead of a full
+  `model_dump()`
+"""
+
+from os import getenv
+
+from langchain_core.messages import BaseMessage
+
+try:
+    import orjson
+
+    def _dumps(payload) -> bytes:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    import json
+
+    def _dumps(payload) -> bytes:
+        return (json.dumps(payload, default=str) + "\n").encode("utf-8")
+
+PREVIEW_CHARS = int(getenv("RFP_STREAM_PREVIEW_CHARS", "2000"))
+MEMORY_PREFIX = "/memories/"
+# Tools whose `file_path` argument points into the persisted memory folder
+FILE_TOOLS = {"read_file", "write_file", "edit_file"}
+
+
+def preview(text: str, limit: int = PREVIEW_CHARS) -> str:
+    """Cut `text` to `limit` characters, noting the full size."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n… [truncated, {len(text)} chars total]"
+
+
+def memory_ref(path: str, size: int) -> str:
+    """Placeholder for the content of a /memories/ file."""
+    return f"[{size} chars in {path} - GET /api/files/{path[len(MEMORY_PREFIX):]}]"
+
+
+def message_text(obj):
+    """Text of a tool result: a message, a Command (last message) or a string."""
+    if type(obj).__name__ == "Command":
+        update = getattr(obj, "update", None)
+        messages = update.get("messages", []) if isinstance(update, dict) else []
+        if messages and hasattr(messages[-1], "content"):
+            return messages[-1].content
+        return "Task Update processed."
+    if isinstance(obj, BaseMessage):
+        return obj.content
+    return obj
+
+
+def compact(obj, limit: int = PREVIEW_CHARS):
+    """Convert `obj` to JSON-native types, previewing long strings."""
+    if isinstance(obj, str):
+        return preview(obj, limit)
+    if obj is None or isinstance(obj, (bool, int, float)):
+        return obj
+    if isinstance(obj, dict):
+        return {k: compact(v, limit) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [compact(v, limit) for v in obj]
+    if type(obj).__name__ == "Command":
+        return compact(message_text(obj), limit)
+    if isinstance(obj, BaseMessage):
+        data = {"type": obj.type, "content": compact(obj.content, limit)}
+        for field in ("name", "tool_call_id", "status", "id"):
+            value = getattr(obj, field, None)
+            if value is not None:
+                data[field] = value
+        return data
+    if hasattr(obj, "model_dump"):
+        return compact(obj.model_dump(), limit)
+    return str(obj)
+
+
+class EventEncoder:
+    """Per-stream NDJSON encoder.
+
+    Remembers which tool runs touched a /memories/ file so that their results
+    can be sent as references instead of the file content.
+    """
+
+    def __init__(self, preview_chars: int = PREVIEW_CHARS):
+        self.preview_chars = preview_chars
+        self._memory_runs = {}
+
+    def encode(self, payload: dict) -> bytes:
+        kind = payload.get("type")
+        if kind == "tool_start":
+            payload["input"] = self._tool_input(payload)
+        elif kind == "tool_end":
+            payload["output"] = self._tool_output(payload)
+        elif kind == "values":
+            payload["todos"] = compact(payload["todos"], self.preview_chars)
+        return _dumps(payload)
+
+    def _tool_input(self, payload):
+        tool_input = payload.get("input")
+        if payload["tool"] in FILE_TOOLS and isinstance(tool_input, dict):
+            path = tool_input.get("file_path") or ""
+            if path.startswith(MEMORY_PREFIX):
+                self._memory_runs[payload["run_id"]] = path
+                if isinstance(tool_input.get("content"), str):
+                    tool_input = {**tool_input, "content": memory_ref(path, len(tool_input["content"]))}
+        return compact(tool_input, self.preview_chars)
+
+    def _tool_output(self, payload):
+        output = payload.get("output")
+        path = self._memory_runs.pop(payload["run_id"], None)
+        if path and payload["tool"] == "read_file":
+            text = message_text(output)
+            if isinstance(text, str) and len(text) > self.preview_chars:
+                reference = memory_ref(path, len(text))
+                if isinstance(output, BaseMessage):
+                    return {**compact(output, 0), "content": reference}
+                return reference
+        return compact(output, self.preview_chars)
@@ -0,0 +1,358 @@
+"""RFP Ingestion.
+
+RFP bundles arrive as PDFs, Word documents, Excel BOQs and zipped
+annexures. Every file is dispatched to the cheapest converter that handles
+its format adequately:
+
+- xlsx / xlsm: openpyxl in read-only streaming mode, one table per sheet
+- docx: python-docx, headings, paragraphs, lists and tables in order
+- csv, txt / md, html: the standard library / markdownify
+- pdf: the OCR-skipping fast path (tools/pdf_fastpath.py)
+- anything else (pptx, images, ...): docling's default converter
+
+Archives (zip) are unpacked, nested ones too, with limits on member count
+and total size. Files are converted concurrently (RFP_INGEST_WORKERS, with
+at most RFP_INGEST_HEAVY_WORKERS docling conversions at a time) and merged
+into one markdown bundle with an index of its files.
+
+Converters are pluggable: `@register("name", "ext", ...)` adds one for
+more extensions.
+"""
+
+import csv
+import hashlib
+import io
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from os import getenv
+from pathlib import PurePosixPath
+
+INGEST_WORKERS = int(getenv("RFP_INGEST_WORKERS", "4"))
+HEAVY_WORKERS = int(getenv("RFP_INGEST_HEAVY_WORKERS", "1"))
+MAX_ARCHIVE_FILES = int(getenv("RFP_INGEST_MAX_FILES", "200"))
+MAX_ARCHIVE_MB = float(getenv("RFP_INGEST_MAX_MB", "500"))
+MAX_SHEET_ROWS = int(getenv("RFP_INGEST_MAX_SHEET_ROWS", "10000"))
+MAX_ARCHIVE_DEPTH = 3
+
+# Office formats are zip files too; only these are unpacked as archives
+ARCHIVE_FORMATS = {"zip"}
+OFFICE_FORMATS = {"docx", "xlsx", "xlsm", "pptx"}
+
+# Converters that load docling models: limited to HEAVY_WORKERS at a time
+HEAVY_CONVERTERS = {"pdf-fastpath", "docling"}
+_heavy = threading.BoundedSemaphore(max(HEAVY_WORKERS, 1))
+
+
+@dataclass
+class Part:
+    """One converted file of a bundle."""
+
+    name: str
+    format: str
+    converter: str
+    size: int
+    markdown: str = ""
+    error: str = None
+    seconds: float = 0.0
+    # The conversion's exception, re-raised for single files
+    exception: Exception = field(default=None, repr=False)
+
+
+# extension -> (converter name, fn(name, data) -> markdown)
+CONVERTERS = {}
+
+# Bump when a converter's output changes: cached conversions are keyed by it
+CONVERTER_VERSION = 1
+
+
+def register(converter: str, *extensions):
+    """Decorator registering `fn(name, data) -> markdown` for file extensions."""
+    def decorator(fn):
+        for extension in extensions:
+            CONVERTERS[extension] = (converter, fn)
+        return fn
+    return decorator
+
+
+def converter_id(converter: str) -> str:
+    """Name and version of a converter's output, the key of its cached conversions.
+
+    "document" stands for `convert_document` (any format). PDF conversions
+    also depend on the fast-path settings.
+    """
+    if converter in ("pdf-fastpath", "document"):
+        from tools.pdf_fastpath import FAST_PATH, SKIP_TABLE_MODEL
+
+        converter += f"-fast{int(FAST_PATH)}{int(SKIP_TABLE_MODEL)}"
+    return f"{converter}-v{CONVERTER_VERSION}"
+
+
+def file_format(name: str, data: bytes) -> str:
+    """Format of a file from its extension, checked against its magic bytes."""
+    extension = PurePosixPath(name).suffix.lower().lstrip(".")
+    if data[:5] == b"%PDF-":
+        return "pdf"
+    if data[:4] == b"PK\x03\x04" and extension not in OFFICE_FORMATS:
+        return "zip"
+    return extension or "bin"
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    return str(value).replace("|", "\\|").replace("\n", " ").strip()
+
+
+def markdown_table(rows) -> str:
+    """Markdown table of `rows` (first row as header), without empty rows and trailing columns."""
+    rows = [[_cell(v) for v in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    while width > 1 and not any(len(row) >= width and row[width - 1] for row in rows):
+        width -= 1
+    rows = [(row + [""] * width)[:width] for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + "---|" * width]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+
+@register("openpyxl", "xlsx", "xlsm")
+def xlsx_markdown(name: str, data: bytes) -> str:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sections = []
+        for sheet in workbook.worksheets:
+            rows, truncated = [], False
+            for i, row in enumerate(sheet.iter_rows(values_only=True)):
+                if i >= MAX_SHEET_ROWS:
+                    truncated = True
+                    break
+                rows.append(row)
+            table = markdown_table(rows)
+            if table:
+                note = f"\n\n_(Truncated after {MAX_SHEET_ROWS} rows.)_" if truncated else ""
+                sections.append(f"## {sheet.title}\n\n{table}{note}")
+        return "\n\n".join(sections)
+    finally:
+        workbook.close()
+
+
+@register("python-docx", "docx")
+def docx_markdown(name: str, data: bytes) -> str:
+    from docx import Document
+    from docx.text.paragraph import Paragraph
+
+    blocks = []
+    for block in Document(io.BytesIO(data)).iter_inner_content():
+        if not isinstance(block, Paragraph):
+            blocks.append(markdown_table([cell.text for cell in row.cells] for row in block.rows))
+            continue
+        text = block.text.strip()
+        if not text:
+            continue
+        style = block.style.name if block.style is not None else ""
+        heading = re.match(r"Heading (\d)", style)
+        if heading:
+            blocks.append(f"{'#' * int(heading.group(1))} {text}")
+        elif style == "Title":
+            blocks.append(f"# {text}")
+        elif style.startswith("List"):
+            blocks.append(f"- {text}")
+        else:
+            blocks.append(text)
+    return "\n\n".join(b for b in blocks if b)
+
+
+@register("csv", "csv")
+def csv_markdown(name: str, data: bytes) -> str:
+    text = data.decode("utf-8-sig", errors="replace")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return markdown_table(csv.reader(io.StringIO(text), dialect))
+
+
+@register("text", "txt", "md")
+def text_markdown(name: str, data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+@register("markdownify", "html", "htm")
+def html_markdown(name: str, data: bytes) -> str:
+    from markdownify import markdownify
+
+    return markdownify(data.decode("utf-8", errors="replace"))
+
+
+@register("pdf-fastpath", "pdf")
+def pdf_markdown(name: str, data: bytes) -> str:
+    from tools.pdf_fastpath import convert_pdf
+
+    return convert_pdf(name, data)[0]
+
+
+def docling_markdown(name: str, data: bytes) -> str:
+    """Fallback: docling's default converter."""
+    from docling.datamodel.base_models import DocumentStream
+    from tools.tool import get_document_converter
+
+    result = get_document_converter().convert(DocumentStream(name=PurePosixPath(name).name, stream=io.BytesIO(data)))
+    return result.document.export_to_markdown()
+
+
+def _ignored(path: str) -> bool:
+    base = PurePosixPath(path).name
+    return path.startswith("__MACOSX/") or base.startswith((".", "~$")) or base in ("Thumbs.db", "desktop.ini")
+
+
+def new_budget() -> dict:
+    """Files and bytes a bundle may unpack to, across all its archives."""
+    return {"files": MAX_ARCHIVE_FILES, "bytes": int(MAX_ARCHIVE_MB * 2**20)}
+
+
+def unpack(name: str, data: bytes, depth: int = 0, budget: dict = None) -> list:
+    """Files of a zip archive as [(path, bytes)], nested archives unpacked.
+
+    The file count and unpacked size limits apply to the whole archive,
+    nested archives included: `budget` ({"files", "bytes"} remaining) is
+    shared down the recursion.
+
+    Raises:
+        ValueError: Too many files or too much data (e.g. a zip bomb)
+    """
+    budget = new_budget() if budget is None else budget
+    files = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        members = sorted((i for i in archive.infolist() if not i.is_dir() and not _ignored(i.filename)),
+                         key=lambda i: i.filename)
+        budget["files"] -= len(members)
+        if budget["files"] < 0:
+            raise ValueError(f"{name} has more than {MAX_ARCHIVE_FILES} files")
+        if sum(i.file_size for i in members) > budget["bytes"]:
+            raise ValueError(f"{name} unpacks to more than {MAX_ARCHIVE_MB:g} MB")
+        for info in members:
+            # Read at most the remaining budget: the sizes in the header can lie
+            with archive.open(info) as f:
+                member = f.read(budget["bytes"] + 1)
+            budget["bytes"] -= len(member)
+            if budget["bytes"] < 0:
+                raise ValueError(f"{name} unpacks to more than {MAX_ARCHIVE_MB:g} MB")
+            path = f"{name}/{info.filename}"
+            if file_format(info.filename, member) in ARCHIVE_FORMATS and depth < MAX_ARCHIVE_DEPTH:
+                # Its own bytes stay counted: they are held while it is unpacked
+                files += unpack(path, member, depth + 1, budget)
+            else:
+                files.append((path, member))
+    return files
+
+
+def convert_part(name: str, data: bytes, cache=None) -> Part:
+    """Convert one file with its format's converter; failures are recorded, not raised.
+
+    Args:
+        name: File name (its extension selects the converter)
+        data: File content
+        cache: Optional DownloadCache; conversions are reused by content digest
+    """
+    fmt = file_format(name, data)
+    converter, fn = CONVERTERS.get(fmt, ("docling", docling_markdown))
+    part = Part(name=name, format=fmt, converter=converter, size=len(data))
+    digest = hashlib.sha256(data).hexdigest() if cache is not None else None
+    if digest and (cached := cache.markdown(digest, converter_id(converter))) is not None:
+        part.markdown, part.converter = cached, f"{converter} (cached)"
+        return part
+
+    started = time.perf_counter()
+    try:
+        if converter in HEAVY_CONVERTERS:
+            with _heavy:
+                part.markdown = fn(name, data)
+        else:
+            part.markdown = fn(name, data)
+    except Exception as e:
+        part.error = f"{type(e).__name__}: {e}"
+        part.exception = e
+        print(f"DEBUG: Could not convert {name} with {converter}: {part.error}")
+    part.seconds = time.perf_counter() - started
+    if digest and part.error is None:
+        cache.put_markdown(digest, part.markdown, converter_id(converter))
+    return part
+
+
+def expand(files: list) -> list:
+    """Replace archives in [(name, bytes)] by their members (one budget for all archives)."""
+    expanded, budget = [], new_budget()
+    for name, data in files:
+        if file_format(name, data) in ARCHIVE_FORMATS:
+            expanded += unpack(name, data, budget=budget)
+        else:
+            expanded.append((name, data))
+    return expanded
+
+
+def convert_files(files: list, cache=None) -> list:
+    """Convert [(name, bytes)] concurrently into Parts, in the same order."""
+    if len(files) == 1:
+        return [convert_part(*files[0], cache=cache)]
+    with ThreadPoolExecutor(min(INGEST_WORKERS, len(files)), thread_name_prefix="rfp-ingest") as pool:
+        return list(pool.map(lambda f: convert_part(*f, cache=cache), files))
+
+
+def _demote(markdown: str, levels: int = 2) -> str:
+    """Shift headings down so a file's sections nest under its bundle section."""
+    return re.sub(r"^(#{1,6}) ", lambda m: "#" * min(len(m.group(1)) + levels, 6) + " ", markdown, flags=re.M)
+
+
+def _size(size: int) -> str:
+    return f"{size / 2**20:.1f} MB" if size >= 2**20 else f"{max(size // 1024, 1)} KB"
+
+
+def merge_bundle(title: str, parts: list) -> str:
+    """One markdown document: an index of the files, then each file's content."""
+    index = ["| # | File | Format | Converter | Size | Status |", "|---|---|---|---|---|---|"]
+    sections = []
+    for number, part in enumerate(parts, 1):
+        status = f"failed: {part.error}" if part.error else "ok"
+        index.append(f"| {number} | {part.name} | {part.format} | {part.converter} | {_size(part.size)} | {_cell(status)} |")
+        body = f"_Conversion failed: {part.error}_" if part.error else _demote(part.markdown)
+        sections.append(f"## {number}. {part.name}\n\n{body}")
+    return f"# RFP bundle: {title}\n\n{len(parts)} file(s); index:\n\n" + "\n".join(index) + "\n\n" + "\n\n".join(sections)
+
+
+def ingest(title: str, files: list, cache=None) -> str:
+    """Unpack, convert and merge [(name, bytes)] into one indexed bundle."""
+    started = time.perf_counter()
+    parts = convert_files(expand(files), cache)
+    failed = sum(1 for p in parts if p.error)
+    print(f"DEBUG: Ingested {len(parts)} file(s) of {title} in {time.perf_counter() - started:.1f}s"
+          + (f", {failed} failed" if failed else ""))
+    return merge_bundle(title, parts)
+
+
+def convert_document(name: str, data: bytes, cache=None) -> str:
+    """Markdown of one source: a bundle for archives, the converted file otherwise.
+
+    Raises:
+        Exception: The converter's exception, when a single file could not be
+            converted
+    """
+    if file_format(name, data) in ARCHIVE_FORMATS:
+        return ingest(name, [(name, data)], cache)
+    part = convert_part(name, data, cache)
+    if part.exception is not None:
+        raise part.exception
+    return part.markdown
@@ -0,0 +1,121 @@
+"""Offline Tool Stand-ins.
+
+Drop-in replacements (same tool names and arguments) for the tools that need
+network access, backed by the bundled samples in benchmarks/samples:
+
+- `get_pending_rfps`: lists the sample RFPs
+- `docling_convert`: "downloads" Drive URLs from the sample directory instead
+  of Google Drive, then converts/saves them like the real tool
+- `tavily_search`: returns canned search results
+
+Use them with `agent.create_rfp_agent(tools=OFFLINE_TOOLS)`.
+"""
+
+import json
+from pathlib import Path
+
+from langchain_core.tools import InjectedToolArg, tool
+from typing_extensions import Annotated, Literal
+
+from tools.resilience import error_result
+from tools.tool import get_document_converter, save_converted_markdown
+
+SAMPLES_DIR = Path(__file__).resolve().parent.parent / "benchmarks" / "samples"
+
+
+def load_pending_rfps(samples_dir: Path = SAMPLES_DIR) -> list:
+    """Read the bundled pending RFP list."""
+    with open(samples_dir / "pending_rfps.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_source(source: str, samples_dir: Path = SAMPLES_DIR) -> Path:
+    """Map a (Drive) source URL to its local sample file.
+
+    Args:
+        source: Source URL from `get_pending_rfps` or a local file path
+
+    Returns:
+        Path of the local file
+    """
+    for rfp in load_pending_rfps(samples_dir):
+        if rfp["source"] == source:
+            return samples_dir / rfp["file"]
+    path = Path(source)
+    if path.exists():
+        return path
+    raise FileNotFoundError(f"No offline copy of {source}")
+
+
+@tool("get_pending_rfps")
+def offline_get_pending_rfps() -> str:
+    """Returns a list of RFPs due in next 3 months from the document repository."""
+    pending_rfps = [
+        {"source": rfp["source"], "due_date": rfp["due_date"], "status": rfp["status"]}
+        for rfp in load_pending_rfps()
+    ]
+    return str(pending_rfps)
+
+
+@tool("docling_convert")
+def offline_docling_convert(source: str) -> str:
+    """Convert PDF/document to markdown and SAVE to memory.
+    
+    Args:
+        source: URL or file path
+        
+    Returns: The path where the file was saved.
+    """
+    try:
+        path = resolve_source(source)
+        if path.suffix == ".md":
+            # Bundled samples are already converted
+            markdown = path.read_text(encoding="utf-8")
+        else:
+            markdown = get_document_converter().convert(str(path)).document.export_to_markdown()
+        return save_converted_markdown(source, markdown)
+    except Exception as e:
+        return error_result("docling_convert", e)
+
+
+@tool("tavily_search", parse_docstring=True)
+def offline_tavily_search(
+    query: str,
+    max_results: Annotated[int, InjectedToolArg] = 1,
+    topic: Annotated[
+        Literal["general", "news", "finance"], InjectedToolArg
+    ] = "general",
+) -> str:
+    """Search the web for information on a given query.
+
+    Uses Tavily to discover relevant URLs, then fetches and returns full webpage content as markdown.
+
+    Args:
+        query: Search query to execute
+        max_results: Maximum number of results to return (default: 1)
+        topic: Topic filter - 'general', 'news', or 'finance' (default: 'general')
+
+    Returns:
+        Formatted search results with full webpage content
+    """
+    with open(SAMPLES_DIR / "tavily_results.json", encoding="utf-8") as f:
+        search_results = json.load(f)
+
+    result_texts = []
+    for result in search_results.get("results", [])[:max_results]:
+        result_texts.append(f"""## {result['title']}
+**URL:** {result['url']}
+
+{result['content']}
+
+---
+""")
+
+    return f"""🔍 Found {len(result_texts)} result(s) for '{query}':
+
+{chr(10).join(result_texts)}"""
+
+
+OFFLINE_TOOLS = {
+    t.name: t for t in (offline_get_pending_rfps, offline_docling_convert, offline_tavily_search)
+}
@@ -0,0 +1,228 @@
+"""PDF Fast Path.
+
+Most tender PDFs are digitally born: every page already carries a text
+layer, so docling's OCR stage only costs time. Before converting, each page
+is inspected with pypdfium2 (a docling dependency):
+
+- a page with enough readable text is converted without OCR; a page with
+  (almost) no text, garbled text or a full-page scan without text is OCRed
+- a page without ruled lines is converted without the table-structure model
+  (RFP_PDF_SKIP_TABLE_MODEL=0 keeps the model on every page)
+
+Consecutive pages with the same needs are converted together, each run with
+a docling converter configured for it, and the markdown is joined in page
+order. Every run is a docling pass, so runs are merged (taking the union of
+their needs) down to RFP_PDF_MAX_RUNS, cheapest merge first; a document
+whose pages alternate ends up as a single pass, the default pipeline. Runs
+that meet at two pages with ruled tables are always merged, so a table
+continuing across the break is not split. Every page's decision is logged
+(and appended to RFP_PDF_DECISION_LOG if set); RFP_PDF_FAST_PATH=0 converts
+all documents with the default (OCR + tables) pipeline.
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from io import BytesIO
+from os import getenv
+
+FAST_PATH = getenv("RFP_PDF_FAST_PATH", "1") != "0"
+SKIP_TABLE_MODEL = getenv("RFP_PDF_SKIP_TABLE_MODEL", "1") != "0"
+# Non-space characters a page needs to count as having a text layer
+MIN_TEXT_CHARS = int(getenv("RFP_PDF_MIN_TEXT_CHARS", "40"))
+# Image share of the page above which a page with little text is a scan
+MAX_IMAGE_COVERAGE = float(getenv("RFP_PDF_MAX_IMAGE_COVERAGE", "0.5"))
+# Ruled lines that make a page a table candidate
+TABLE_MIN_RULES = int(getenv("RFP_PDF_TABLE_MIN_RULES", "6"))
+# docling passes per document before runs are merged
+MAX_RUNS = int(getenv("RFP_PDF_MAX_RUNS", "4"))
+# Optional JSON-lines file the page decisions are appended to
+DECISION_LOG = getenv("RFP_PDF_DECISION_LOG", "")
+
+# Unreadable text layers (broken font encodings) come out as U+FFFD
+MAX_GARBLED = 0.1
+
+
+@dataclass
+class PageDecision:
+    """How one page is converted and why.
+
+    Attributes:
+        page: 1-based page number
+        chars: Non-space characters in the text layer
+        image_coverage: Share of the page covered by images
+        rules: Horizontal / vertical line segments (table borders)
+        ocr: Whether the page is OCRed
+        tables: Whether the table-structure model runs on the page
+        reason: Short explanation for the log
+    """
+
+    page: int
+    chars: int
+    image_coverage: float
+    rules: int
+    ocr: bool
+    tables: bool
+    reason: str
+
+
+def is_pdf(data: bytes) -> bool:
+    return data[:5] == b"%PDF-"
+
+
+def _bounds(obj):
+    # pypdfium2 5 renamed PdfObject.get_pos() to get_bounds()
+    return obj.get_bounds() if hasattr(obj, "get_bounds") else obj.get_pos()
+
+
+def decide_page(page_number: int, chars: int, garbled: float, image_coverage: float, rules: int) -> PageDecision:
+    """Decision for a page from its text layer, image coverage and ruled lines."""
+    if chars < MIN_TEXT_CHARS:
+        ocr, reason = True, f"no text layer ({chars} chars)"
+    elif garbled > MAX_GARBLED:
+        ocr, reason = True, f"unreadable text layer ({garbled:.0%} garbled)"
+    elif image_coverage > MAX_IMAGE_COVERAGE and chars < MIN_TEXT_CHARS * 5:
+        ocr, reason = True, f"scanned page ({image_coverage:.0%} image, {chars} chars)"
+    else:
+        ocr, reason = False, f"text layer ({chars} chars)"
+    tables = ocr or not SKIP_TABLE_MODEL or rules >= TABLE_MIN_RULES
+    return PageDecision(page_number, chars, round(image_coverage, 3), rules, ocr, tables, reason)
+
+
+def analyse_pdf(data: bytes) -> list:
+    """PageDecision for every page of a PDF."""
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+
+    decisions = []
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            chars = sum(1 for c in text if not c.isspace())
+            garbled = text.count("\ufffd") / max(chars, 1)
+
+            width, height = page.get_size()
+            image_area, rules = 0.0, 0
+            for obj in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_PATH)):
+                left, bottom, right, top = _bounds(obj)
+                w, h = right - left, top - bottom
+                if obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                    image_area += max(w, 0) * max(h, 0)
+                elif min(w, h) < 2 and max(w, h) > 20:
+                    rules += 1
+            page.close()
+            coverage = min(1.0, image_area / (width * height)) if width and height else 0.0
+            decisions.append(decide_page(index + 1, chars, garbled, coverage, rules))
+    finally:
+        pdf.close()
+    return decisions
+
+
+def _merge_cost(a: tuple, b: tuple) -> int:
+    """Pages that would run a model they do not need if runs `a` and `b` were merged.
+
+    OCR is weighted above the table model (it is the slower of the two).
+    """
+    cost = 0
+    for first, last, ocr, tables in (a, b):
+        pages = last - first + 1
+        cost += 2 * pages * (not ocr and (a[2] or b[2])) + pages * (not tables and (a[3] or b[3]))
+    return cost
+
+
+def page_runs(decisions: list, max_runs: int = MAX_RUNS) -> list:
+    """Group consecutive pages with the same needs: [(first, last, ocr, tables)].
+
+    Each run is one docling pass restricted to its page range. Runs meeting
+    at two pages with ruled lines are merged (a table may continue across
+    the break),
+    then the cheapest adjacent pair is merged while there are more than
+    `max_runs`; a merged run gets the union of both runs' needs.
+    """
+    runs = []
+    for d in decisions:
+        if runs and runs[-1][2:] == (d.ocr, d.tables):
+            runs[-1] = (runs[-1][0], d.page, d.ocr, d.tables)
+        else:
+            runs.append((d.page, d.page, d.ocr, d.tables))
+
+    def merge(i):
+        a, b = runs[i], runs[i + 1]
+        runs[i:i + 2] = [(a[0], b[1], a[2] or b[2], a[3] or b[3])]
+        # The merged run may now have the same needs as a neighbour
+        for j in (i, i - 1):
+            if 0 <= j < len(runs) - 1 and runs[j][2:] == runs[j + 1][2:]:
+                runs[j:j + 2] = [(runs[j][0], runs[j + 1][1], *runs[j][2:])]
+
+    ruled = {d.page for d in decisions if d.rules >= TABLE_MIN_RULES}
+    i = 0
+    while i < len(runs) - 1:
+        if runs[i][1] in ruled and runs[i + 1][0] in ruled:
+            merge(i)
+        else:
+            i += 1
+    while len(runs) > max(max_runs, 1):
+        merge(min(range(len(runs) - 1), key=lambda i: _merge_cost(runs[i], runs[i + 1])))
+    return runs
+
+
+@lru_cache(maxsize=4)
+def get_pdf_converter(ocr: bool, tables: bool):
+    """docling converter with OCR and/or the table-structure model switched off."""
+    if ocr and tables:
+        from tools.tool import get_document_converter
+
+        return get_document_converter()
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    options = PdfPipelineOptions(do_ocr=ocr, do_table_structure=tables)
+    return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=options)})
+
+
+def log_decisions(name: str, decisions: list):
+    for d in decisions:
+        print(f"DEBUG: {name} page {d.page}: {'OCR' if d.ocr else 'no OCR'}, "
+              f"{'table model' if d.tables else 'no table model'} - {d.reason}, {d.rules} rules")
+    fast = sum(not d.ocr for d in decisions)
+    no_tables = sum(not d.tables for d in decisions)
+    print(f"DEBUG: {name}: {fast}/{len(decisions)} pages without OCR, {no_tables} without the table model")
+    if DECISION_LOG:
+        with open(DECISION_LOG, "a", encoding="utf-8") as f:
+            for d in decisions:
+                f.write(json.dumps({"document": name, "time": time.time(), **asdict(d)}) + "\n")
+
+
+def convert_pdf(name: str, data: bytes):
+    """Convert a PDF to markdown, skipping OCR / table models where not needed.
+
+    Returns:
+        (markdown, list of page decisions as dicts)
+    """
+    from docling.datamodel.base_models import DocumentStream
+
+    decisions = []
+    if FAST_PATH:
+        try:
+            decisions = analyse_pdf(data)
+        except Exception as e:
+            print(f"DEBUG: Could not inspect {name} ({e}), converting with OCR")
+    if not decisions:
+        result = get_pdf_converter(True, True).convert(DocumentStream(name=name, stream=BytesIO(data)))
+        return result.document.export_to_markdown(), []
+
+    log_decisions(name, decisions)
+    runs = page_runs(decisions)
+    print(f"DEBUG: {name}: {len(runs)} docling pass(es) for {len(decisions)} pages")
+    parts = []
+    for first, last, ocr, tables in runs:
+        stream = DocumentStream(name=name, stream=BytesIO(data))
+        result = get_pdf_converter(ocr, tables).convert(stream, page_range=(first, last))
+        parts.append(result.document.export_to_markdown())
+    return "\n\n".join(parts), [asdict(d) for d in decisions]
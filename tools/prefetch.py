@@ -0,0 +1,199 @@
+"""RFP Source Prefetcher.
+
+As soon as `get_pending_rfps` has listed the candidate RFPs, their sources
+are downloaded concurrently into the download cache (`storage.downloads`),
+and - with RFP_PREFETCH_CONVERT=1 - converted to markdown in the background.
+By the time the sales agent picks an RFP and calls `docling_convert`, the
+document is usually local, often already converted; a download or
+conversion still in progress is waited for instead of being started again.
+
+Settings:
+    RFP_PREFETCH: 0 disables prefetching (docling_convert still uses the cache)
+    RFP_PREFETCH_WORKERS: concurrent downloads (default 4)
+    RFP_PREFETCH_CONVERT: 1 also converts prefetched documents (default 0;
+        docling is CPU and memory heavy, conversions run one at a time)
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import getenv
+
+from storage.downloads import DownloadCache
+from tools.resilience import call, host_of, tool_deadline
+
+PREFETCH = getenv("RFP_PREFETCH", "1") != "0"
+PREFETCH_WORKERS = int(getenv("RFP_PREFETCH_WORKERS", "4"))
+PREFETCH_CONVERT = getenv("RFP_PREFETCH_CONVERT", "0") == "1"
+
+
+def document_markdown(name: str, data: bytes) -> str:
+    """Convert a downloaded document (or archive) with the ingestion converters."""
+    from tools.ingest import convert_document
+
+    return convert_document(name, data)
+
+
+def document_converter_id() -> str:
+    from tools.ingest import converter_id
+
+    return converter_id("document")
+
+
+class Prefetcher:
+    """Concurrent downloads and background conversions of RFP sources.
+
+    Each source is downloaded and each document converted at most once at a
+    time: callers asking for one in progress wait for it.
+
+    Args:
+        cache: DownloadCache the documents are kept in
+        workers: Concurrent downloads
+        convert: Whether prefetched documents are also converted
+        converter: (file name, bytes) -> markdown
+        converter_id: Name and version of `converter`'s output, keying its
+            cached conversions (default: the ingestion converters' id)
+    """
+
+    def __init__(self, cache: DownloadCache = None, workers: int = PREFETCH_WORKERS,
+                 convert: bool = PREFETCH_CONVERT, converter=document_markdown, converter_id: str = None):
+        self.cache = cache or DownloadCache()
+        self.convert_in_background = convert
+        self.converter = converter
+        if converter_id is None:
+            converter_id = document_converter_id() if converter is document_markdown else converter.__name__
+        self.converter_id = converter_id
+        self._downloads = ThreadPoolExecutor(workers, thread_name_prefix="rfp-prefetch")
+        self._conversions = ThreadPoolExecutor(1, thread_name_prefix="rfp-convert")
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _claim(self, key):
+        """(future, True) if the caller must run the work for `key`, else (future in progress, False)."""
+        with self._lock:
+            if key in self._inflight:
+                return self._inflight[key], False
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._inflight[key] = future
+            return future, True
+
+    def _run(self, key, future: Future, fn):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _download(self, url: str, deadline: float = None):
+        return call(
+            "docling_download",
+            lambda remaining: self.cache.download(url, remaining),
+            host=host_of(url),
+            deadline=deadline,
+        )
+
+    def prefetch(self, sources) -> int:
+        """Start downloading (and converting) the remote `sources` not cached yet.
+
+        Returns:
+            Number of downloads started
+        """
+        started = 0
+        for url in dict.fromkeys(s for s in sources if host_of(s)):
+            entry = self.cache.lookup(url)
+            if entry is not None:
+                if self.convert_in_background:
+                    self._convert_later(entry)
+                continue
+            future, mine = self._claim(("download", url))
+            if not mine:
+                continue
+            self._downloads.submit(self._run, ("download", url), future, lambda url=url: self._download(url))
+            if self.convert_in_background:
+                future.add_done_callback(lambda f: f.exception() is None and self._convert_later(f.result()))
+            started += 1
+        if started:
+            print(f"DEBUG: Prefetching {started} RFP source(s)")
+        return started
+
+    def fetch(self, url: str, timeout: float):
+        """DownloadEntry of `url`: from the cache, a prefetch in progress, or a new download."""
+        entry = self.cache.lookup(url)
+        if entry is not None:
+            return entry
+        future, mine = self._claim(("download", url))
+        if mine:
+            self._run(("download", url), future, lambda: self._download(url, timeout))
+        elif not future.done():
+            print(f"DEBUG: Waiting for the prefetch of {url}")
+        return future.result(timeout=timeout)
+
+    def _convert(self, entry) -> str:
+        markdown = self.cache.markdown(entry.digest, self.converter_id)
+        if markdown is None:
+            started = time.perf_counter()
+            markdown = self.converter(entry.name, self.cache.read(entry))
+            self.cache.put_markdown(entry.digest, markdown, self.converter_id)
+            print(f"DEBUG: Converted {entry.name} in {time.perf_counter() - started:.1f}s")
+        return markdown
+
+    def _convert_later(self, entry):
+        if self.cache.markdown(entry.digest, self.converter_id) is not None:
+            return
+        future, mine = self._claim(("convert", entry.digest))
+        if mine:
+            self._conversions.submit(self._run, ("convert", entry.digest), future, lambda: self._convert(entry))
+
+    def markdown(self, url: str, timeout: float = None) -> str:
+        """Markdown of the document at `url`, downloading and converting as needed.
+
+        Args:
+            url: Source URL
+            timeout: Seconds for download and conversion (default: the
+                docling_convert deadline)
+        """
+        timeout = tool_deadline("docling_convert") if timeout is None else timeout
+        end = time.monotonic() + timeout
+        entry = self.fetch(url, min(timeout, tool_deadline("docling_download")))
+        markdown = self.cache.markdown(entry.digest, self.converter_id)
+        if markdown is not None:
+            return markdown
+
+        future, mine = self._claim(("convert", entry.digest))
+        if mine:
+            # Conversion cannot be interrupted: run it in its own thread so the
+            # deadline frees the caller (the result is still cached when done)
+            threading.Thread(
+                target=self._run, args=(("convert", entry.digest), future, lambda: self._convert(entry)),
+                name="rfp-convert", daemon=True,
+            ).start()
+        else:
+            print(f"DEBUG: Waiting for the background conversion of {entry.name}")
+        return future.result(timeout=max(0.0, end - time.monotonic()))
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """The shared prefetcher over the RFP_DOWNLOAD_DIR cache."""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+
+def prefetch_sources(sources):
+    """Start prefetching `sources` unless RFP_PREFETCH=0; never raises."""
+    if not PREFETCH:
+        return
+    try:
+        get_prefetcher().prefetch(sources)
+    except Exception as e:
+        print(f"DEBUG: Prefetch failed to start: {e}")
@@ -0,0 +1,306 @@
+"""Tool Resilience.
+
+Deadlines, retries and circuit breakers for tools that call external
+services (web pages, Tavily, RFP downloads, document conversion):
+
+- every tool has a deadline covering all of its attempts
+  (`RFP_TOOL_DEADLINES`, e.g. "docling_convert=600,fetch_webpage=5")
+- transient failures (timeouts, connection errors, 429 and 5xx responses)
+  are retried up to `RFP_TOOL_RETRIES` times with full-jitter exponential
+  backoff, never past the deadline
+- each host has a circuit breaker: after `RFP_BREAKER_FAILURES` transient
+  failures in a row it opens and calls to that host fail at once for
+  `RFP_BREAKER_RESET_S` seconds, then a single probe call decides whether
+  it closes again
+- failures are returned to the agent as a structured `ERROR: {...}` result
+  (tool, kind, retryable, host, message) instead of a raw exception text
+
+Usage:
+    result = call("fetch_webpage", lambda timeout: httpx.get(url, timeout=timeout), host=host_of(url))
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from os import getenv
+from urllib.parse import urlsplit
+
+import httpx
+
+from observability.metrics import CIRCUIT_OPEN, TOOL_FAILURES
+
+# Seconds per tool, all attempts included
+DEFAULT_DEADLINES = {
+    "fetch_webpage": 15.0,
+    "tavily_search": 60.0,
+    "docling_download": 60.0,
+    "docling_convert": 300.0,
+    "ingest_rfp_bundle": 600.0,
+}
+TOOL_RETRIES = int(getenv("RFP_TOOL_RETRIES", "2"))
+RETRY_BASE_S = float(getenv("RFP_TOOL_RETRY_BASE_S", "0.5"))
+RETRY_MAX_S = float(getenv("RFP_TOOL_RETRY_MAX_S", "8"))
+BREAKER_FAILURES = int(getenv("RFP_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(getenv("RFP_BREAKER_RESET_S", "60"))
+
+# Client errors worth retrying: request timeout, too early, too many requests
+RETRYABLE_STATUS = {408, 425, 429}
+
+# Exceptions of the tavily and requests libraries, matched by name so neither
+# has to be imported here: name -> (kind, retryable)
+LIBRARY_ERRORS = {
+    ("tavily", "TimeoutError"): ("timeout", True),
+    ("tavily", "UsageLimitExceededError"): ("rate_limited", False),
+    ("tavily", "InvalidAPIKeyError"): ("auth", False),
+    ("tavily", "MissingAPIKeyError"): ("auth", False),
+    ("tavily", "ForbiddenError"): ("auth", False),
+    ("tavily", "BadRequestError"): ("bad_request", False),
+    ("requests", "ConnectTimeout"): ("timeout", True),
+    ("requests", "ReadTimeout"): ("timeout", True),
+    ("requests", "Timeout"): ("timeout", True),
+    ("requests", "ConnectionError"): ("unavailable", True),
+}
+
+
+def _parse_deadlines(value: str) -> dict:
+    deadlines = dict(DEFAULT_DEADLINES)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, seconds = item.partition("=")
+        try:
+            deadlines[name.strip()] = float(seconds)
+        except ValueError:
+            print(f"DEBUG: Ignoring invalid RFP_TOOL_DEADLINES entry {item!r}")
+    return deadlines
+
+
+TOOL_DEADLINES = _parse_deadlines(getenv("RFP_TOOL_DEADLINES", ""))
+
+
+def tool_deadline(tool: str) -> float:
+    return TOOL_DEADLINES.get(tool, 60.0)
+
+
+def host_of(url: str):
+    """Host (and explicit port) a URL's circuit breaker is keyed by; None for local paths."""
+    if not url.startswith(("http://", "https://")):
+        return None
+    parts = urlsplit(url)
+    return f"{parts.hostname}:{parts.port}" if parts.port else parts.hostname
+
+
+class ToolFailure(Exception):
+    """A classified tool failure.
+
+    Args:
+        kind: timeout, unavailable, http_error, rate_limited, auth,
+            bad_request, too_large, circuit_open or error
+        message: Human readable cause
+        retryable: Whether trying again later may succeed
+        host: Host the call went to, if any
+        retry_after: Seconds until a retry makes sense, if known
+    """
+
+    def __init__(self, kind: str, message: str, retryable: bool = False, host: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+        self.retryable = retryable
+        self.host = host
+        self.retry_after = retry_after
+
+    def as_dict(self, tool: str) -> dict:
+        result = {"tool": tool, "kind": self.kind, "retryable": self.retryable, "message": self.message}
+        if self.host:
+            result["host"] = self.host
+        if self.retry_after is not None:
+            result["retry_after_s"] = round(self.retry_after, 1)
+        return result
+
+
+def _retry_after(response) -> float:
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+def classify(exc: BaseException, host: str = None) -> ToolFailure:
+    """Map an exception from a tool call to a ToolFailure."""
+    if isinstance(exc, ToolFailure):
+        return exc
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        retryable = code in RETRYABLE_STATUS or code >= 500
+        kind = "rate_limited" if code == 429 else "http_error"
+        return ToolFailure(kind, f"HTTP {code} from {exc.request.url}", retryable, host, _retry_after(exc.response))
+    if isinstance(exc, httpx.TimeoutException):
+        return ToolFailure("timeout", f"{type(exc).__name__}: {exc}", True, host)
+    if isinstance(exc, httpx.TransportError):
+        return ToolFailure("unavailable", f"{type(exc).__name__}: {exc}", True, host)
+    if isinstance(exc, (TimeoutError, FutureTimeoutError)):
+        return ToolFailure("timeout", str(exc) or "timed out", True, host)
+    library = type(exc).__module__.split(".")[0]
+    for cls in type(exc).__mro__:
+        if (library, cls.__name__) in LIBRARY_ERRORS:
+            kind, retryable = LIBRARY_ERRORS[(library, cls.__name__)]
+            return ToolFailure(kind, f"{type(exc).__name__}: {exc}", retryable, host)
+    return ToolFailure("error", f"{type(exc).__name__}: {exc}", False, host)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one host.
+
+    Closed: calls pass. Open: calls fail at once until `reset_s` has passed.
+    Half-open: one probe call passes; its outcome closes or re-opens the
+    circuit, other calls fail at once meanwhile.
+    """
+
+    def __init__(self, host: str, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S, clock=time.monotonic):
+        self.host = host
+        self.failures = failures
+        self.reset_s = reset_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._clock() - self._opened_at >= self.reset_s else "open"
+
+    def before(self):
+        """Raise ToolFailure(circuit_open) unless a call may go through now."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                print(f"DEBUG: Circuit for {self.host} half-open, probing")
+                return
+            wait = max(0.0, self._opened_at + self.reset_s - self._clock())
+        raise ToolFailure("circuit_open", f"{self.host} is failing, calls are paused", True, self.host, wait)
+
+    def success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"DEBUG: Circuit for {self.host} closed")
+                CIRCUIT_OPEN.labels(host=self.host).set(0)
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or self._consecutive >= self.failures:
+                if self._opened_at is None or self._probing:
+                    print(f"DEBUG: Circuit for {self.host} opened after {self._consecutive} failures")
+                self._opened_at = self._clock()
+                self._probing = False
+                CIRCUIT_OPEN.labels(host=self.host).set(1)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` + 1."""
+    return random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * 2 ** attempt))
+
+
+def call(tool: str, fn, host: str = None, deadline: float = None, retries: int = None):
+    """Call `fn(timeout)` with the tool's deadline, retries and host breaker.
+
+    Args:
+        tool: Tool name (deadline lookup, metrics and error results)
+        fn: Makes one attempt; receives the seconds left before the deadline
+        host: Host the call goes to, for its circuit breaker
+        deadline: Seconds for all attempts (default: the tool's deadline)
+        retries: Extra attempts for transient failures (default: RFP_TOOL_RETRIES)
+
+    Returns:
+        What `fn` returned
+
+    Raises:
+        ToolFailure: The last failure, or circuit_open / timeout
+    """
+    deadline = tool_deadline(tool) if deadline is None else deadline
+    retries = TOOL_RETRIES if retries is None else retries
+    breaker = get_breaker(host) if host else None
+    end = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            TOOL_FAILURES.labels(tool=tool, kind="timeout").inc()
+            raise ToolFailure("timeout", f"{tool} exceeded its {deadline:g}s deadline", True, host)
+        if breaker:
+            try:
+                breaker.before()
+            except ToolFailure:
+                TOOL_FAILURES.labels(tool=tool, kind="circuit_open").inc()
+                raise
+        try:
+            result = fn(remaining)
+        except Exception as e:
+            failure = classify(e, host)
+            TOOL_FAILURES.labels(tool=tool, kind=failure.kind).inc()
+            if breaker:
+                # A non-transient error (404, bad API key) means the host answered
+                breaker.failure() if failure.retryable else breaker.success()
+            delay = max(backoff(attempt), failure.retry_after or 0.0)
+            if not failure.retryable or attempt >= retries or time.monotonic() + delay >= end:
+                raise failure from e
+            print(f"DEBUG: {tool} attempt {attempt + 1} failed ({failure.kind}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if breaker:
+            breaker.success()
+        return result
+
+
+def run_with_deadline(fn, timeout: float):
+    """Run `fn()` in a worker thread and give up waiting after `timeout` seconds.
+
+    For blocking work that takes no timeout of its own (document conversion).
+    The thread cannot be interrupted: on timeout it finishes in the
+    background and its result is dropped, but the caller is freed.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, name="tool-deadline", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"no result after {timeout:g}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def error_result(tool: str, error: BaseException, host: str = None) -> str:
+    """Structured tool result describing a failure, for the agent to act on."""
+    failure = classify(error, host)
+    hint = "Retry later or use another source." if failure.retryable else "Do not retry with the same input."
+    return f"ERROR: {json.dumps(failure.as_dict(tool))}\n{hint}"
@@ -4,40 +4,68 @@ This module provides search and content processing utilities for the research ag
 using Tavily for URL discovery and fetching full webpage content.
 """
 
+from functools import lru_cache
+
 import httpx
 from langchain_core.tools import InjectedToolArg, tool
-from markdownify import markdownify
 # from tavily import TavilyClient
 from typing_extensions import Annotated, Literal
 from dotenv import load_dotenv
 load_dotenv()
 import os
-from tavily.async_tavily import AsyncTavilyClient
-tavily_client = AsyncTavilyClient(api_key="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")
-import pandas as pd
-from docling.document_converter import DocumentConverter
+
+from tools.prefetch import get_prefetcher, prefetch_sources
+from tools.resilience import ToolFailure, call, error_result, host_of, run_with_deadline, tool_deadline
+
+# Heavy dependencies (tavily, markdownify, pandas, docling) are imported by the
+# tools that use them, so importing this module stays cheap.
+
+
+# Tavily API host, for its circuit breaker
+TAVILY_HOST = "api.tavily.com"
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+@lru_cache(maxsize=1)
+def get_tavily_client():
+    # The tools run synchronously (async runs call them in a worker thread)
+    from tavily import TavilyClient
+
+    return TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+
+
+@lru_cache(maxsize=1)
+def get_document_converter():
+    """Docling converter, created once (loading its models is expensive)."""
+    from docling.document_converter import DocumentConverter
+
+    return DocumentConverter()
 
 
-def fetch_webpage_content(url: str, timeout: float = 10.0) -> str:
+def fetch_webpage_content(url: str, timeout: float = None) -> str:
     """Fetch and convert webpage content to markdown.
 
     Args:
         url: URL to fetch
-        timeout: Request timeout in seconds
+        timeout: Seconds for all attempts (default: the fetch_webpage deadline)
 
     Returns:
-        Webpage content as markdown
+        Webpage content as markdown, or a structured error result
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    from markdownify import markdownify
 
-    try:
-        response = httpx.get(url, headers=headers, timeout=timeout)
+    def attempt(remaining):
+        response = httpx.get(url, headers=BROWSER_HEADERS, timeout=remaining, follow_redirects=True)
         response.raise_for_status()
-        return markdownify(response.text)
+        return response.text
+
+    try:
+        return markdownify(call("fetch_webpage", attempt, host=host_of(url), deadline=timeout))
     except Exception as e:
-        return f"Error fetching content from {url}: {str(e)}"
+        return error_result("fetch_webpage", e, host_of(url))
 
 
 @tool(parse_docstring=True)
@@ -60,12 +88,18 @@ def tavily_search(
     Returns:
         Formatted search results with full webpage content
     """
+    if not os.getenv("TAVILY_API_KEY"):
+        return error_result("tavily_search", ToolFailure("auth", "TAVILY_API_KEY is not set", host=TAVILY_HOST))
+
     # Use Tavily to discover URLs
-    search_results = tavily_client.search(
-        query,
-        max_results=max_results,
-        topic=topic,
-    )
+    try:
+        search_results = call(
+            "tavily_search",
+            lambda remaining: get_tavily_client().search(query, max_results=max_results, topic=topic, timeout=remaining),
+            host=TAVILY_HOST,
+        )
+    except Exception as e:
+        return error_result("tavily_search", e, TAVILY_HOST)
 
     # Fetch full content for each URL
     result_texts = []
@@ -124,30 +158,35 @@ def think_tool(reflection: str) -> str:
 @tool
 def get_all_products() -> str:
     """Lookup product specifications in the product catalog."""
-    # For demonstration, returning a static response
-    df = pd.read_csv("artifacts/Product_datasheet.csv")
-    markdown = df.to_markdown()
-    return markdown
+    # Memory-mapped compiled catalog (storage/catalog.py), rendered once per version
+    from storage.catalog import catalog_markdown
+
+    return catalog_markdown("artifacts/Product_datasheet.csv")
 
 @tool
 def get_price() -> str:
     """Lookup product specifications in the product catalog."""
-    # For demonstration, returning a static response
-    df = pd.read_csv("artifacts/product_price.csv")
-    markdown = df.to_markdown()
-    return markdown
+    from storage.catalog import catalog_markdown
+
+    return catalog_markdown("artifacts/product_price.csv")
 
 
 # # Example usage
 # response = llm.invoke("What NFL team won the Super Bowl in the year Justin Bieber was born?")
 # print(response.content)
 
+def list_pending_rfps() -> list:
+    """RFPs due in the next 3 months, without side effects (also fingerprints the sales stage)."""
+    # For demonstration, returning a static list
+    return [{"source":"https://drive.google.com/uc?export=download&id=1rme2gd0GoWmuD-TnC81nHHapL1FNWFG5", "due_date":"20-12-2025", "status": "open"}]
+
 @tool 
 def get_pending_rfps() -> str:
     """Returns a list of RFPs due in next 3 months from the document repository."""
-    # For demonstration, returning a static list
+    pending_rfps = list_pending_rfps()
 
-    pending_rfps = [{"source":"https://drive.google.com/uc?export=download&id=1rme2gd0GoWmuD-TnC81nHHapL1FNWFG5", "due_date":"20-12-2025", "status": "open"}]
+    # Start downloading every candidate while the agent decides which to convert
+    prefetch_sources([rfp["source"] for rfp in pending_rfps])
 
     return str(pending_rfps)
 
@@ -155,9 +194,37 @@ def get_pending_rfps() -> str:
 import os
 import hashlib
 from pathlib import Path
-from docling.document_converter import DocumentConverter
 from langchain_core.tools import tool
 
+from storage.artifacts import get_artifact_store
+
+def save_converted_markdown(source: str, markdown: str, name: str = None) -> str:
+    """Save converted markdown under ./agent_memories and describe it for the agent.
+
+    Args:
+        source: URL or file path the markdown was converted from
+        markdown: Converted document
+        name: File name stem to use instead of one derived from `source`
+
+    Returns: Tool message with the virtual /memories/ path of the saved file.
+    """
+    # Generate a safe filename
+    # Use a hash or original stem to ensure valid filename
+    if name is None and source.startswith("http"):
+         name = hashlib.md5(source.encode()).hexdigest()[:8]
+    elif name is None:
+         name = Path(source).stem
+         
+    filename = f"doc_{name}.md"
+    
+    # Save to the artifact store (./agent_memories)
+    # We configured agent.py to map /memories/ -> ./agent_memories
+    get_artifact_store("./agent_memories").write(filename, markdown)
+        
+    # Return the VIRTUAL path to the agent
+    return f"SAVED to /memories/{filename}\n(Use read_file('/memories/{filename}') to access content)"
+
+
 @tool
 def docling_convert(source: str) -> str:
     """Convert PDF/document to markdown and SAVE to memory.
@@ -168,31 +235,52 @@ def docling_convert(source: str) -> str:
     Returns: The path where the file was saved.
     """
     try:
-        # 1. Convert
-        converter = DocumentConverter()
-        result = converter.convert(source)
-        markdown = result.document.export_to_markdown()
-        
-        # 2. Generate a safe filename
-        # Use a hash or original stem to ensure valid filename
-        if source.startswith("http"):
-             name = hashlib.md5(source.encode()).hexdigest()[:8]
+        # 1. Convert; remote sources go through the download cache, where
+        #    get_pending_rfps may already have prefetched (and converted) them
+        if host_of(source):
+            markdown = get_prefetcher().markdown(source, tool_deadline("docling_convert"))
         else:
-             name = Path(source).stem
-             
-        filename = f"doc_{name}.md"
-        
-        # 3. Save to physical location (./agent_memories)
-        # We configured agent.py to map /memories/ -> ./agent_memories
-        physical_dir = "./agent_memories"
-        os.makedirs(physical_dir, exist_ok=True)
-        physical_path = os.path.join(physical_dir, filename)
-        
-        with open(physical_path, "w", encoding="utf-8") as f:
-            f.write(markdown)
-            
-        # 4. Return the VIRTUAL path to the agent
-        return f"SAVED to /memories/{filename}\n(Use read_file('/memories/{filename}') to access content)"
+            # Format-specific converters; archives become an indexed bundle
+            from tools.ingest import convert_document
+
+            data = Path(source).read_bytes()
+            markdown = run_with_deadline(lambda: convert_document(Path(source).name, data), tool_deadline("docling_convert"))
+
+        # 2. Save and return the VIRTUAL path to the agent
+        return save_converted_markdown(source, markdown)
         
     except Exception as e:
-        return f"ERROR: {str(e)}"
\ No newline at end of file
+        return error_result("docling_convert", e, host_of(source))
+
+
+@tool
+def ingest_rfp_bundle(sources: list[str], title: str = "") -> str:
+    """Convert ALL documents of one RFP (PDF, DOCX, XLSX BOQs, ZIP annexures, ...) into ONE indexed markdown bundle and SAVE it to memory.
+
+    Use this instead of `docling_convert` when an RFP consists of several files.
+
+    Args:
+        sources: URLs or file paths of the RFP's documents
+        title: Optional name of the RFP, used as the bundle title
+
+    Returns: The path where the bundle was saved.
+    """
+    from tools.ingest import ingest
+
+    title = title or ", ".join(Path(s).name for s in sources)
+    try:
+        # Remote documents download concurrently through the prefetch cache
+        prefetcher = get_prefetcher()
+        prefetcher.prefetch(sources)
+        files = []
+        for source in sources:
+            if host_of(source):
+                entry = prefetcher.fetch(source, tool_deadline("docling_download"))
+                files.append((entry.name, prefetcher.cache.read(entry)))
+            else:
+                files.append((Path(source).name, Path(source).read_bytes()))
+        markdown = run_with_deadline(lambda: ingest(title, files, prefetcher.cache), tool_deadline("ingest_rfp_bundle"))
+        name = "bundle_" + hashlib.md5("\n".join(sources).encode()).hexdigest()[:8]
+        return save_converted_markdown(sources[0], markdown, name=name)
+    except Exception as e:
+        return error_result("ingest_rfp_bundle", e)
@@ -0,0 +1,64 @@
+"""Chat API Client for the Streamlit Apps.
+
+The Streamlit apps no longer run the agent in the script thread; they stream
+`POST /api/chat` from `server.py` and render events as they arrive. All
+sessions of a Streamlit process share one HTTP connection pool.
+
+Environment variables:
+    RFP_API_URL: base URL of the API server (default http://localhost:8000)
+"""
+
+import json
+from os import getenv
+
+import httpx
+import streamlit as st
+
+API_URL = getenv("RFP_API_URL", "http://localhost:8000")
+
+
+class ChatAPIError(Exception):
+    """The server refused or failed the chat request."""
+
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """HTTP client (connection pool) shared by every session of this process."""
+    return httpx.Client(
+        base_url=API_URL,
+        # Runs stream for minutes: no read timeout, but fail fast on connect
+        timeout=httpx.Timeout(10.0, read=None),
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+    )
+
+
+def stream_chat(messages, thread_id: str, events=None, agents=None):
+    """Stream a chat run from the API server.
+
+    Args:
+        messages: Conversation as {"role": ..., "content": ...} dicts
+        thread_id: Conversation thread
+        events: Optional event kinds to receive (see streaming.events)
+        agents: Optional agent names to receive events for
+
+    Yields:
+        Event payload dicts, as soon as each NDJSON line arrives
+
+    Raises:
+        ChatAPIError: If the server rejects the request (e.g. 429 when busy)
+    """
+    body = {"messages": messages, "thread_id": thread_id, "events": events, "agents": agents}
+    with get_client().stream("POST", "/api/chat", json=body) as response:
+        if response.status_code == 429:
+            response.read()
+            detail = response.json().get("detail", {})
+            raise ChatAPIError(
+                f"Server is busy ({detail.get('reason', 'rate limited')}), "
+                f"please retry in {response.headers.get('Retry-After', 'a few')} seconds."
+            )
+        if response.status_code >= 400:
+            response.read()
+            raise ChatAPIError(f"Server error {response.status_code}: {response.text[:500]}")
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
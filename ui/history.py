@@ -0,0 +1,108 @@
+"""Chat History Rendering.
+
+Streamlit re-runs the whole script on every interaction, so the history is
+rendered from precomputed blocks:
+
+- every message has a stable id; its blocks (markdown, collapsed workflow
+  steps and tool outputs, long content split off) are built once per id and
+  display options, then cached in the session
+- only the newest `RFP_UI_PAGE_SIZE` messages are rendered; older pages are
+  loaded on demand inside a fragment, so paging does not rerun the app
+- tool outputs and long messages (e.g. whole RFP documents) are collapsed
+  into expanders with a bounded preview
+"""
+
+import uuid
+from os import getenv
+
+import streamlit as st
+
+PAGE_SIZE = int(getenv("RFP_UI_PAGE_SIZE", "20"))
+LONG_MESSAGE_CHARS = 4000
+TOOL_OUTPUT_CHARS = 1000
+
+
+def new_message(role: str, content: str, **extra) -> dict:
+    """History entry with a stable id used as the render cache key."""
+    return {"id": uuid.uuid4().hex, "role": role, "content": content, **extra}
+
+
+def output_text(output, limit: int = TOOL_OUTPUT_CHARS):
+    """Bounded text preview of a streamed tool output (string or message dict)."""
+    if output is None:
+        return None
+    if isinstance(output, dict) and "content" in output:
+        output = output["content"]
+    text = output if isinstance(output, str) else str(output)
+    return text[:limit] + ("..." if len(text) > limit else "")
+
+
+def message_blocks(message: dict, show_thinking: bool, show_tool_calls: bool) -> tuple:
+    """Render plan for one message as a tuple of blocks.
+
+    Blocks are ("markdown", text), ("error", text), ("code", text) or
+    ("expander", label, blocks).
+    """
+    blocks = []
+    steps = [
+        step for step in message.get("steps") or ()
+        if (step["kind"] != "thinking" or show_thinking) and (step["kind"] != "tool" or show_tool_calls)
+    ]
+    if show_thinking and steps:
+        inner = []
+        for step in steps:
+            inner.append(("markdown", step["text"]))
+            if step.get("output"):
+                inner.append(("expander", "Output", (("code", step["output"]),)))
+        blocks.append(("expander", f"💭 Agent Workflow ({len(steps)} steps)", tuple(inner)))
+    if message.get("error"):
+        blocks.append(("error", f"An error occurred: {message['error']}"))
+    content = message.get("content") or ""
+    if len(content) > LONG_MESSAGE_CHARS:
+        # Cut at a paragraph break so markdown tables stay intact
+        cut = content.rfind("\n\n", 0, LONG_MESSAGE_CHARS)
+        cut = cut if cut > 0 else LONG_MESSAGE_CHARS
+        blocks.append(("markdown", content[:cut]))
+        blocks.append(("expander", f"Show full message ({len(content):,} chars)", (("markdown", content[cut:]),)))
+    elif content:
+        blocks.append(("markdown", content))
+    return tuple(blocks)
+
+
+def render_blocks(blocks):
+    for block in blocks:
+        kind = block[0]
+        if kind == "markdown":
+            st.markdown(block[1])
+        elif kind == "error":
+            st.error(block[1])
+        elif kind == "code":
+            st.code(block[1], language="text")
+        elif kind == "expander":
+            with st.expander(block[1], expanded=False):
+                render_blocks(block[2])
+
+
+def _cached_blocks(message, show_thinking, show_tool_calls):
+    cache = st.session_state.setdefault("_history_blocks", {})
+    key = (message["id"], show_thinking, show_tool_calls)
+    if key not in cache:
+        cache[key] = message_blocks(message, show_thinking, show_tool_calls)
+    return cache[key]
+
+
+def _show_earlier():
+    st.session_state.history_pages += 1
+
+
+@st.fragment
+def render_history(show_thinking: bool, show_tool_calls: bool, page_size: int = PAGE_SIZE):
+    """Render the newest pages of `st.session_state.messages`."""
+    messages = st.session_state.messages
+    pages = st.session_state.setdefault("history_pages", 1)
+    hidden = max(0, len(messages) - pages * page_size)
+    if hidden:
+        st.button(f"⬆️ Show earlier messages ({hidden} hidden)", on_click=_show_earlier)
+    for message in messages[hidden:]:
+        with st.chat_message(message["role"]):
+            render_blocks(_cached_blocks(message, show_thinking, show_tool_calls))
@@ -0,0 +1,118 @@
+"""Incremental Rendering of the Chat Stream.
+
+`StreamView` turns `/api/chat` events into Streamlit elements as they arrive:
+the orchestrator's tokens fill the answer, tool calls and sub-agent
+delegations appear as steps in a status panel, and todo updates refresh a
+checklist. `finish()` returns the assistant message kept in the history
+(see `ui.history` for how it is rendered on later reruns).
+"""
+
+import streamlit as st
+
+from ui.history import new_message, output_text
+
+AGENT_LABELS = {
+    "orchestrator": "Main Agent",
+    "sales-agent": "🔍 Sales Agent",
+    "technical-agent": "⚙️ Technical Agent",
+    "pricing-agent": "💰 Pricing Agent",
+}
+
+# File system tools to hide from UI
+HIDDEN_TOOLS = {"read_file", "write_file", "edit_file", "ls", "glob", "grep", "write_todos"}
+
+TODO_ICONS = {"completed": "✅", "in_progress": "⏳", "pending": "⬜"}
+
+
+def agent_label(agent_name) -> str:
+    return AGENT_LABELS.get(agent_name or "orchestrator", f"🤖 {agent_name}")
+
+
+class StreamView:
+    """Streamlit renderer for one streamed assistant turn.
+
+    Args:
+        container: Streamlit container to render into (the chat message)
+        show_thinking: Expand the workflow panel and keep intermediate text
+        show_tool_calls: Show every tool call, not only sub-agent delegations
+    """
+
+    def __init__(self, container, show_thinking: bool = True, show_tool_calls: bool = False):
+        self.show_thinking = show_thinking
+        self.show_tool_calls = show_tool_calls
+        self.status = container.status("🚀 Starting agent workflow...", expanded=show_thinking)
+        self.todos = self.status.empty()
+        self.answer = container.empty()
+        self.text = ""
+        self.steps = []
+        self.error = None
+
+    def handle(self, payload: dict):
+        """Render one stream event."""
+        kind = payload.get("type")
+        if kind == "token":
+            # Sub-agent text reaches the orchestrator as the `task` result
+            if payload.get("agent") in (None, "orchestrator"):
+                self.text += payload["content"]
+                self.answer.markdown(self.text + "▌")
+        elif kind == "tool_start":
+            self._tool_start(payload)
+        elif kind == "tool_end":
+            self._tool_end(payload)
+        elif kind == "values":
+            self.todos.markdown("\n".join(
+                f"{TODO_ICONS.get(t.get('status'), '⬜')} {t.get('content', '')}" for t in payload["todos"]
+            ))
+        elif kind == "queued":
+            self.status.update(label=f"⏳ Waiting for a free run slot (position {payload.get('position')})")
+        elif kind == "error":
+            self.error = payload.get("content")
+            self.status.update(label="❌ Agent workflow failed", state="error")
+
+    def _step(self, kind, text, output=None, show=True):
+        """Record a workflow step (kind: thinking, delegation, tool, done) and show it."""
+        step = {"kind": kind, "text": text}
+        if output is not None:
+            step["output"] = output
+        self.steps.append(step)
+        if show:
+            self.status.markdown(text)
+            if output:
+                with self.status.expander("Output", expanded=False):
+                    st.code(output, language="text")
+
+    def _tool_start(self, payload):
+        agent = payload.get("agent")
+        if agent in (None, "orchestrator") and self.text:
+            # Text before a tool call is reasoning, not the final answer
+            self._step("thinking", f"**🤖 Main Agent:** {self.text}", show=self.show_thinking)
+            self.text = ""
+            self.answer.empty()
+        tool = payload["tool"]
+        if tool == "task":
+            task_input = payload.get("input") or {}
+            target = agent_label(task_input.get("subagent_type") if isinstance(task_input, dict) else None)
+            self.status.update(label=f"{target} working...")
+            self._step("delegation", f"🎯 Main Agent → **{target}**")
+
+    def _tool_end(self, payload):
+        tool = payload["tool"]
+        if tool == "task":
+            self.status.update(label="🤖 Main Agent working...")
+            self._step("done", "✅ Sub-agent finished")
+        elif tool not in HIDDEN_TOOLS:
+            self._step(
+                "tool",
+                f"🔧 {agent_label(payload.get('agent'))} called `{tool}`",
+                output=output_text(payload.get("output")),
+                show=self.show_tool_calls,
+            )
+
+    def finish(self) -> dict:
+        """Close the panels and return the assistant message for the history."""
+        if self.error:
+            self.answer.error(f"An error occurred: {self.error}")
+        else:
+            self.status.update(label="✅ Agent workflow completed!", state="complete", expanded=False)
+            self.answer.markdown(self.text)
+        return new_message("assistant", self.text, steps=self.steps, error=self.error)